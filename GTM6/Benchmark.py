@@ -0,0 +1,179 @@
+"""
+    headless performance benchmarks on synthetic log files, reports wall time and peak memory
+
+    python -m GTM6 bench --duration-s 7200 --repeat 3
+"""
+import os
+import time
+import tempfile
+import tracemalloc
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import matplotlib.pyplot as plt
+
+from .LogFile import LogFile
+from .PlotConfig import PlotConfig
+from .CutEdges import CutEdges
+from .Scanner import scan_logfiles
+from .SpectrumCache import SpectrumCache
+from .Synthetic import write_synthetic_logfile
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, the max rss column stays empty
+    resource = None
+
+
+DEFAULT_PLOTCONFIG = Path(__file__).resolve().parent.parent.joinpath('default_plot_params.json')
+
+
+def _window_starts(logfile: LogFile, window_s: float, n_windows: int) -> list:
+    """start times spread over the file, every window lies inside it"""
+    logfile.loadTimeBoundarys()
+    span_s = max(0.0, (logfile.getEndTime() - logfile.getStartTime()).total_seconds() - window_s)
+    return [logfile.getStartTime() + pd.Timedelta(seconds=span_s * i / max(1, n_windows - 1)) for i in range(n_windows)]
+
+
+def bench_window_load(context: dict):
+    """loads windows of all sensors at positions spread over the file, block cache cleared"""
+    with LogFile(context['h5filepath'], context['plotconfig']) as logfile:
+        logfile.blockCache.clear()
+        sensors = [sensor for sensor in logfile.listValidSensorsNames() if sensor != 'TIME']
+
+        for start in _window_starts(logfile, context['window s'], 4):
+            logfile.setPlotStartTime(start)
+            logfile.loadSensorData(['TIME'] + sensors, context['window s'], reload_anyway=True)
+
+
+def bench_plot_data(context: dict):
+    """window load and plotSensors of GRAVER_Z and the first sensor on the Agg backend"""
+    with LogFile(context['h5filepath'], context['plotconfig']) as logfile:
+        sensors = ['GRAVER_Z', 'SENSOR1']
+
+        logfile.setPlotStartTime(_window_starts(logfile, context['window s'], 1)[0])
+        logfile.loadSensorData(['TIME'] + sensors, context['window s'])
+
+        logfile.plotSensors(['TIME'], sensors)
+        plt.gcf().canvas.draw()
+        plt.close('all')
+
+
+def bench_spectrum(context: dict):
+    """spectrogram of two sensors over the window, the spectrum cache is cleared first"""
+    with LogFile(context['h5filepath'], context['plotconfig']) as logfile:
+        logfile.spectrumCache = context['spectrum cache']
+        logfile.spectrumCache.clear()
+        sensors = ['GRAVER_Z', 'SENSOR1']
+
+        logfile.setPlotStartTime(_window_starts(logfile, context['window s'], 1)[0])
+        logfile.loadSensorData(['TIME'] + sensors, context['window s'])
+
+        logfile.plotSpectrum(sensors)
+        plt.close('all')
+
+
+def bench_scan(context: dict):
+    """scans the generated files, their time index sidecars are removed first"""
+    for sidecar in context['cache dir'].joinpath('timeindex').glob('*.npz'):
+        sidecar.unlink()
+
+    results = list(scan_logfiles(context['scan files']))
+
+    if not all(result['valid'] for result in results):
+        raise RuntimeError(f'scan failed: {[result["error"] for result in results]}')
+
+
+def bench_edges(context: dict):
+    """landing and lifting edges of GRAVER_Z of the whole file"""
+    with LogFile(context['h5filepath'], context['plotconfig']) as logfile:
+        CutEdges(Fs=logfile.Fs or logfile.estimateFs()).find_edges_in_file(logfile)
+
+
+BENCHMARKS = {
+    'window load': bench_window_load,
+    'plot data': bench_plot_data,
+    'spectrum': bench_spectrum,
+    'scan': bench_scan,
+    'edges': bench_edges
+}
+
+
+def _run(benchmark, context: dict, repeat: int) -> dict:
+    """best and median wall time of repeat runs, peak traced memory of one extra run"""
+    seconds = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        benchmark(context)
+        seconds.append(time.perf_counter() - t_start)
+
+    # numpy buffers are traced, memory held by HDF5 itself is not
+    tracemalloc.start()
+    benchmark(context)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'best s': min(seconds),
+        'median s': float(np.median(seconds)),
+        'peak MB': peak_bytes / 2**20
+    }
+
+
+def run_benchmarks(h5filepath: Path = None, names: list = None, repeat: int = 3, duration_s: float = 3600,
+                   window_s: float = 600, n_sensors: int = 4, n_scan_files: int = 4, workdir: Path = None):
+    """
+        runs the benchmarks of BENCHMARKS (or names) and yields one result dict per benchmark,
+        without h5filepath a synthetic file of duration_s is generated in workdir,
+        the caches of the viewer are redirected to workdir
+    """
+    plt.switch_backend('Agg')
+
+    with tempfile.TemporaryDirectory(prefix='gtm6_bench_') as tmp_dir:
+        workdir = Path(workdir or tmp_dir)
+        # the sidecars of the benchmark files do not end up in the user cache, the variable is
+        # set for the run as the scan worker processes read it too, and restored afterwards
+        previous_cache_dir = os.environ.get('GTM6_CACHE_DIR')
+        os.environ['GTM6_CACHE_DIR'] = str(workdir.joinpath('cache'))
+        try:
+            if h5filepath is None:
+                h5filepath = write_synthetic_logfile(workdir.joinpath('bench.h5'), duration_s=duration_s,
+                                                     n_sensors=n_sensors, cuts=True)
+
+            scan_dir = workdir.joinpath('scan')
+            scan_dir.mkdir(exist_ok=True)
+            workdir.joinpath('spectrum').mkdir(exist_ok=True)
+            scan_files = [write_synthetic_logfile(scan_dir.joinpath(f'scan_{i}.h5'), duration_s=min(duration_s, 600),
+                                                  n_sensors=n_sensors, seed=i)
+                          for i in range(n_scan_files)]
+
+            context = {
+                'h5filepath': Path(h5filepath),
+                'plotconfig': PlotConfig(DEFAULT_PLOTCONFIG),
+                'window s': window_s,
+                'scan files': scan_files,
+                'cache dir': workdir.joinpath('cache'),
+                'spectrum cache': SpectrumCache(directory=workdir.joinpath('spectrum'))
+            }
+
+            for name in names or BENCHMARKS:
+                result = {'name': name}
+                result.update(_run(BENCHMARKS[name], context, repeat))
+                # kB on linux, the high water mark of the whole process so far
+                result['max rss MB'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else float('nan')
+
+                yield result
+        finally:
+            if previous_cache_dir is None:
+                os.environ.pop('GTM6_CACHE_DIR', None)
+            else:
+                os.environ['GTM6_CACHE_DIR'] = previous_cache_dir
+
+
+def format_result(result: dict) -> str:
+    return (f"{result['name']:<12} best {result['best s']:8.3f} s  median {result['median s']:8.3f} s  "
+            f"peak {result['peak MB']:8.1f} MB  max rss {result['max rss MB']:8.1f} MB")
@@ -0,0 +1,158 @@
+import threading
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .Tracer import shared_tracer
+
+
+class BlockCache():
+    """
+        memory bounded LRU cache of sensor data blocks shared by all LogFile objects,
+        blocks are keyed by (file key, sensor, block index)
+    """
+
+    # samples per block
+    BLOCK_SIZE = 65536
+    # blocks read from the file at once, progress is reported between these reads
+    READ_BLOCKS = 16
+
+    def __init__(self, max_bytes: int = 256 * 2**20, block_size: int = BLOCK_SIZE):
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.blocks = OrderedDict()
+        self.lock = threading.Lock()
+
+    def setMaxBytes(self, max_bytes: int):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'blocks': len(self.blocks),
+                'bytes': self.n_bytes,
+                'max bytes': self.max_bytes
+            }
+
+    def clear(self):
+        with self.lock:
+            self.blocks.clear()
+            self.n_bytes = 0
+
+    def get(self, key: tuple) -> np.ndarray:
+        with self.lock:
+            block = self.blocks.get(key)
+
+            if block is None:
+                self.misses += 1
+                shared_tracer.count('cache_misses')
+            else:
+                self.hits += 1
+                shared_tracer.count('cache_hits')
+                self.blocks.move_to_end(key)
+
+            return block
+
+    def put(self, key: tuple, block: np.ndarray):
+        if block.nbytes > self.max_bytes:
+            return
+
+        # cached blocks are shared, nobody may write into them
+        block.flags.writeable = False
+
+        with self.lock:
+            previous = self.blocks.pop(key, None)
+            if previous is not None:
+                self.n_bytes -= previous.nbytes
+
+            self.blocks[key] = block
+            self.n_bytes += block.nbytes
+            self._evict()
+
+    def _evict(self):
+        while self.n_bytes > self.max_bytes and self.blocks:
+            _, block = self.blocks.popitem(last=False)
+            self.n_bytes -= block.nbytes
+
+    def read(self, file_key: str, sensor: str, dataset, idx_start: int, idx_stop: int, out: np.ndarray = None,
+             progress=None) -> np.ndarray:
+        """
+            samples idx_start:idx_stop of a dataset, missing blocks are read from the file
+            in one hyperslab per run of consecutive blocks, out is filled if given
+            (any dtype, the values are cast), progress(fraction, sensor) is called after every
+            read from the file and may raise to cancel
+        """
+        idx_stop = min(idx_stop, dataset.shape[0])
+        data = np.empty(max(idx_stop - idx_start, 0), dtype=dataset.dtype) if out is None else out
+
+        if idx_stop <= idx_start:
+            return data
+
+        if (idx_stop - idx_start) * dataset.dtype.itemsize > self.max_bytes // 2:
+            # caching it would evict everything else and most of itself, HDF5 casts into data directly
+            read_rows = self.READ_BLOCKS * self.block_size
+            for read_start in range(idx_start, idx_stop, read_rows):
+                read_stop = min(read_start + read_rows, idx_stop)
+                shared_tracer.readDirect(dataset, data[read_start - idx_start:read_stop - idx_start], np.s_[read_start:read_stop])
+
+                if progress is not None:
+                    progress((read_stop - idx_start) / (idx_stop - idx_start), sensor)
+            return data
+
+        first_block = idx_start // self.block_size
+        last_block = (idx_stop - 1) // self.block_size
+
+        blocks = {}
+        missing = []
+        for block_idx in range(first_block, last_block + 1):
+            block = self.get((file_key, sensor, block_idx))
+            if block is None:
+                missing.append(block_idx)
+            else:
+                blocks[block_idx] = block
+
+        # group missing blocks into runs of at most READ_BLOCKS blocks
+        runs = []
+        for block_idx in missing:
+            if runs and runs[-1][1] == block_idx and block_idx - runs[-1][0] < self.READ_BLOCKS:
+                runs[-1][1] = block_idx + 1
+            else:
+                runs.append([block_idx, block_idx + 1])
+
+        for i_run, (run_start, run_stop) in enumerate(runs):
+            run_stop_idx = min(run_stop * self.block_size, dataset.shape[0])
+            run_data = np.empty(run_stop_idx - run_start * self.block_size, dtype=dataset.dtype)
+            shared_tracer.readDirect(dataset, run_data, np.s_[run_start * self.block_size:run_stop_idx])
+
+            for block_idx in range(run_start, run_stop):
+                offset = (block_idx - run_start) * self.block_size
+                block = run_data[offset:offset + self.block_size].copy()
+
+                self.put((file_key, sensor, block_idx), block)
+                blocks[block_idx] = block
+
+            if progress is not None:
+                progress((i_run + 1) / len(runs), sensor)
+
+        for block_idx, block in blocks.items():
+            block_start = block_idx * self.block_size
+
+            lo = max(idx_start, block_start)
+            hi = min(idx_stop, block_start + block.shape[0])
+
+            data[lo - idx_start:hi - idx_start] = block[lo - block_start:hi - block_start]
+
+        return data
+
+
+# one cache for all open log files
+shared_block_cache = BlockCache()
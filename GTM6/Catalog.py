@@ -0,0 +1,148 @@
+import sqlite3
+import logging
+
+from pathlib import Path
+from contextlib import closing
+
+from .Scanner import scan_logfiles
+
+from ._helper import cache_dir
+
+
+class Catalog():
+    """
+        local sqlite catalog of GTM6 log file metadata, a file is only scanned again
+        if its size or modification time changed
+    """
+
+    def __init__(self, db_path: Path = None):
+
+        self.db_path = Path(db_path) if db_path is not None else cache_dir().joinpath('catalog.sqlite')
+
+        with closing(self._connect()) as connection, connection:
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    valid INTEGER,
+                    n_samples INTEGER,
+                    start_us INTEGER,
+                    end_us INTEGER,
+                    cuts INTEGER,
+                    error TEXT
+                );
+                CREATE TABLE IF NOT EXISTS sensors (
+                    path TEXT,
+                    position INTEGER,
+                    name TEXT,
+                    valid INTEGER,
+                    PRIMARY KEY (path, position)
+                );
+                CREATE INDEX IF NOT EXISTS files_time ON files (start_us, end_us);
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        # one connection per call, the catalog is used from the gui and from scan threads
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    @staticmethod
+    def _key(h5filepath: Path) -> str:
+        return str(Path(h5filepath).resolve())
+
+    def isCurrent(self, h5filepath: Path) -> bool:
+        """True if the catalog entry matches size and mtime of the file on disk"""
+        try:
+            stat = Path(h5filepath).stat()
+        except OSError:
+            return False
+
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT size, mtime_ns FROM files WHERE path = ?', (self._key(h5filepath),)).fetchone()
+
+        return row is not None and row == (stat.st_size, stat.st_mtime_ns)
+
+    def get(self, h5filepath: Path) -> dict:
+        """catalog entry in the format of scan_logfile or None"""
+        key = self._key(h5filepath)
+
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT valid, n_samples, start_us, end_us, cuts, error FROM files WHERE path = ?', (key,)).fetchone()
+            sensors = connection.execute('SELECT name, valid FROM sensors WHERE path = ? ORDER BY position', (key,)).fetchall()
+
+        if row is None:
+            return None
+
+        return {
+            'path': Path(h5filepath),
+            'valid': bool(row[0]),
+            'sensors': [name for name, _ in sensors],
+            'sensor valid': [bool(valid) for _, valid in sensors],
+            'n samples': row[1],
+            'start': row[2],
+            'end': row[3],
+            'cuts': bool(row[4]),
+            'error': row[5],
+            'complete': True
+        }
+
+    def put(self, result: dict, stat=None):
+        """stores a finished scan result, stat is the os.stat of the file taken before the scan"""
+        if not result.get('complete'):
+            return
+
+        if stat is None:
+            stat = Path(result['path']).stat()
+
+        key = self._key(result['path'])
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                key, stat.st_size, stat.st_mtime_ns, int(result['valid']), result['n samples'],
+                result['start'], result['end'], int(result['cuts']), result['error']))
+
+            connection.execute('DELETE FROM sensors WHERE path = ?', (key,))
+            connection.executemany('INSERT INTO sensors VALUES (?, ?, ?, ?)', [
+                (key, position, name, int(valid))
+                for position, (name, valid) in enumerate(zip(result['sensors'], result['sensor valid']))])
+
+    def refresh(self, filepaths: list, max_workers: int = None, timeout_s: float = 60.0):
+        """
+            yields the metadata of every file, current catalog entries first,
+            new or changed files are scanned in a process pool and stored
+        """
+        stale = {}
+
+        for filepath in filepaths:
+            if self.isCurrent(filepath):
+                yield self.get(filepath)
+            else:
+                try:
+                    stale[Path(filepath)] = Path(filepath).stat()
+                except OSError as oe:
+                    logging.debug(f'catalog can not stat {filepath}: {oe}')
+                    stale[Path(filepath)] = None
+
+        if not stale:
+            return
+
+        for result in scan_logfiles(list(stale), max_workers=max_workers, timeout_s=timeout_s):
+            stat = stale.get(result['path'])
+            if stat is not None:
+                self.put(result, stat)
+            yield result
+
+    def query(self, start_us: int, end_us: int, filepaths: list = None) -> list:
+        """valid files with samples inside (start_us, end_us), optionally restricted to filepaths"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute('SELECT path FROM files WHERE valid = 1 AND start_us < ? AND end_us > ? ORDER BY start_us',
+                                      (end_us, start_us)).fetchall()
+
+        matching = [Path(path) for path, in rows]
+
+        if filepaths is None:
+            return matching
+
+        keys = {self._key(filepath): Path(filepath) for filepath in filepaths}
+
+        return [keys[str(path)] for path in matching if str(path) in keys]
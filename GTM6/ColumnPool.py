@@ -0,0 +1,36 @@
+import numpy as np
+
+
+class ColumnPool():
+    """
+        reusable column buffers of a loaded window, there are two generations: the window is
+        spliced from the current one into the other, swap() makes the new window current,
+        a buffer is only reallocated if it is too small or the dtype changes
+    """
+
+    def __init__(self, growth: float = 1.25):
+        # extra rows on reallocation, a slowly growing window does not reallocate every load
+        self.growth = growth
+        self.generations = [{}, {}]
+        self.current = 0
+
+    def column(self, label: str, n_rows: int, dtype) -> np.ndarray:
+        """n_rows of the buffer of label in the next generation, the content is undefined"""
+        buffers = self.generations[1 - self.current]
+        buffer = buffers.get(label)
+
+        if buffer is None or buffer.shape[0] < n_rows or buffer.dtype != dtype:
+            buffer = np.empty(int(n_rows * self.growth), dtype=dtype)
+            buffers[label] = buffer
+
+        return buffer[:n_rows]
+
+    def swap(self):
+        """the next generation becomes the current one, the old window is overwritten by the next load"""
+        self.current = 1 - self.current
+
+    def clear(self):
+        self.generations = [{}, {}]
+
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffers in self.generations for buffer in buffers.values())
@@ -1,60 +1,237 @@
+import os
+import logging
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import h5py
 import pandas as pd
 import numpy as np
 
-from multiprocessing import Process
+from ._helper import ffill_nan, moving_average
 
 
+# landing: graver moves down into the substrat, lifting: graver moves up
+LANDING = -1
+LIFTING = 1
 
-from ._helper import butter_bandpass_filter
+EDGE_DTYPE = np.dtype([('index', np.int64), ('time', np.int64), ('kind', np.int8), ('gradient', np.float64)])
 
-from .PlotConfig import PlotConfig
+DEFAULT_OPTIONS = {
+    # smoothing window of GRAVER_Z before the gradient
+    'lookahead ms': 150,
+    # |gradient| in GRAVER_Z units per second that counts as edge, 0 estimates it from the data
+    'threshold': 0,
+    # edges of the same kind closer than this are merged
+    'min distance ms': 500
+}
 
 
+def _options(options: dict) -> dict:
+    merged = dict(DEFAULT_OPTIONS)
+    merged.update({key: float(value) for key, value in (options or {}).items() if key in DEFAULT_OPTIONS})
+    return merged
 
-class _CutEdgesWorker(Process):
 
-    def __init__(self, parent, id):
-        super(self).__init__()
-        self.id = id
-        self.parent = parent
-    
-    # run method of spawned process
-    def run(self):
-        pass
+def find_gradient(graver_z: np.ndarray, Fs: float, lookahead_ms: float) -> np.ndarray:
+    """gradient of the smoothed GRAVER_Z signal in units per second"""
+    n_smooth = max(1, int(round(lookahead_ms * 1e-3 * Fs)))
 
+    smoothed = moving_average(ffill_nan(np.asarray(graver_z, dtype=np.float64)), n_smooth)
 
-class CutEdges():
+    gradient = np.gradient(smoothed) if smoothed.shape[0] > 1 else np.zeros_like(smoothed)
+    gradient *= Fs
+
+    return gradient
+
+
+def estimate_threshold(gradient: np.ndarray, factor: float = 10.0) -> float:
+    """robust threshold: factor times the median absolute deviation of the gradient"""
+    mad = np.median(np.abs(gradient - np.median(gradient)))
+    return factor * 1.4826 * mad if mad > 0 else float(np.max(np.abs(gradient), initial=0.0)) / 2
+
+
+def find_edges(gradient: np.ndarray, threshold: float, min_distance: int, index_offset: int = 0) -> np.ndarray:
     """
-        objects of this class hold information about landing and lifting position of graver in substrat
+        one edge per run of |gradient| > threshold with constant sign, placed at the steepest sample,
+        returns a structured array of EDGE_DTYPE without the time field filled in
     """
+    sign = np.sign(gradient).astype(np.int8)
+    sign[np.abs(gradient) <= threshold] = 0
 
-    
+    # runs of constant sign
+    run_starts = np.concatenate(([0], np.flatnonzero(np.diff(sign)) + 1))
+    run_signs = sign[run_starts]
+    edge_runs = run_signs != 0
 
-    def __init__(self, graver_z_data: pd.Series, options: dict) -> None:
-        
-        self.graver_z = graver_z_data
-        self.options = options
+    if not edge_runs.any():
+        return np.empty(0, dtype=EDGE_DTYPE)
+
+    run_stops = np.append(run_starts[1:], sign.shape[0])
+    abs_gradient = np.abs(gradient)
+
+    run_max = np.maximum.reduceat(abs_gradient, run_starts)
+
+    # first sample of every run that reaches the run maximum
+    run_id = np.repeat(np.arange(run_starts.shape[0]), run_stops - run_starts)
+    at_max = np.flatnonzero(abs_gradient == run_max[run_id])
+    _, first = np.unique(run_id[at_max], return_index=True)
+    peaks = at_max[first]
+
+    peaks = peaks[edge_runs]
+
+    edges = np.empty(peaks.shape[0], dtype=EDGE_DTYPE)
+    edges['index'] = peaks + index_offset
+    edges['time'] = 0
+    edges['kind'] = run_signs[edge_runs]
+    edges['gradient'] = gradient[peaks]
+
+    return merge_edges(edges, min_distance)
 
-        workerid = np.random.randint(0xFFFF)
 
-        self.worker = _CutEdgesWorker(self, workerid)
+def merge_edges(edges: np.ndarray, min_distance: int) -> np.ndarray:
+    """sorts edges and keeps only the steepest of neighbouring edges of the same kind"""
+    edges = np.sort(edges, order='index')
 
-        self.workerTask_list = [
-            self.find_gradient, # 0
-            self.find_edges     # 1
-        ]
+    if edges.shape[0] < 2 or min_distance <= 0:
+        return edges
 
+    keep = [0]
+    for i in range(1, edges.shape[0]):
+        last = keep[-1]
+        if edges['kind'][i] == edges['kind'][last] and edges['index'][i] - edges['index'][last] < min_distance:
+            if abs(edges['gradient'][i]) > abs(edges['gradient'][last]):
+                keep[-1] = i
+        else:
+            keep.append(i)
 
-        pass
+    return edges[keep]
 
-    def find_gradient(self):
-        pass
 
-    def find_edges(self):
-        pass
+def _find_edges_segment(h5filepath: Path, sensor: str, seg_start: int, seg_stop: int, overlap: int,
+                        Fs: float, options: dict, threshold: float) -> np.ndarray:
+    """worker: reads one segment plus overlap on both sides, keeps the edges of the core"""
+    with h5py.File(h5filepath, 'r') as h5file:
+        dataset = h5file['GTM6']['LOG'][sensor]
 
-    def setWorkerTask(self, taskid: int):
-        if taskid <= len(self.workerTask_list) and taskid >= 0:
-            self.worker.run = self.workerTask_list[taskid]
-            self.workerTask = taskid
-    
\ No newline at end of file
+        read_start = max(seg_start - overlap, 0)
+        read_stop = min(seg_stop + overlap, dataset.shape[0])
+
+        gradient = find_gradient(dataset[read_start:read_stop], Fs, options['lookahead ms'])
+
+        min_distance = int(options['min distance ms'] * 1e-3 * Fs)
+        edges = find_edges(gradient, threshold, min_distance, index_offset=read_start)
+
+        edges = edges[(edges['index'] >= seg_start) & (edges['index'] < seg_stop)]
+
+        if edges.shape[0] > 0:
+            # TIME is only read at the edge positions
+            edges['time'] = h5file['GTM6']['LOG']['TIME'][np.sort(edges['index'])]
+
+    return edges
+
+
+class CutEdges():
+    """
+        objects of this class hold information about landing and lifting position of graver in substrat
+    """
+
+    # samples per segment of the process pool
+    SEGMENT_ROWS = 2_000_000
+
+    def __init__(self, graver_z_data: pd.Series = None, options: dict = None, Fs: float = 200) -> None:
+
+        self.graver_z = graver_z_data
+        self.options = _options(options)
+        self.Fs = float(Fs)
+
+        self.gradient = None
+        self.threshold = self.options['threshold']
+        self.edges = np.empty(0, dtype=EDGE_DTYPE)
+
+    def find_gradient(self) -> np.ndarray:
+        """gradient of the in memory GRAVER_Z data"""
+        values = self.graver_z.to_numpy() if isinstance(self.graver_z, pd.Series) else np.asarray(self.graver_z)
+
+        self.gradient = find_gradient(values, self.Fs, self.options['lookahead ms'])
+
+        if not self.threshold:
+            self.threshold = estimate_threshold(self.gradient)
+
+        return self.gradient
+
+    def find_edges(self) -> np.ndarray:
+        """edges of the in memory GRAVER_Z data, times are taken from a DatetimeIndex if there is one"""
+        if self.gradient is None:
+            self.find_gradient()
+
+        min_distance = int(self.options['min distance ms'] * 1e-3 * self.Fs)
+        self.edges = find_edges(self.gradient, self.threshold, min_distance)
+
+        if isinstance(self.graver_z, pd.Series) and isinstance(self.graver_z.index, pd.DatetimeIndex):
+            self.edges['time'] = self.graver_z.index[self.edges['index']].as_unit('us').asi8
+
+        return self.edges
+
+    def find_edges_in_file(self, logfile, sensor: str = 'GRAVER_Z', max_workers: int = None,
+                           segment_rows: int = SEGMENT_ROWS, progress=None) -> np.ndarray:
+        """
+            edges of a whole log file, overlapping segments run in a process pool
+            and the edges are merged at the segment seams, progress(fraction, text) is called
+            after every segment and may raise to cancel, the segments not started are dropped then
+        """
+        h5filepath = Path(logfile.getLogFileFilePath())
+        n_samples = logfile.n_sensorTime_data
+
+        # the overlap covers the smoothing window and the merge distance on both sides
+        overlap = int((self.options['lookahead ms'] + self.options['min distance ms']) * 1e-3 * self.Fs) + 1
+
+        if not self.threshold:
+            # one threshold for all segments, estimated from the first block
+            probe = logfile.sensorGroup[sensor][:min(n_samples, segment_rows)]
+            self.threshold = estimate_threshold(find_gradient(probe, self.Fs, self.options['lookahead ms']))
+
+        boundaries = logfile.blockBoundaries(block_rows=segment_rows)
+        segments = list(zip(boundaries[:-1], boundaries[1:]))
+
+        if max_workers is None:
+            max_workers = min(len(segments), os.cpu_count() or 1)
+
+        def segment_done(i_segment: int):
+            if progress is not None:
+                progress((i_segment + 1) / len(segments), f'edges of {h5filepath.name}')
+
+        if len(segments) <= 1 or max_workers <= 1:
+            parts = []
+            for i_segment, (seg_start, seg_stop) in enumerate(segments):
+                parts.append(_find_edges_segment(h5filepath, sensor, seg_start, seg_stop, overlap, self.Fs, self.options, self.threshold))
+                segment_done(i_segment)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_find_edges_segment, h5filepath, sensor, seg_start, seg_stop, overlap,
+                                           self.Fs, self.options, self.threshold)
+                           for seg_start, seg_stop in segments]
+                try:
+                    for i_segment, _ in enumerate(as_completed(futures)):
+                        segment_done(i_segment)
+                except BaseException:
+                    # only the running segments are waited for
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+                parts = [future.result() for future in futures]
+
+        min_distance = int(self.options['min distance ms'] * 1e-3 * self.Fs)
+        self.edges = merge_edges(np.concatenate(parts) if parts else np.empty(0, dtype=EDGE_DTYPE), min_distance)
+
+        logging.debug(f'{h5filepath.name}: {np.sum(self.edges["kind"] == LANDING)} landing, '
+                      f'{np.sum(self.edges["kind"] == LIFTING)} lifting edges, threshold {self.threshold:.3g}')
+
+        return self.edges
+
+    def getLandings(self) -> np.ndarray:
+        return self.edges[self.edges['kind'] == LANDING]
+
+    def getLiftings(self) -> np.ndarray:
+        return self.edges[self.edges['kind'] == LIFTING]
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from .CutEdges import LANDING, LIFTING
+
+from ._helper import cache_dir, file_fingerprint
+
+
+CUT_DTYPE = np.dtype([('cut', np.int32), ('idx_start', np.int64), ('idx_stop', np.int64),
+                      ('time_start', np.int64), ('time_stop', np.int64)])
+
+# accepted column names of the CUTS group for the cut number, start and end,
+# matched exactly but case-insensitive, the first accepted name found wins
+CUT_NUMBER_NAMES = ('CUT', 'NUMBER', 'NR', 'ID')
+CUT_START_NAMES = ('START', 'BEGIN', 'TIME_START', 'START_TIME')
+CUT_STOP_NAMES = ('END', 'STOP', 'TIME_END', 'END_TIME', 'TIME_STOP')
+
+# part of the sidecar key, bumped whenever cut tables are built differently from the edges
+SIDECAR_VERSION = 2
+
+
+def load_cuts_records(cuts_node) -> np.ndarray:
+    """
+        bulk loads the CUTS information into one structured array,
+        either from a compound dataset or from equally long 1D datasets of the group
+    """
+    if isinstance(cuts_node, h5py.Dataset):
+        return cuts_node[()] if cuts_node.dtype.names else np.empty(0)
+
+    compound = [cuts_node[name] for name in cuts_node if isinstance(cuts_node[name], h5py.Dataset) and cuts_node[name].dtype.names]
+    if compound:
+        return compound[0][()]
+
+    columns = {name: cuts_node[name] for name in cuts_node
+               if isinstance(cuts_node[name], h5py.Dataset) and cuts_node[name].ndim == 1}
+
+    if not columns:
+        return np.empty(0)
+
+    n_rows = min(dataset.shape[0] for dataset in columns.values())
+    columns = {name: dataset for name, dataset in columns.items() if dataset.shape[0] == n_rows}
+
+    return np.rec.fromarrays([dataset[()] for dataset in columns.values()], names=list(columns)).view(np.ndarray)
+
+
+def _field(records: np.ndarray, accepted: tuple, required: bool = True) -> str:
+    """
+        the column of records named like one of the accepted names, raises ValueError
+        if there is none and the column is required, returns None else
+    """
+    names = {name.upper(): name for name in records.dtype.names or ()}
+    for accepted_name in accepted:
+        if accepted_name in names:
+            return names[accepted_name]
+
+    if required:
+        raise ValueError(f'CUTS has none of the columns {accepted}, its columns are {records.dtype.names}')
+    return None
+
+
+def cut_table_from_records(records: np.ndarray, time_index) -> np.ndarray:
+    """
+        cut -> (start index, stop index) table from CUTS records with start and end times in TIME units,
+        raises ValueError if the start or end column is missing
+    """
+    if records.shape[0] == 0:
+        return np.empty(0, dtype=CUT_DTYPE)
+
+    start_field = _field(records, CUT_START_NAMES)
+    stop_field = _field(records, CUT_STOP_NAMES)
+    number_field = _field(records, CUT_NUMBER_NAMES, required=False)
+
+    table = np.empty(records.shape[0], dtype=CUT_DTYPE)
+    table['cut'] = records[number_field] if number_field is not None else np.arange(1, records.shape[0] + 1)
+    table['time_start'] = records[start_field]
+    table['time_stop'] = records[stop_field]
+
+    # two index lookups per cut, no TIME scan
+    table['idx_start'] = [time_index.locate(t_us) for t_us in table['time_start']]
+    table['idx_stop'] = [time_index.locate(t_us, right=True) for t_us in table['time_stop']]
+
+    return np.sort(table, order='cut')
+
+
+def cut_table_from_edges(edges: np.ndarray, time_start: int) -> np.ndarray:
+    """
+        every landing followed by a lifting is one cut, cuts are numbered from 1 like in CUTS,
+        a first edge lifting the graver ends cut 1, which started with the file at TIME time_start
+    """
+    edges = np.sort(edges, order='index')
+
+    if edges.shape[0] > 0 and edges['kind'][0] == LIFTING:
+        # the graver is in the substrat when the file starts
+        first_landing = np.zeros(1, dtype=edges.dtype)
+        first_landing['kind'] = LANDING
+        first_landing['time'] = time_start
+        edges = np.concatenate((first_landing, edges))
+
+    is_landing = edges['kind'] == LANDING
+    pairs = np.flatnonzero(is_landing[:-1] & (edges['kind'][1:] == LIFTING))
+
+    table = np.empty(pairs.shape[0], dtype=CUT_DTYPE)
+    table['cut'] = np.arange(1, pairs.shape[0] + 1)
+    table['idx_start'] = edges['index'][pairs]
+    table['idx_stop'] = edges['index'][pairs + 1] + 1
+    table['time_start'] = edges['time'][pairs]
+    table['time_stop'] = edges['time'][pairs + 1]
+
+    return table
+
+
+def _sidecar_path(h5filepath: Path, options: dict) -> Path:
+    """the table depends on the file and on the 'cut edges' options the edges were found with"""
+    key = hashlib.sha1(repr((file_fingerprint(h5filepath), sorted(options.items()), SIDECAR_VERSION)).encode()).hexdigest()
+    return cache_dir('cuts').joinpath(f'{key}.npy')
+
+
+def load_cut_table_sidecar(h5filepath: Path, options: dict) -> np.ndarray:
+    try:
+        sidecar_path = _sidecar_path(h5filepath, options)
+        if sidecar_path.is_file():
+            return np.load(sidecar_path)
+    except (OSError, ValueError) as e:
+        logging.debug(f'cut table sidecar of {h5filepath} unreadable: {e}')
+    return None
+
+
+def save_cut_table_sidecar(h5filepath: Path, options: dict, table: np.ndarray):
+    try:
+        sidecar_path = _sidecar_path(h5filepath, options)
+        tmp_path = sidecar_path.with_suffix('.tmp')
+        with tmp_path.open('wb') as fp:
+            np.save(fp, table)
+        tmp_path.replace(sidecar_path)
+    except OSError as oe:
+        logging.debug(f'could not write cut table sidecar of {h5filepath}: {oe}')
@@ -0,0 +1,255 @@
+import logging
+import zipfile
+
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .LogFile import LogFile
+from .FilterBank import FilterBank
+from .LinearDetrend import LinearDetrend
+
+
+EXPORT_FORMATS = ('parquet', 'npz', 'csv')
+
+DETREND_MODES = ('whole', 'window')
+
+LOGFILE_SUFFIXES = ('.h5', '.hdf5', '.nxn')
+
+
+def expand_logfile_paths(paths: list) -> list:
+    """files are taken as they are, directories are replaced by the hdf5 files they contain"""
+    logfile_paths = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            logfile_paths.extend(sorted(f for f in path.iterdir() if f.suffix in LOGFILE_SUFFIXES))
+        else:
+            logfile_paths.append(path)
+    return logfile_paths
+
+
+def _chunks(index_slice: slice, chunk_rows: int):
+    for chunk_start in range(index_slice.start, index_slice.stop, chunk_rows):
+        yield slice(chunk_start, min(chunk_start + chunk_rows, index_slice.stop))
+
+
+def _read_block(logfile: LogFile, sensors: list, chunk: slice, detrend: LinearDetrend = None) -> np.ndarray:
+    """(samples, sensors) array of one chunk, detrended if a fitted or rolling detrend is given"""
+    block = np.column_stack([logfile.readColumn(sensor, chunk) for sensor in sensors])
+
+    if detrend is None:
+        return block
+
+    time_us = logfile.readColumn('TIME', chunk)
+
+    return detrend.detrend(block, time_us) if detrend.rolling else detrend.apply(block, time_us)
+
+
+def _iter_chunks(logfile: LogFile, sensors: list, index_slice: slice, chunk_rows: int,
+                 filter_bank: FilterBank = None, detrend: LinearDetrend = None):
+    """
+        yields (chunk slice, sensor values dict) per chunk,
+        a detrend is fitted over the whole slice in a first pass unless it is rolling, then every chunk is one window,
+        with a filter bank all sensors are bandpass filtered together block by block and a chunk is yielded once it is final
+    """
+    if (filter_bank is None and detrend is None) or not sensors:
+        for chunk in _chunks(index_slice, chunk_rows):
+            yield chunk, {sensor: logfile.readColumn(sensor, chunk) for sensor in sensors}
+        return
+
+    if detrend is not None and not detrend.rolling:
+        detrend.reset()
+        for chunk in _chunks(index_slice, chunk_rows):
+            detrend.accumulate(_read_block(logfile, sensors, chunk), logfile.readColumn('TIME', chunk))
+        detrend.solve()
+
+    if filter_bank is None:
+        for chunk in _chunks(index_slice, chunk_rows):
+            block = _read_block(logfile, sensors, chunk, detrend)
+            yield chunk, {sensor: block[:, i] for i, sensor in enumerate(sensors)}
+        return
+
+    filter_bank.reset()
+
+    waiting = deque()
+    filtered = []
+    n_filtered = 0
+
+    def ready_chunks(final: bool):
+        nonlocal filtered, n_filtered
+        while waiting and (final or n_filtered >= waiting[0].stop - waiting[0].start):
+            chunk = waiting.popleft()
+            values = np.concatenate(filtered) if len(filtered) > 1 else filtered[0]
+            n_rows = chunk.stop - chunk.start
+
+            filtered = [values[n_rows:]]
+            n_filtered -= n_rows
+            yield chunk, {sensor: values[:n_rows, i] for i, sensor in enumerate(sensors)}
+
+    for chunk in _chunks(index_slice, chunk_rows):
+        waiting.append(chunk)
+
+        values = filter_bank.push(_read_block(logfile, sensors, chunk, detrend))
+
+        filtered.append(values)
+        n_filtered += values.shape[0]
+
+        yield from ready_chunks(final=False)
+
+    values = filter_bank.flush()
+    filtered.append(values)
+    n_filtered += values.shape[0]
+
+    yield from ready_chunks(final=True)
+
+
+def _read_chunks(logfile: LogFile, sensors: list, index_slice: slice, chunk_rows: int, **transforms):
+    """yields the chunks as DataFrames with a TIME column"""
+    for chunk, values in _iter_chunks(logfile, sensors, index_slice, chunk_rows, **transforms):
+        data = {'TIME': pd.to_datetime(logfile.readColumn('TIME', chunk), unit='us')}
+        data.update(values)
+        yield pd.DataFrame(data)
+
+
+def _write_parquet(logfile: LogFile, sensors: list, index_slice: slice, output_path: Path, chunk_rows: int, **transforms):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('parquet export needs pyarrow, install it or choose npz/csv')
+
+    writer = None
+    try:
+        for frame in _read_chunks(logfile, sensors, index_slice, chunk_rows, **transforms):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_csv(logfile: LogFile, sensors: list, index_slice: slice, output_path: Path, chunk_rows: int, **transforms):
+    with output_path.open('w', newline='') as fp:
+        for i, frame in enumerate(_read_chunks(logfile, sensors, index_slice, chunk_rows, **transforms)):
+            frame.to_csv(fp, index=False, header=(i == 0))
+
+
+def _write_npz(logfile: LogFile, sensors: list, index_slice: slice, output_path: Path, chunk_rows: int, **transforms):
+    """
+        one .npy member per sensor, streamed chunk by chunk, readable with np.load,
+        members are written one after another so each sensor is transformed on its own
+    """
+    n_rows = index_slice.stop - index_slice.start
+
+    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as npz:
+        for sensor in ['TIME'] + sensors:
+            sensor_transforms = {} if sensor == 'TIME' else {name: t for name, t in transforms.items() if t is not None}
+            dtype = np.dtype(np.float64) if sensor_transforms else logfile.sensorGroup[sensor].dtype
+
+            with npz.open(f'{sensor}.npy', 'w', force_zip64=True) as member:
+                header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (n_rows,)}
+                np.lib.format.write_array_header_2_0(member, header)
+
+                for _, values in _iter_chunks(logfile, [sensor], index_slice, chunk_rows, **sensor_transforms):
+                    member.write(np.ascontiguousarray(values[sensor], dtype=dtype).tobytes())
+
+
+_WRITERS = {
+    'parquet': _write_parquet,
+    'csv': _write_csv,
+    'npz': _write_npz
+}
+
+
+def export_logfile(h5filepath: Path, output_dir: Path, sensors: list = None, windows: list = None,
+                   export_format: str = 'parquet', chunk_rows: int = 1_000_000, cuts: list = None,
+                   bandpass: tuple = None, detrend: str = None) -> list:
+    """
+        writes the selected sensors of one log file to output_dir, one file per time window
+        (start timestamp, seconds) and per cut number or one file for the whole log if neither is given,
+        at most chunk_rows rows are held in memory,
+        bandpass (f_low, f_high[, order]) filters the sensors with the sample frequency of the file,
+        detrend 'whole' removes one line per export file and 'window' one line per chunk
+    """
+    h5filepath = Path(h5filepath)
+    output_dir = Path(output_dir)
+    written = []
+
+    with LogFile(h5filepath) as logfile:
+        valid_sensors = [sensor for sensor in logfile.listValidSensorsNames() if sensor != 'TIME']
+
+        if sensors:
+            missing = [sensor for sensor in sensors if sensor not in valid_sensors]
+            if missing:
+                logging.warning(f'{h5filepath.name}: skip unknown or invalid sensors {missing}')
+            export_sensors = [sensor for sensor in sensors if sensor in valid_sensors]
+        else:
+            export_sensors = valid_sensors
+
+        targets = []
+        for start, seconds in windows or []:
+            start = pd.Timestamp(start)
+            index_slice = logfile.calculateTimeSlice(start, seconds)
+            targets.append((index_slice, f"{h5filepath.stem}_{start.strftime('%Y%m%d-%H%M%S')}_{seconds:g}s"))
+
+        for cut in cuts or []:
+            index_slice = logfile.getCutSlice(cut)
+            if index_slice is None:
+                logging.info(f'{h5filepath.name}: no cut {cut}')
+                continue
+            targets.append((index_slice, f'{h5filepath.stem}_cut{cut}'))
+
+        filter_bank = FilterBank(*bandpass[:2], logfile.Fs or logfile.estimateFs(), *bandpass[2:]) if bandpass else None
+        linear_detrend = LinearDetrend(rolling=(detrend == 'window')) if detrend else None
+
+        if not windows and not cuts:
+            targets = [(slice(0, logfile.n_sensorTime_data), h5filepath.stem)]
+
+        for index_slice, name in targets:
+            if index_slice.stop <= index_slice.start:
+                logging.info(f'{h5filepath.name}: no samples in window {name}')
+                continue
+
+            output_path = output_dir.joinpath(f'{name}.{export_format}')
+            _WRITERS[export_format](logfile, export_sensors, index_slice, output_path, chunk_rows,
+                                    filter_bank=filter_bank, detrend=linear_detrend)
+            written.append(output_path)
+
+    return written
+
+
+def export_logfiles(paths: list, output_dir: Path, sensors: list = None, windows: list = None,
+                    export_format: str = 'parquet', chunk_rows: int = 1_000_000, max_workers: int = 1, cuts: list = None,
+                    bandpass: tuple = None, detrend: str = None):
+    """
+        exports files and directories with a process pool, yields (log file, written files, error)
+        in order of completion
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'unknown export format {export_format}, use one of {EXPORT_FORMATS}')
+    if detrend is not None and detrend not in DETREND_MODES:
+        raise ValueError(f'unknown detrend mode {detrend}, use one of {DETREND_MODES}')
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    logfile_paths = expand_logfile_paths(paths)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(export_logfile, h5filepath, output_dir, sensors, windows, export_format, chunk_rows,
+                                   cuts, bandpass, detrend): h5filepath
+                   for h5filepath in logfile_paths}
+
+        for future in as_completed(futures):
+            # any failure stays with its file, the other files of the batch go on
+            try:
+                written, error = future.result(), None
+            except Exception as e:
+                written, error = [], e
+
+            yield futures[future], written, error
@@ -0,0 +1,131 @@
+import numpy as np
+
+from scipy.signal import sosfilt
+
+from ._helper import butter_bandpass_sos, sos_initial_state, butter_bandpass_settling, butter_bandpass_filter
+
+
+def _ffill_columns(block: np.ndarray, last_values: np.ndarray) -> np.ndarray:
+    """forward fills NaN per column, NaN at the top take last_values of the previous block"""
+    block = np.concatenate((last_values[np.newaxis], block))
+
+    valid = ~np.isnan(block)
+    if valid.all():
+        return block[1:]
+
+    idx = np.where(valid, np.arange(block.shape[0])[:, np.newaxis], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+
+    filled = np.take_along_axis(block, idx, axis=0)[1:]
+
+    # columns without any valid value yet
+    return np.nan_to_num(filled)
+
+
+class FilterBank():
+    """
+        zero phase butterworth bandpass of many sensors at once, data is (samples, sensors),
+        the designs are cached by (f_low, f_high, Fs, order) and shared, they must not be modified
+
+        filter() works on data in memory, push()/flush() filter a long recording block by block:
+        the forward state is carried between blocks and the backward pass runs over the
+        settling time of the filter past every block, so the output trails the input by
+        that many samples
+    """
+
+    def __init__(self, f_low: float, f_high: float, Fs: float, order: int = 5):
+        self.f_low = float(f_low)
+        self.f_high = float(f_high)
+        self.Fs = float(Fs)
+        self.order = int(order)
+
+        self.sos = butter_bandpass_sos(self.f_low, self.f_high, self.Fs, self.order)
+        self.settling_samples = butter_bandpass_settling(self.f_low, self.f_high, self.Fs, self.order)
+
+        self.reset()
+
+    @classmethod
+    def fromPlotConfig(cls, plotconfig, Fs: float):
+        """filter bank of the 'plot bandpass filter' option or None if the option is not active"""
+        if plotconfig is None or 'plot bandpass filter' not in plotconfig.get_active_names():
+            return None
+
+        values = plotconfig.get_values_by_name('plot bandpass filter')
+
+        return cls(values['f_low'], values['f_high'], Fs, values.get('order', 5))
+
+    def filter(self, data: np.ndarray) -> np.ndarray:
+        """zero phase filtered copy of data in memory, NaN are forward filled first"""
+        data = np.asarray(data, dtype=np.float64)
+
+        if data.shape[0] == 0:
+            return data.copy()
+
+        columns = data.reshape(data.shape[0], -1)
+        columns = _ffill_columns(columns, np.full(columns.shape[1], np.nan))
+
+        return butter_bandpass_filter(columns, self.f_low, self.f_high, self.Fs, self.order).reshape(data.shape)
+
+    def reset(self):
+        """starts a new recording for push()"""
+        self.forward_state = None
+        self.last_values = None
+        # forward filtered samples that were not returned yet
+        self.pending = None
+        # sample shape of the pushed blocks, () for one sensor as 1D data
+        self.shape = ()
+        self.n_pushed = 0
+        self.n_emitted = 0
+
+    def push(self, block: np.ndarray) -> np.ndarray:
+        """filters the next block, returns the samples that are final, possibly none"""
+        block = np.asarray(block, dtype=np.float64)
+        self.shape = shape = block.shape[1:]
+
+        if block.shape[0] == 0:
+            return np.empty((0,) + shape)
+
+        columns = block.reshape(block.shape[0], -1)
+
+        if self.forward_state is None:
+            self.last_values = np.full(columns.shape[1], np.nan)
+        columns = _ffill_columns(columns, self.last_values)
+        self.last_values = columns[-1]
+
+        if self.forward_state is None:
+            self.forward_state = sos_initial_state(self.sos, columns[0])
+
+        forward, self.forward_state = sosfilt(self.sos, columns, axis=0, zi=self.forward_state)
+
+        self.pending = forward if self.pending is None else np.concatenate((self.pending, forward))
+        self.n_pushed += columns.shape[0]
+
+        n_final = self.pending.shape[0] - self.settling_samples
+        if n_final <= 0:
+            return np.empty((0,) + shape)
+
+        return self._backward(n_final).reshape((n_final,) + shape)
+
+    def flush(self) -> np.ndarray:
+        """returns the rest of the recording, the filter can be used again afterwards"""
+        shape = self.shape
+        n_final = 0 if self.pending is None else self.pending.shape[0]
+
+        values = self._backward(n_final) if n_final > 0 else np.empty(0)
+
+        self.reset()
+
+        return values.reshape((n_final,) + shape)
+
+    def _backward(self, n_final: int) -> np.ndarray:
+        """backward pass over all pending samples, the first n_final of them are returned"""
+        reversed_pending = self.pending[::-1]
+
+        backward, _ = sosfilt(self.sos, reversed_pending, axis=0, zi=sos_initial_state(self.sos, reversed_pending[0]))
+
+        values = backward[::-1][:n_final]
+
+        self.pending = self.pending[n_final:]
+        self.n_emitted += n_final
+
+        return values
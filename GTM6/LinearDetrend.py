@@ -0,0 +1,113 @@
+import numpy as np
+
+from ._helper import LR_sums, LR_solve, LR_predict
+
+
+class LinearDetrend():
+    """
+        removes a least squares line from many sensors at once, data is (samples, sensors)
+        against TIME in microseconds or against the sample position if no TIME is given
+
+        the regression sums are accumulated block by block, so a long recording is fitted in
+        one streaming pass and detrended in a second one without holding it in memory,
+        with rolling=True every window (block) gets its own line instead
+    """
+
+    def __init__(self, rolling: bool = False):
+        self.rolling = rolling
+
+        self.reset()
+
+    @classmethod
+    def fromPlotConfig(cls, plotconfig):
+        """detrend of the 'remove linear trend' option or None if the option is not active"""
+        if plotconfig is None or 'remove linear trend' not in plotconfig.get_active_names():
+            return None
+
+        return cls()
+
+    def reset(self):
+        self.sums = None
+        self.theta = None
+        # first TIME value, all times are fitted relative to it in seconds
+        self.time_origin = None
+        self.n_samples = 0
+        # sample shape of the data, () for one sensor as 1D data
+        self.shape = ()
+
+    def _positions(self, n_rows: int, time_us: np.ndarray) -> np.ndarray:
+        if time_us is None:
+            return np.arange(self.n_samples, self.n_samples + n_rows, dtype=np.float64)
+
+        if self.time_origin is None:
+            self.time_origin = int(time_us[0])
+
+        return (np.asarray(time_us, dtype=np.int64) - self.time_origin) * 1e-6
+
+    def accumulate(self, data: np.ndarray, time_us: np.ndarray = None):
+        """adds one block to the regression sums, NaN samples of a sensor are left out of its fit"""
+        data = np.asarray(data, dtype=np.float64)
+
+        if data.shape[0] == 0:
+            return
+
+        positions = self._positions(data.shape[0], time_us)
+        self.n_samples += data.shape[0]
+
+        columns = data.reshape(data.shape[0], -1)
+        valid = ~np.isnan(columns)
+
+        if valid.all():
+            n, x_sum, xx, y_sum, xy = LR_sums(positions, columns)
+            block_sums = (np.full(columns.shape[1], float(n)), np.repeat(x_sum, columns.shape[1]),
+                          np.repeat(xx.ravel(), columns.shape[1]), y_sum, xy[0])
+        else:
+            weights = valid.astype(np.float64)
+            values = np.where(valid, columns, 0.0)
+            block_sums = (weights.sum(axis=0), positions.dot(weights), (positions * positions).dot(weights),
+                          values.sum(axis=0), positions.dot(values))
+
+        self.shape = data.shape[1:]
+        self.sums = block_sums if self.sums is None else tuple(total + block for total, block in zip(self.sums, block_sums))
+
+    def solve(self) -> np.ndarray:
+        """(intercept, slope) per sensor from the accumulated sums, a sensor without data keeps its values"""
+        if self.sums is None:
+            raise ValueError('no data accumulated')
+
+        n, x_sum, xx, y_sum, xy = self.sums
+
+        # NaN samples differ per sensor, so every sensor has its own sums with one feature
+        self.theta = np.zeros((2, n.shape[0]))
+        for i in range(n.shape[0]):
+            if n[i] * xx[i] - x_sum[i] * x_sum[i] > 0:
+                self.theta[:, i] = LR_solve((n[i], x_sum[i:i + 1], xx[i].reshape(1, 1), y_sum[i], xy[i:i + 1]))
+            elif n[i] > 0:
+                # a single position, the line is flat
+                self.theta[0, i] = y_sum[i] / n[i]
+
+        return self.theta.reshape((2,) + self.shape)
+
+    def fit(self, data: np.ndarray, time_us: np.ndarray = None) -> np.ndarray:
+        self.reset()
+        self.accumulate(data, time_us)
+        return self.solve()
+
+    def apply(self, data: np.ndarray, time_us: np.ndarray = None, position: int = 0) -> np.ndarray:
+        """
+            data minus the fitted line, position is the sample position of the first row
+            when no TIME is given
+        """
+        data = np.asarray(data, dtype=np.float64)
+
+        if time_us is None:
+            positions = np.arange(position, position + data.shape[0], dtype=np.float64)
+        else:
+            positions = (np.asarray(time_us, dtype=np.int64) - self.time_origin) * 1e-6
+
+        return data - LR_predict(positions, self.theta).reshape(data.shape)
+
+    def detrend(self, data: np.ndarray, time_us: np.ndarray = None) -> np.ndarray:
+        """fits and removes the line of data in memory, one window of the rolling mode"""
+        self.fit(data, time_us)
+        return self.apply(data, time_us)
@@ -1,22 +1,15 @@
 
 import h5py
+import mmap
 import logging
 
 from pathlib import Path
 import numpy as np
-from scipy.signal import spectrogram
 
 import pandas as pd
 
 import seaborn as sns
 
-import matplotlib
-
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-import matplotlib.dates as mdates
-import matplotlib.style as mplstyle
-
 import plotly.express as px
 
 from datetime import datetime, timedelta
@@ -24,60 +17,107 @@ from datetime import datetime, timedelta
 
 from . import CutEdges, PlotConfig
 
-
-from ._helper import LR_fit, LR_predict
+from .TimeIndex import TimeIndex
+from .Pyramid import MinMaxPyramid, minmax_decimate
+from .BlockCache import shared_block_cache
+from .SpectrumCache import shared_spectrum_cache
+from .SensorPlotter import SensorPlotter
+from .LinearDetrend import LinearDetrend
+from .SpectrumEngine import SpectrumEngine
+from .Tracer import shared_tracer
+from .ColumnPool import ColumnPool
+from .Cuts import load_cuts_records, cut_table_from_records, cut_table_from_edges, load_cut_table_sidecar, save_cut_table_sidecar
 
 
-mplstyle.use('fast')
+from ._helper import timestamp_to_us, file_fingerprint, ffill_nan, memmap_dataset, SmoothedGradient
 
-matplotlib.use('TkAgg')
 
 class InvalidGTM6LogFileException(Exception):
     pass
 
 # ################################################################################################################################
-class LogFile(h5py.File):
+class LogFile(h5py.File, SensorPlotter):
 
+    # contiguous sensors are read through memory maps, False reads everything with h5py
+    USE_MEMMAP = True
 
-    def __init__(self, h5filepath: Path, plotconfig: PlotConfig=None):
+    def __init__(self, h5filepath: Path, plotconfig: PlotConfig=None, swmr: bool = False):
         
         self.h5filepath = h5filepath
+        # opened as SWMR reader of a file that is still written, see refresh
+        self.swmr = swmr
+        # identifies the file content in the shared block cache
+        self.fileKey = file_fingerprint(self.h5filepath)
+        self.blockCache = shared_block_cache
+        self.spectrumCache = shared_spectrum_cache
+        # window columns, filled in place by every load
+        self.columnPool = ColumnPool()
+        # float sensors of the window as float32, see setPlotConfig
+        self.windowFloat32 = False
+        # read-only memory maps of contiguous sensors, None for the others, see getMemmap
+        self.memmaps = {}
         
-        super().__init__(self.h5filepath, 'r')
-
-        try:
-            self.sensorGroup = self['GTM6']['LOG']
-
-            self.sensorValidListIdx = [] 
-            self.sensorList = list(self.sensorGroup.keys()) 
-
-            # every sensor vector should have the same length, with lenght of time-vector being the expected lenght 
-            self.n_sensorTime_data = self['GTM6']['LOG']['TIME'].shape[0]
-
-            for sensor in self.sensorGroup:
-                self.sensorValidListIdx.append((self.sensorGroup[sensor].shape[0] == self.n_sensorTime_data))
+        with shared_tracer.span('open', file=self.h5filepath.name):
+            try:
+                super().__init__(self.h5filepath, 'r', swmr=self.swmr)
+            except OSError:
+                if self.swmr:
+                    raise
+                # a file that is still written can only be opened as SWMR reader
+                super().__init__(self.h5filepath, 'r', swmr=True)
+                self.swmr = True
+
+            try:
+                self.sensorGroup = self['GTM6']['LOG']
+
+                self.sensorValidListIdx = [] 
+                self.sensorList = list(self.sensorGroup.keys()) 
+
+                # every sensor vector should have the same length, with lenght of time-vector being the expected lenght 
+                self.n_sensorTime_data = self['GTM6']['LOG']['TIME'].shape[0]
+
+                for sensor in self.sensorGroup:
+                    self.sensorValidListIdx.append(self.sensorLengthIsValid(self.sensorGroup[sensor].shape[0]))
+
+                # coarse TIME index, loaded from the sidecar cache if the file was seen before
+                self.timeIndex = TimeIndex(self.sensorGroup['TIME'], self.h5filepath)
         
         
-        except KeyError as ke:
-            raise InvalidGTM6LogFileException(f'{self.h5filepath} not a valid GTM6 log file')
+            except KeyError as ke:
+                raise InvalidGTM6LogFileException(f'{self.h5filepath} not a valid GTM6 log file')
         
         try:
             self.cutGroup = self['GTM6']['CUTS']
 
         except KeyError as ke:
+            self.cutGroup = None
             logging.debug(f'gtm6 log {self.h5filepath} has no cuts information')
 
+        # raw CUTS records and cut -> index table, see loadCutsData
+        self.cutsData = None
+        self.cutTable = None
 
-        self.plotconfig = plotconfig
 
-        self.Fs = self.plotconfig.get_values_by_name('sample frequency')['Fs']
+        self.setPlotConfig(plotconfig)
+
+        # without a plot config (headless export) the sample frequency is unknown
+        sample_values = self.plotconfig.get_values_by_name('sample frequency') if self.plotconfig is not None else None
+        self.Fs = sample_values['Fs'] if sample_values else None
 
         # load time information
         self.data_start_time = None
         self.data_plot_start_time = None
         self.data_end_time = None
         self.dataFrameTSIndex = None
-        self.dataFrame = pd.DataFrame()
+        self.dataSlice = None
+        # numpy columns of the loaded window in file order, TIME included, views into columnPool
+        self.windowData = {}
+        # pandas view of windowData, built by the dataFrame property on first use
+        self._dataFrame = None
+        # min/max pyramids per sensor, built on first use
+        self.pyramids = {}
+        # graver edges of the whole file, see CutEdges.find_edges_in_file
+        self.cutEdges = None
         #self.loadTimeData()
 
 
@@ -99,12 +139,74 @@ class LogFile(h5py.File):
         else:
             return self.data_end_time
  
+    @property
+    def dataFrame(self) -> pd.DataFrame:
+        """
+            the loaded window as DataFrame with a TIME index, sorted by time and forward filled,
+            built from windowData on first use after a load
+        """
+        if self._dataFrame is None:
+            self._dataFrame = self.buildDataFrame()
+        return self._dataFrame
+
+    def buildDataFrame(self) -> pd.DataFrame:
+        if 'TIME' not in self.windowData:
+            return pd.DataFrame()
+
+        self.dataFrameTSIndex = pd.to_datetime(self.windowData['TIME'], unit='us')
+
+        # copied, the pool buffers are overwritten by a later load
+        data = {label: values for label, values in self.windowData.items() if label != 'TIME'}
+        frame = pd.DataFrame(data=data, index=self.dataFrameTSIndex)
+
+        if not self.timeIsMonotonicIncreasing():
+            frame.sort_index(inplace=True)
+
+        # estimated_value = value_1 + (timestamp - timestamp_1) * ((value_2 - value_1) / (timestamp_2 - timestamp_1))
+        #frame.interpolate(method='time', inplace=True) #fillna(method='ffill', inplace=True)
+        frame.ffill(inplace=True)
+
+        return frame
+
     def getSensorDataFrame(self) -> pd.DataFrame:
         return self.dataFrame
+
+    def windowColumns(self, sensor_labels: list) -> tuple:
+        """
+            TIME in µs and a dict of the sensors of sensor_labels of the loaded window as numpy arrays,
+            sorted by time and forward filled like dataFrame, without building it
+        """
+        times = self.windowData.get('TIME', np.empty(0, dtype=np.int64))
+        order = None if self.timeIsMonotonicIncreasing() else np.argsort(times, kind='stable')
+
+        columns = {}
+        for label in dict.fromkeys(sensor_labels):
+            values = self.windowData[label] if order is None else self.windowData[label][order]
+            columns[label] = ffill_nan(values, fill_leading=False) if values.dtype.kind == 'f' else values
+
+        return (times if order is None else times[order]), columns
+
+    def getWindowBounds(self):
+        """first and last timestamp of the loaded window from its TIME column, None if nothing is loaded"""
+        times = self.windowData.get('TIME')
+        if times is None or times.shape[0] == 0:
+            return None
+        return pd.to_datetime(times.min(), unit='us'), pd.to_datetime(times.max(), unit='us')
+
+    def windowRows(self) -> int:
+        """rows of the loaded window without building the DataFrame"""
+        return len(self.windowData['TIME']) if 'TIME' in self.windowData else 0
     
     def getLogFileFilePath(self) -> Path:
         return self.h5filepath
 
+    def getPlotTitle(self) -> str:
+        return self.h5filepath.name
+
+    def sensorLengthIsValid(self, n_sensor_data: int) -> bool:
+        """a sensor must be as long as TIME, in a file that is still written it may be ahead of TIME"""
+        return n_sensor_data == self.n_sensorTime_data or (self.swmr and n_sensor_data > self.n_sensorTime_data)
+
     def listValidSensorsIdx(self):
         return [i for i, x in enumerate(self.sensorList) if self.sensorValidListIdx[i] == 1]
     
@@ -115,17 +217,135 @@ class LogFile(h5py.File):
     
     def setPlotConfig(self, plotconfig: PlotConfig):
         self.plotconfig = plotconfig
+
+        if self.plotconfig is None:
+            return
+
+        float32 = 'float32 window' in self.plotconfig.get_active_names()
+        if float32 != self.windowFloat32:
+            self.windowFloat32 = float32
+            # the next load reads the window again in the new precision
+            self.dataSlice = None
+            self.windowData = {}
+            self._dataFrame = None
+
+        cache_values = self.plotconfig.get_values_by_name('block cache')
+        if cache_values:
+            self.blockCache.setMaxBytes(int(float(cache_values['MB']) * 2**20))
+
+        spectrum_values = self.plotconfig.get_values_by_name('spectrum')
+        if spectrum_values and 'cache MB' in spectrum_values:
+            self.spectrumCache.setMaxBytes(int(float(spectrum_values['cache MB']) * 2**20))
+
+    def getCacheStats(self) -> dict:
+        """hit and miss counters of the shared block cache"""
+        return self.blockCache.stats()
+
+    def getMemmap(self, sensor_label: str) -> np.ndarray:
+        """memory map of a contiguous, unfiltered sensor dataset, None for chunked or compressed ones"""
+        if sensor_label not in self.memmaps:
+            self.memmaps[sensor_label] = memmap_dataset(self.sensorGroup[sensor_label]) if self.USE_MEMMAP else None
+        return self.memmaps[sensor_label]
+
+    def readSlice(self, sensor_label: str, index_slice: slice, out: np.ndarray = None, progress=None) -> np.ndarray:
+        """
+            sensor values of an index slice, a read-only view for memory mapped sensors (copied if out is given),
+            else served from the shared block cache where possible, see BlockCache.read for progress
+        """
+        memmap = self.getMemmap(sensor_label)
+
+        if memmap is not None:
+            # the OS page cache takes the place of the block cache
+            if out is None:
+                return memmap[index_slice]
+            out[...] = memmap[index_slice]
+            return out
+
+        if self.swmr:
+            # the last block of a growing file would go stale in the block cache
+            if out is None:
+                return shared_tracer.read(self.sensorGroup[sensor_label], index_slice)
+            shared_tracer.readDirect(self.sensorGroup[sensor_label], out, index_slice)
+            return out
+
+        return self.blockCache.read(self.fileKey, sensor_label, self.sensorGroup[sensor_label], index_slice.start, index_slice.stop, out,
+                                    progress)
+
+    def readColumn(self, sensor_label: str, index_slice: slice) -> np.ndarray:
+        """sensor values of an index slice past the block cache, a read-only view for memory mapped sensors"""
+        memmap = self.getMemmap(sensor_label)
+
+        if memmap is not None:
+            return memmap[index_slice]
+
+        return shared_tracer.read(self.sensorGroup[sensor_label], index_slice)
+
+    def prefetchSlice(self, sensor_label: str, index_slice: slice):
+        """brings an index slice into the block cache, or into the page cache for memory mapped sensors"""
+        if self.swmr:
+            # a growing file is read past the block cache, there is nothing to keep
+            return
+
+        memmap = self.getMemmap(sensor_label)
+
+        if memmap is None:
+            self.readSlice(sensor_label, index_slice)
+            return
+
+        # one value per page is enough to fault the whole page in
+        step = max(1, mmap.PAGESIZE // memmap.dtype.itemsize)
+        np.add.reduce(memmap[index_slice][::step])
+
+    def columnDtype(self, sensor_label: str) -> np.dtype:
+        """dtype of a window column, float sensors are float32 in the float32 window mode"""
+        dtype = self.sensorGroup[sensor_label].dtype
+        if self.windowFloat32 and dtype.kind == 'f':
+            return np.dtype(np.float32)
+        return dtype
     
     def setPlotStartTime(self, starttimestamp: np.datetime64):
         self.data_plot_start_time  = starttimestamp
     
     
     def loadTimeBoundarys(self):
-        """loads min and max datime time from database"""
-        self.data_start_time =  pd.to_datetime(self.sensorGroup['TIME'][0], unit='us')
-        self.data_end_time = pd.to_datetime(self.sensorGroup['TIME'][-1], unit='us')
+        """loads min and max datime time from the time index"""
+        with shared_tracer.span('bounds', file=self.h5filepath.name):
+            self.data_start_time =  pd.to_datetime(self.timeIndex.getStartTime(), unit='us')
+            self.data_end_time = pd.to_datetime(self.timeIndex.getEndTime(), unit='us')
 
     
+    def refresh(self) -> int:
+        """
+            refreshes the extents of a file opened with swmr, the time index and the time boundarys
+            are extended by the appended rows, returns the number of new rows
+        """
+        if not self.swmr:
+            return 0
+
+        with shared_tracer.span('refresh', file=self.h5filepath.name) as attributes:
+            # TIME first, the writer flushes it last, so the sensors are at least as long,
+            # it is refreshed once through the handle of the time index, a second refresh
+            # through another handle leaves stale chunks behind
+            self.timeIndex.time_dataset.refresh()
+            for sensor in self.sensorList:
+                if sensor != 'TIME':
+                    self.sensorGroup[sensor].refresh()
+
+            n_new = self.timeIndex.time_dataset.shape[0] - self.n_sensorTime_data
+            attributes['rows'] = n_new
+
+            if n_new <= 0:
+                return 0
+
+            self.n_sensorTime_data += n_new
+            self.sensorValidListIdx = [self.sensorLengthIsValid(self.sensorGroup[sensor].shape[0]) for sensor in self.sensorList]
+
+            self.timeIndex.extend(self.n_sensorTime_data)
+            if self.data_start_time is not None:
+                self.loadTimeBoundarys()
+
+        return n_new
+
     def loadTimeData(self):
         """loads TIME vector from database"""
         times = pd.to_datetime(self.sensorGroup['TIME'][:], unit='us') 
@@ -138,165 +358,316 @@ class LogFile(h5py.File):
     
         
     def sensorIsInData(self, sensor_label: str) -> bool:
-        return sensor_label in self.dataFrame.columns
+        return sensor_label != 'TIME' and sensor_label in self.windowData
     
     def timeIsMonotonicIncreasing(self) -> bool:
-        return self.dataFrame.index.is_monotonic_increasing
+        times = self.windowData.get('TIME')
+        return times is None or bool(np.all(times[1:] >= times[:-1]))
     
     def loadCutsData(self):
+        """
+            bulk loads the CUTS group and builds the cut -> (start index, stop index) table,
+            files without CUTS get the table from detected graver edges, cached in a sidecar
+        """
+        if self.cutTable is not None:
+            return
+
         if not self.cutGroup is None:
-            pass
+            self.cutsData = load_cuts_records(self.cutGroup)
+            try:
+                self.cutTable = cut_table_from_records(self.cutsData, self.timeIndex)
+            except ValueError as ve:
+                logging.warning(f'gtm6 log {self.h5filepath}: {ve}, the cuts are taken from the graver edges')
+                self.cutTable = None
+
+            if self.cutTable is not None and self.cutTable.shape[0] > 0:
+                return
+
+        cut_edges = self.cutEdges
+        if cut_edges is None:
+            cut_options = self.plotconfig.get_values_by_name('cut edges') if self.plotconfig is not None else None
+            cut_edges = CutEdges.CutEdges(options=cut_options, Fs=self.Fs or self.estimateFs())
+
+        self.cutTable = load_cut_table_sidecar(self.h5filepath, cut_edges.options)
+
+        if self.cutTable is None:
+            if self.cutEdges is None:
+                cut_edges.find_edges_in_file(self)
+                self.cutEdges = cut_edges
+
+            self.cutTable = cut_table_from_edges(self.cutEdges.edges, self.timeIndex.getStartTime())
+            save_cut_table_sidecar(self.h5filepath, self.cutEdges.options, self.cutTable)
+
+    def getCutTable(self) -> np.ndarray:
+        self.loadCutsData()
+        return self.cutTable
+
+    def getCutSlice(self, cut: int) -> slice:
+        """index slice of a cut number, None if the file has no such cut"""
+        table = self.getCutTable()
+        rows = table[table['cut'] == cut]
+
+        if rows.shape[0] == 0:
+            return None
+
+        return slice(int(rows['idx_start'][0]), int(rows['idx_stop'][0]))
+
+    def getCutTimes(self, cut: int):
+        """start and end timestamp of a cut number, None if the file has no such cut"""
+        table = self.getCutTable()
+        rows = table[table['cut'] == cut]
+
+        if rows.shape[0] == 0:
+            return None
+
+        return pd.to_datetime(rows['time_start'][0], unit='us'), pd.to_datetime(rows['time_stop'][0], unit='us')
+
+    def estimateFs(self) -> float:
+        """sample frequency from the time index, used when no plot config is given"""
+        start, end = self.timeIndex.getStartTime(), self.timeIndex.getEndTime()
+        if start is None or end is None or end <= start:
+            return 1.0
+        return (self.n_sensorTime_data - 1) / ((end - start) * 1e-6)
 
     
-    def loadSensorData(self, data_label_list: list, duration_s: int = 120, reload_anyway: bool = False):
+    def spliceSensorWindow(self, sensor_label: str, new_slice: slice, out: np.ndarray = None, progress=None) -> np.ndarray:
         """
+            values of a sensor in new_slice written into out (a new array if None),
+            the overlap with the loaded window is copied and only the missing head and tail are read,
+            progress(fraction, sensor) is called during the reads and may raise to cancel
+        """
+        if out is None:
+            out = np.empty(new_slice.stop - new_slice.start, dtype=self.columnDtype(sensor_label))
+
+        if self.dataSlice is None or sensor_label not in self.windowData:
+            return self.readSlice(sensor_label, new_slice, out, progress)
+
+        loaded = self.windowData[sensor_label]
+        keep_start = max(self.dataSlice.start, new_slice.start)
+        keep_stop = min(self.dataSlice.stop, new_slice.stop)
+
+        if keep_start >= keep_stop:
+            return self.readSlice(sensor_label, new_slice, out, progress)
+
+        n_head = max(keep_start - new_slice.start, 0)
+        n_tail = max(new_slice.stop - keep_stop, 0)
+
+        def part_progress(rows_before: int, rows: int):
+            # the head and the tail share the fraction of the sensor by their rows
+            if progress is None:
+                return None
+            return lambda fraction, text: progress((rows_before + fraction * rows) / (n_head + n_tail), text)
+
+        if n_head > 0:
+            self.readSlice(sensor_label, slice(new_slice.start, keep_start), out[:n_head], part_progress(0, n_head))
+
+        out[keep_start - new_slice.start:keep_stop - new_slice.start] = loaded[keep_start - self.dataSlice.start:keep_stop - self.dataSlice.start]
+
+        if n_tail > 0:
+            self.readSlice(sensor_label, slice(keep_stop, new_slice.stop), out[keep_stop - new_slice.start:], part_progress(n_head, n_tail))
+
+        return out
+
+    def loadSensorData(self, data_label_list: list, duration_s: int = 120, reload_anyway: bool = False, progress=None):
+        """
+            loads the sensors of data_label_list for the plot window,
+            a moved or resized window only reads the difference to the loaded one,
+            progress(fraction, text) is called during the reads of every sensor and may raise to cancel,
+            the loaded window stays unchanged then
         """
         if len(data_label_list) < 1:
             return
-        
 
+        time_slice = self.calculateTimeSlice(self.data_plot_start_time, duration_s)
 
-        delta = timedelta(seconds = duration_s)
-        tresh_l = int((self.data_plot_start_time).timestamp() * 1e6)
-        tresh_h = int((self.data_plot_start_time + delta).timestamp() * 1e6)
+        if reload_anyway:
+            self.windowData = {}
+            self.dataSlice = None
+            self._dataFrame = None
 
-        data = {}
+        if time_slice == self.dataSlice and all(label in self.windowData for label in data_label_list):
+            return
 
-        mask = np.logical_and(self.sensorGroup['TIME'][:] > tresh_l ,self.sensorGroup['TIME'][:] < tresh_h)
+        labels = ['TIME'] + [label for label in dict.fromkeys(data_label_list) if label != 'TIME']
 
-        if reload_anyway:
-            self.dataFrame = pd.DataFrame()
-
-        if self.dataFrameTSIndex is None or reload_anyway:
-            self.dataFrameTSIndex = pd.to_datetime(self.sensorGroup['TIME'][:][mask], unit='us')
-
-        for label in data_label_list:
-            if reload_anyway or (not self.sensorIsInData(label)):
-                if label != 'TIME':
-                    # apply mask
-                    data[label] = self.sensorGroup[label][mask]
-            
-        if data:
-            tmp_dataFrame = pd.DataFrame(data=data, index=self.dataFrameTSIndex).sort_index()
-            #tmp_dataFrame.set_index(self.dataFrameTSIndex, inplace=True) 
-            #tmp_dataFrame.sort_index(inplace=True)      
-            self.dataFrame = pd.concat([self.dataFrame, tmp_dataFrame], axis = 1)
+        with shared_tracer.span('window load', file=self.h5filepath.name, sensors=len(labels),
+                                rows=time_slice.stop - time_slice.start):
+            n_rows = time_slice.stop - time_slice.start
 
-        if reload_anyway:
-            # have to do this last
-            self.dataFrame.set_index(self.dataFrameTSIndex, inplace=True)
-            self.dataFrame.sort_index(inplace=True)
+            # memory mapped sensors are views into the file, the others are spliced from the
+            # current generation of the pool into the next one
+            window_data = {}
+            for i, label in enumerate(labels):
+                memmap = self.getMemmap(label)
 
-        # estimated_value = value_1 + (timestamp - timestamp_1) * ((value_2 - value_1) / (timestamp_2 - timestamp_1))
-        #self.dataFrame.interpolate(method='time', inplace=True) #fillna(method='ffill', inplace=True)
-        self.dataFrame.ffill(inplace=True)
+                if memmap is not None and memmap.dtype == self.columnDtype(label):
+                    window_data[label] = memmap[time_slice]
+                else:
+                    sensor_progress = None
+                    if progress is not None:
+                        sensor_progress = lambda fraction, text, i=i: progress((i + fraction) / len(labels), text)
+
+                    out = self.columnPool.column(label, n_rows, self.columnDtype(label))
+                    window_data[label] = self.spliceSensorWindow(label, time_slice, out, sensor_progress)
+
+                if progress is not None:
+                    progress((i + 1) / len(labels), label)
 
+        self.columnPool.swap()
+        self.windowData = window_data
+        self.dataSlice = time_slice
+        self._dataFrame = None
 
-    def plotSensors(self, data_x_label_list: list, data_y_label_list: list):
+
+    def followSensorData(self, data_label_list: list, duration_s: int = 120, progress=None) -> int:
         """
+            refreshes a file opened with swmr and moves the window to its last duration_s seconds,
+            only the appended rows are read, the rest is spliced from the loaded window,
+            returns the number of new rows
         """
+        n_new = self.refresh()
 
-        active_plot_options = self.plotconfig.get_active_names()
+        if n_new == 0 and self.dataSlice is not None and all(label in self.windowData for label in data_label_list):
+            return 0
 
-        if len(data_x_label_list) > 1:
-            return
-        
-        n_plots = len(data_y_label_list)
-        # data_x_label_list is a list so we can maybe add multiple X axis support later
-        data_x_label = data_x_label_list[0]
-        # try loading missing data
-        
-        logging.debug(active_plot_options)
-        
-        # begin plotting
-        fig, ax1 = plt.subplots()
-        fig.set_size_inches(8 + (n_plots * 2), 8)
+        if self.data_start_time is None:
+            self.loadTimeBoundarys()
 
-        axis_list = [ax1.twinx() for _ in range(n_plots - 1)]
-        axis_list.insert(0, ax1)
+        end_us = self.timeIndex.getEndTime()
+        if end_us is None:
+            # nothing written yet
+            return 0
 
-        filtered_device = self.dataFrame.copy()
+        # the window excludes its start, so the last sample is the last one inside
+        self.setPlotStartTime(pd.to_datetime(end_us + 1 - int(duration_s * 1e6), unit='us'))
+        self.loadSensorData(data_label_list, duration_s, progress=progress)
 
-        offset = 0
+        return n_new
 
-        ax1.set_title(f"""{self.h5filepath.name}
-                        {data_x_label_list} vs {data_y_label_list}
-                        {self.dataFrame.index.min()} -> {self.dataFrame.index.max()}""")
+    def getPyramid(self, sensor_label: str, progress=None) -> MinMaxPyramid:
+        if sensor_label not in self.pyramids:
+            self.pyramids[sensor_label] = MinMaxPyramid(self.sensorGroup[sensor_label], self.h5filepath, sensor_label, progress)
+        return self.pyramids[sensor_label]
 
-        for axn, data_y_label, color in zip(axis_list, data_y_label_list, list(mcolors.TABLEAU_COLORS)):
+    def getPlotEnvelope(self, sensor_label: str, max_points: int, progress=None):
+        """
+            TIME and min/max envelope of a sensor over the loaded window with at most max_points points,
+            returns None if the window is small enough to be drawn raw, progress(fraction, text) is
+            called while a pyramid is built and may raise to cancel
+        """
+        if self.dataSlice is None or self.windowRows() <= max_points:
+            return None
 
-            ######################################
-            if data_y_label == 'GRAVER_Z' and 'plot smoothed gradient' in active_plot_options:
+        if self.swmr:
+            # the pyramid of a growing file would be built from the whole file on every refresh,
+            # the window in memory is reduced instead
+            times, columns = self.windowColumns([sensor_label])
+            x_plot, y_plot = minmax_decimate(times, columns[sensor_label], max_points)
+            return pd.to_datetime(x_plot, unit='us'), y_plot
 
-                ms = int(self.plotconfig.get_values_by_name('plot smoothed gradient')['lookahead ms'])
+        envelope = self.getPyramid(sensor_label, progress).getEnvelope(self.dataSlice.start, self.dataSlice.stop, max_points)
 
-                delta = pd.Timedelta(milliseconds=ms)
+        if envelope is None:
+            return None
 
-                shift_periods = int(self.plotconfig.get_values_by_name('plot smoothed gradient')['shift'])
+        _, sensor_min, sensor_max = envelope
+        # TIME is monotonic, so the bucket minimum is the bucket start time
+        _, time_start, _ = self.getPyramid('TIME', progress).getEnvelope(self.dataSlice.start, self.dataSlice.stop, max_points)
 
-                #logging.debug(f'{self.timeIsMonotonicIncreasing()}, {delta} {shift_periods}')
+        x_plot = pd.to_datetime(np.repeat(time_start, 2), unit='us')
+        y_plot = np.column_stack((sensor_min, sensor_max)).ravel()
 
-                offset = np.mean(np.nan_to_num(filtered_device[data_y_label].to_numpy()))
+        return x_plot, y_plot
 
-                filtered_device[data_y_label] = (filtered_device[data_y_label].rolling(window = delta).mean()).shift( -shift_periods)
+    def getSpectrum(self, sensor_labels: list, engine: SpectrumEngine, max_columns: int, progress=None):
+        """
+            spectrogram of the loaded window with at most max_columns columns, returns
+            (frequencies, column times, power) with power as (frequencies, columns, sensors),
+            windows with more than BIN_FRAMES frames per column are assembled from cached tiles,
+            progress(fraction, text) is called after every tile
+        """
+        with shared_tracer.span('spectrum', file=self.h5filepath.name, sensors=len(sensor_labels), columns=max_columns):
+            index_slice = self.dataSlice
+            bin_frames = self.spectrumCache.BIN_FRAMES
 
-                filtered_device[f'{data_y_label}_GRAD'] = np.gradient((filtered_device[data_y_label] - offset) * 500) 
-                filtered_device[f'{data_y_label}_GRAD_AVG'] = filtered_device[f'{data_y_label}_GRAD'].rolling(window = delta).mean().shift( -shift_periods)
+            if engine.countFrames(index_slice.stop - index_slice.start) < max_columns * bin_frames:
+                window_times, columns = self.windowColumns(sensor_labels)
+                samples = np.column_stack([columns[label] for label in sensor_labels]).astype(np.float64)
 
-            ######################################
-            if data_x_label == 'TIME':
-                axn.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y %H:%M:%S.%f'))
-                fig.autofmt_xdate()
+                frequencies, times, power = engine.spectrogram(samples, max_columns)
 
-                idx = np.arange(len(self.dataFrame.index))
+                positions = np.clip(np.round(times * engine.Fs).astype(np.int64), 0, len(window_times) - 1)
 
-                x_plot = self.dataFrame.index
-            elif data_x_label == 'INDEX':
-                x_plot = idx 
+                return frequencies, pd.to_datetime(window_times[positions], unit='us'), power
 
-            else:
-                x_plot = self.dataFrame[data_x_label]
+            # bins of the file frame grid with a frame inside the window
+            first_bin = -(-index_slice.start // engine.step) // bin_frames
+            stop_bin = -(-((index_slice.stop - engine.nperseg) // engine.step + 1) // bin_frames)
 
-            axn.plot(x_plot, self.dataFrame[data_y_label], color=color, label=data_y_label)
+            sums, counts = self.loadSpectrumBins(sensor_labels, engine, first_bin, stop_bin, progress)
 
-            if data_y_label == 'GRAVER_Z' and 'plot smoothed gradient' in active_plot_options:
-                pass
-                #axn.plot(x_plot, filtered_device[data_y_label], color='r', label='')
-                #axn.plot(x_plot, filtered_device[f'{data_y_label}_GRAD'] + offset, color='grey', label='')
-                axn.plot(x_plot, filtered_device[f'{data_y_label}_GRAD_AVG'] + offset, color='black', label='GRAVER_Z smoothed gradient')
-            axn.set_xlabel(data_x_label)
-            axn.set_ylabel(data_y_label, color=color)
-            axn.tick_params(axis='y', labelcolor=color)
+            bins_per_column = -(-sums.shape[0] // max_columns)
+            column_starts = np.arange(0, sums.shape[0], bins_per_column)
 
-            axn.legend()
-        plt.show()
+            column_counts = np.add.reduceat(counts, column_starts)
+            power = np.add.reduceat(sums, column_starts, axis=0) / column_counts[:, np.newaxis, np.newaxis]
 
+            # sample at the center of the frames of every column
+            center_frames = (first_bin + column_starts) * bin_frames + (column_counts - 1) / 2
+            center_samples = (center_frames * engine.step + engine.nperseg / 2).astype(np.int64)
+            center_samples = np.clip(center_samples, index_slice.start, index_slice.stop - 1)
 
-    def plotSpectrum(self, data_y_label_list: list):
-        # Calculate the spectrogram
-        
+            times = pd.to_datetime(self.windowData['TIME'][center_samples - index_slice.start], unit='us')
+
+            return engine.frequencies, times, power.transpose(1, 0, 2)
+
+    def loadSpectrumBins(self, sensor_labels: list, engine: SpectrumEngine, first_bin: int, stop_bin: int, progress=None) -> tuple:
+        """
+            power sums and frame counts of the bins first_bin:stop_bin of the file frame grid,
+            tiles are loaded from the spectrum cache or computed for all missing sensors at once
+        """
+        cache = self.spectrumCache
+        tile_frames = cache.TILE_BINS * cache.BIN_FRAMES
+        n_frames = engine.countFrames(self.n_sensorTime_data)
 
-        for data_y_label in data_y_label_list:
-            frequencies, times, Sxx = spectrogram(self.dataFrame[data_y_label], fs=self.Fs, noverlap=32, nperseg=48, nfft = 512)  # fs is the sample rate
+        first_tile = first_bin // cache.TILE_BINS
+        tiles_range = range(first_tile, (stop_bin - 1) // cache.TILE_BINS + 1)
+        parts = []
 
-            # Create a 2D heatmap (spectrogram plot)
-            fig, ax = plt.subplots()
-            fig.set_size_inches(12, 8)
+        for tile in tiles_range:
+            keys = {label: cache.key(self.fileKey, label, engine.key(), tile) for label in sensor_labels}
+            tiles = {label: cache.get(key) for label, key in keys.items()}
 
-            
+            missing = [label for label, values in tiles.items() if values is None]
+            if missing:
+                frame_start = tile * tile_frames
+                frame_stop = min(frame_start + tile_frames, n_frames)
+                sample_slice = slice(frame_start * engine.step, (frame_stop - 1) * engine.step + engine.nperseg)
 
-            
-            ax.pcolormesh(self.dataFrame.iloc[times].index, frequencies, 10 * np.log10(Sxx))  # Use log scale for better visualization
-            #plt.colorbar(label='Power/Frequency (dB/Hz)', ax=ax)
-            ax.set_xlabel('TIME')
-            ax.set_ylabel('Frequency (Hz)')
-            ax.set_title(f'{self.h5filepath.name}\nSpectrogram of Sensor Data {data_y_label}')
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y %H:%M:%S.%f'))
-            fig.autofmt_xdate()
-            
-            plt.show()
-            pass
+                # read past the block cache, the tile is only needed once
+                samples = np.column_stack([ffill_nan(self.readColumn(label, sample_slice).astype(np.float64))
+                                           for label in missing])
+                sums, _ = engine.binSums(samples, cache.BIN_FRAMES)
 
+                # the last tile of a growing file is not complete yet
+                complete = not self.swmr or frame_stop - frame_start == tile_frames
+
+                for i, label in enumerate(missing):
+                    tiles[label] = sums[:, :, i].astype(np.float32)
+                    if complete:
+                        cache.put(keys[label], tiles[label])
+
+            parts.append(np.stack([tiles[label] for label in sensor_labels], axis=2))
+
+            if progress is not None:
+                progress(len(parts) / len(tiles_range), f'spectrum tile {len(parts)}/{len(tiles_range)}')
+
+        sums = np.concatenate(parts)[first_bin - first_tile * cache.TILE_BINS:stop_bin - first_tile * cache.TILE_BINS]
+
+        bin_starts = np.arange(first_bin, stop_bin) * cache.BIN_FRAMES
+        counts = np.clip(n_frames - bin_starts, 0, cache.BIN_FRAMES)
+
+        return sums.astype(np.float64), counts
 
     def closeLogfile(self):
         """
@@ -305,24 +676,129 @@ class LogFile(h5py.File):
         del self
 
 
-    def readSensor(self, sensorwhich: str):
+    # rows per block if the datasets are not chunked
+    DEFAULT_BLOCK_ROWS = 1_000_000
+
+    def blockBoundaries(self, index_slice: slice = None, block_rows: int = None, block_seconds: float = None) -> list:
+        """
+            start indices of the blocks in index_slice followed by its stop,
+            fixed size blocks are rounded up to whole dataset chunks and start on a chunk border,
+            time based blocks start every block_seconds
+        """
+        if index_slice is None:
+            index_slice = slice(0, self.n_sensorTime_data)
+
+        if block_seconds is not None:
+            if index_slice.stop <= index_slice.start:
+                return [index_slice.start, index_slice.stop]
+
+            start_us = self.sensorGroup['TIME'][index_slice.start]
+            end_us = self.sensorGroup['TIME'][index_slice.stop - 1]
+
+            boundaries = [self.timeIndex.locate(t_us) for t_us in range(int(start_us), int(end_us) + 1, int(block_seconds * 1e6))]
+        else:
+            chunk_rows = (self.sensorGroup['TIME'].chunks or (1,))[0]
+
+            if block_rows is None:
+                block_rows = self.DEFAULT_BLOCK_ROWS if self.sensorGroup['TIME'].chunks is None else chunk_rows * 64
+
+            block_rows = -(-block_rows // chunk_rows) * chunk_rows
+
+            first_border = (index_slice.start // block_rows + 1) * block_rows
+            boundaries = [index_slice.start] + list(range(first_border, index_slice.stop, block_rows))
+
+        boundaries = [idx for idx in boundaries if index_slice.start <= idx < index_slice.stop]
+
+        return sorted(set(boundaries) | {index_slice.start}) + [index_slice.stop]
+
+    def iterBlocks(self, sensor_labels: list, index_slice: slice = None, block_rows: int = None,
+                   block_seconds: float = None, overlap: int = 0):
         """
-            function to read on sensor vector against time
+            generator over blocks of sensors as numpy arrays, yields (index slice, n overlap, data dict),
+            every block repeats the last n overlap rows of the previous one, so memory stays constant
+            no matter how large the file is, the arrays of memory mapped sensors are read-only views
         """
-        pass
+        boundaries = self.blockBoundaries(index_slice, block_rows, block_seconds)
+        previous = None
+
+        for block_start, block_stop in zip(boundaries[:-1], boundaries[1:]):
+            data = {label: self.readColumn(label, slice(block_start, block_stop)) for label in sensor_labels}
+
+            n_overlap = 0
+            if overlap > 0 and previous is not None:
+                n_overlap = min(overlap, previous[sensor_labels[0]].shape[0])
+                data = {label: np.concatenate((previous[label][-n_overlap:], values)) for label, values in data.items()}
+
+            yield slice(block_start - n_overlap, block_stop), n_overlap, data
 
+            previous = data
 
-    def readSensorPair(self, sensorwhich_x: str, sensorwhich_y: str):
+    def readSensor(self, sensorwhich: str, **block_options):
         """
-            function to read a pait of sensor vectors against time
+            function to read one sensor vector against time, yields (TIME, values) blocks,
+            block_options are passed to iterBlocks
         """
-        pass
+        for _, _, data in self.iterBlocks(['TIME', sensorwhich], **block_options):
+            yield data['TIME'], data[sensorwhich]
 
 
-    def calculateTimeSlice(self, time, seconds_advance):
+    def readSensorPair(self, sensorwhich_x: str, sensorwhich_y: str, **block_options):
         """
-            function to calculate aprox slices for a given time interval with starting time
+            function to read a pair of sensor vectors against time, yields (TIME, x, y) blocks
         """
-        
-        
-        pass
\ No newline at end of file
+        for _, _, data in self.iterBlocks(['TIME', sensorwhich_x, sensorwhich_y], **block_options):
+            yield data['TIME'], data[sensorwhich_x], data[sensorwhich_y]
+
+
+    def iterSmoothedGradient(self, index_slice: slice = None, sensorwhich: str = 'GRAVER_Z', **block_options):
+        """
+            smoothed gradient of a sensor over a whole cut or file, yields (index slice, values) blocks,
+            only the carry of the SmoothedGradient kernel is kept between blocks
+        """
+        options = self.plotconfig.get_values_by_name('plot smoothed gradient')
+        kernel = SmoothedGradient(int(round(int(options['lookahead ms']) * 1e-3 * self.Fs)), int(options['shift']))
+
+        idx_start = 0 if index_slice is None else index_slice.start
+
+        for _, _, data in self.iterBlocks([sensorwhich], index_slice, **block_options):
+            values = kernel.push(data[sensorwhich])
+            if values.shape[0] > 0:
+                yield slice(idx_start + kernel.n_emitted - values.shape[0], idx_start + kernel.n_emitted), values
+
+        values = kernel.flush()
+        if values.shape[0] > 0:
+            yield slice(idx_start + kernel.n_emitted - values.shape[0], idx_start + kernel.n_emitted), values
+
+    def iterDetrended(self, sensor_labels: list, index_slice: slice = None, rolling: bool = False, **block_options):
+        """
+            sensors with the linear trend against TIME removed, yields (index slice, (samples, sensors) array) blocks,
+            the line is fitted over the whole slice in a first pass or with rolling per block
+        """
+        detrend = LinearDetrend(rolling)
+
+        if not rolling:
+            for _, _, data in self.iterBlocks(['TIME'] + sensor_labels, index_slice, **block_options):
+                detrend.accumulate(np.column_stack([data[label] for label in sensor_labels]), data['TIME'])
+
+            if detrend.sums is None:
+                return
+            detrend.solve()
+
+        for block_slice, _, data in self.iterBlocks(['TIME'] + sensor_labels, index_slice, **block_options):
+            values = np.column_stack([data[label] for label in sensor_labels])
+
+            yield block_slice, detrend.detrend(values, data['TIME']) if rolling else detrend.apply(values, data['TIME'])
+
+    def calculateTimeSlice(self, time, seconds_advance) -> slice:
+        """
+            function to calculate the index slice for a given time interval with starting time,
+            the time index narrows the search so only a few TIME elements are read
+        """
+        tresh_l = timestamp_to_us(time)
+        tresh_h = timestamp_to_us(time + timedelta(seconds = seconds_advance))
+
+        # samples strictly inside (tresh_l, tresh_h)
+        idx_start = self.timeIndex.locate(tresh_l, right=True)
+        idx_stop = self.timeIndex.locate(tresh_h)
+
+        return slice(idx_start, max(idx_start, idx_stop))
@@ -0,0 +1,251 @@
+import bisect
+
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .SensorPlotter import SensorPlotter
+from .Pyramid import minmax_decimate
+
+from ._helper import timestamp_to_us
+
+
+class LogFileSet(SensorPlotter):
+    """
+        interval index over consecutive LogFile objects, a plot window is loaded from exactly
+        the files it overlaps and merged into one time ordered DataFrame
+    """
+
+    def __init__(self, logfiles: list = None, plotconfig=None, max_workers: int = 4):
+
+        self.logfiles = []
+        # time bounds in µs, sorted by start time
+        self.starts = []
+        self.ends = []
+
+        self.plotconfig = plotconfig
+        self.max_workers = max_workers
+
+        self.windowFiles = []
+        # merged window of windowFiles, built by the dataFrame property on first use
+        self._dataFrame = None
+
+        for logfile in logfiles or []:
+            self.add(logfile)
+
+    @property
+    def dataFrame(self) -> pd.DataFrame:
+        """the windows of windowFiles merged into one time ordered DataFrame"""
+        if self._dataFrame is None:
+            self._dataFrame = self.buildDataFrame()
+        return self._dataFrame
+
+    def buildDataFrame(self) -> pd.DataFrame:
+        if not self.windowFiles:
+            return pd.DataFrame()
+
+        frame = pd.concat([logfile.getSensorDataFrame() for logfile in self.windowFiles])
+
+        if not frame.index.is_monotonic_increasing:
+            # files may overlap in time
+            frame.sort_index(kind='stable', inplace=True)
+
+        return frame
+
+    @property
+    def Fs(self):
+        return self.logfiles[0].Fs
+
+    def add(self, logfile):
+        """adds a LogFile, its time boundarys are loaded from the time index"""
+        if logfile.getStartTime() is None:
+            logfile.loadTimeBoundarys()
+
+        start = timestamp_to_us(logfile.getStartTime())
+        end = timestamp_to_us(logfile.getEndTime())
+
+        pos = bisect.bisect_right(self.starts, start)
+
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.logfiles.insert(pos, logfile)
+
+        if self.plotconfig is None:
+            self.plotconfig = logfile.plotconfig
+
+    def replace(self, logfile, new_logfile):
+        """puts new_logfile in place of logfile, e.g. the same file opened again with swmr, the window is dropped"""
+        i = self.logfiles.index(logfile)
+
+        del self.starts[i], self.ends[i], self.logfiles[i]
+        self.add(new_logfile)
+
+        self.windowFiles = []
+        self._dataFrame = None
+
+    def setPlotConfig(self, plotconfig):
+        self.plotconfig = plotconfig
+        for logfile in self.logfiles:
+            logfile.setPlotConfig(plotconfig)
+
+    def query(self, start_time, duration_s) -> list:
+        """LogFile objects with samples inside (start_time, start_time + duration_s), ordered by start time"""
+        tresh_l = timestamp_to_us(start_time)
+        tresh_h = timestamp_to_us(start_time + timedelta(seconds = duration_s))
+
+        # only files starting before the window end are candidates
+        n_candidates = bisect.bisect_left(self.starts, tresh_h)
+        overlapping = np.flatnonzero(np.asarray(self.ends[:n_candidates], dtype=np.int64) > tresh_l)
+
+        return [self.logfiles[i] for i in overlapping]
+
+    def loadSensorData(self, data_label_list: list, start_time, duration_s: int = 120, progress=None):
+        """
+            loads the window from all overlapping files concurrently and merges them,
+            progress(fraction, text) is called during the reads of every sensor of every file and may raise
+            to cancel, the window is dropped then as the files loaded before the cancel hold the new window
+        """
+        window_files = self.query(start_time, duration_s)
+
+        # loaded fraction of every file, the files are loaded concurrently
+        fractions = [0.0] * len(window_files)
+
+        def load_window(i_file, logfile):
+            def file_progress(fraction, text):
+                fractions[i_file] = fraction
+                progress(sum(fractions) / len(window_files), f'{logfile.getPlotTitle()} {text}')
+
+            logfile.setPlotStartTime(start_time)
+            logfile.loadSensorData(data_label_list=data_label_list, duration_s=duration_s,
+                                   progress=file_progress if progress is not None else None)
+
+        try:
+            if window_files:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(window_files))) as executor:
+                    list(executor.map(load_window, range(len(window_files)), window_files))
+        except BaseException:
+            self.windowFiles = []
+            self._dataFrame = None
+            raise
+
+        self.windowFiles = window_files
+        self._dataFrame = None
+
+    def followSensorData(self, data_label_list: list, duration_s: int = 120, progress=None) -> int:
+        """
+            the window becomes the last duration_s seconds of the newest file, which should be
+            opened with swmr, see LogFile.followSensorData, returns the number of new rows
+        """
+        logfile = self.logfiles[-1]
+        n_new = logfile.followSensorData(data_label_list, duration_s, progress)
+
+        self.ends[-1] = timestamp_to_us(logfile.getEndTime())
+
+        if n_new > 0 or len(self.windowFiles) != 1 or self.windowFiles[0] is not logfile:
+            self.windowFiles = [logfile]
+            self._dataFrame = None
+
+        return n_new
+
+    def getSensorDataFrame(self) -> pd.DataFrame:
+        return self.dataFrame
+
+    def windowColumns(self, sensor_labels: list) -> tuple:
+        """
+            TIME in µs and the sensors of sensor_labels of the windows of windowFiles joined into
+            numpy arrays, in the same time order as dataFrame, see LogFile.windowColumns
+        """
+        parts = [logfile.windowColumns(sensor_labels) for logfile in self.windowFiles]
+
+        if not parts:
+            return np.empty(0, dtype=np.int64), {label: np.empty(0) for label in sensor_labels}
+
+        times = np.concatenate([part_times for part_times, _ in parts])
+        columns = {label: np.concatenate([part_columns[label] for _, part_columns in parts]) for label in parts[0][1]}
+
+        if np.any(times[1:] < times[:-1]):
+            # files may overlap in time
+            order = np.argsort(times, kind='stable')
+            times = times[order]
+            columns = {label: values[order] for label, values in columns.items()}
+
+        return times, columns
+
+    def getWindowBounds(self):
+        """first and last timestamp of the window without merging it, None if nothing is loaded"""
+        bounds = [logfile.getWindowBounds() for logfile in self.windowFiles]
+        bounds = [bound for bound in bounds if bound is not None]
+        if not bounds:
+            return None
+        return min(start for start, _ in bounds), max(end for _, end in bounds)
+
+    def getPlotTitle(self) -> str:
+        return ' + '.join(logfile.getPlotTitle() for logfile in self.windowFiles)
+
+    def getPlotEnvelope(self, sensor_label: str, max_points: int, progress=None):
+        """
+            envelopes of the single files joined together, the point budget is split by the rows
+            every file contributes to the window, see LogFile.getPlotEnvelope for progress
+        """
+        n_rows = sum(logfile.windowRows() for logfile in self.windowFiles)
+        x_parts = []
+        y_parts = []
+        reduced = False
+
+        for logfile in self.windowFiles:
+            if n_rows == 0 or logfile.windowRows() == 0:
+                continue
+
+            envelope = logfile.getPlotEnvelope(sensor_label, max(2, int(max_points * logfile.windowRows() / n_rows)), progress)
+
+            if envelope is None:
+                times, columns = logfile.windowColumns([sensor_label])
+                x_parts.append(times)
+                y_parts.append(columns[sensor_label])
+            else:
+                reduced = True
+                x_parts.append(np.asarray(envelope[0], dtype='datetime64[us]').astype(np.int64))
+                y_parts.append(np.asarray(envelope[1]))
+
+        if not reduced:
+            return None
+
+        x_plot = np.concatenate(x_parts)
+        y_plot = np.concatenate(y_parts)
+
+        # the points of raw files and the minimum of two per file may add up above the budget
+        if y_plot.shape[0] > max_points:
+            x_plot, y_plot = minmax_decimate(x_plot, y_plot, max_points)
+
+        return pd.to_datetime(x_plot, unit='us'), y_plot
+
+    def getSpectrum(self, sensor_labels: list, engine, max_columns: int, progress=None):
+        """
+            spectrograms of the single files joined together, the columns are split by the rows
+            every file contributes to the window, one column is the row weighted mean of the files
+        """
+        windows = [(logfile, logfile.windowRows()) for logfile in self.windowFiles]
+        windows = [(logfile, n) for logfile, n in windows if n > 0]
+        n_rows = sum(n for _, n in windows)
+
+        def file_progress(i_file):
+            if progress is None:
+                return None
+            return lambda fraction, text: progress((i_file + fraction) / len(windows), text)
+
+        parts = [logfile.getSpectrum(sensor_labels, engine, max(1, int(max_columns * n / n_rows)), file_progress(i_file))
+                 for i_file, (logfile, n) in enumerate(windows)]
+        parts = [(part, n) for part, (_, n) in zip(parts, windows) if part[2].shape[1] > 0]
+
+        if not parts:
+            return engine.frequencies, pd.DatetimeIndex([]), np.empty((engine.frequencies.shape[0], 0, len(sensor_labels)))
+
+        if max_columns == 1:
+            power = sum(part[2].mean(axis=1, keepdims=True) * n for part, n in parts) / sum(n for _, n in parts)
+            return engine.frequencies, parts[0][0][1][:1], power
+
+        times = pd.to_datetime(np.concatenate([np.asarray(part[1]) for part, _ in parts]))
+
+        return engine.frequencies, times, np.concatenate([part[2] for part, _ in parts], axis=1)
@@ -7,6 +7,8 @@ class Logger(logging.Logger):
         super().__init__('HDF5ViewerLogger', level=level)
         self.loglevel = level
         self.logfilepath = Path.cwd().joinpath(logfilename)
+        # spans of the Tracer, one JSON object per line
+        self.spanfilepath = self.logfilepath.with_suffix('.jsonl')
         self.new = False
         
         if not self.logfilepath.is_file():
@@ -33,6 +35,14 @@ class Logger(logging.Logger):
         if self.new:
             logging.info(f'Hello HDF5Viewer logfile!')
 
+        span_handler = logging.FileHandler(self.spanfilepath, mode='a')
+        span_handler.setFormatter(logging.Formatter('%(message)s'))
+
+        span_logger = logging.getLogger('GTM6.spans')
+        span_logger.propagate = False
+        span_logger.setLevel(logging.INFO)
+        span_logger.addHandler(span_handler)
+
 #logger=logging.getLogger(__name__)
 #logger.setLevel(logging.DEBUG)
 #logging.getLogger('matplotlib.font_manager').disabled = True
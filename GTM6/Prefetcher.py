@@ -0,0 +1,95 @@
+import logging
+import threading
+
+from datetime import timedelta
+
+from .Tracer import shared_tracer
+
+
+class Prefetcher():
+    """
+        reads the windows before and after the plot window into the shared block cache (the page
+        cache for memory mapped sensors) in a background thread, so stepping the plot start by
+        one window is served from memory
+
+        windows are read nearest first (next, previous, second next, ..) up to depth windows
+        on each side, until their estimated size reaches max_bytes, at most half of the block
+        cache is used so the plotted window is not evicted
+    """
+
+    def __init__(self, depth: int = 1, max_bytes: int = 128 * 2**20):
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.active = True
+
+        self.thread = None
+        self.cancel_event = threading.Event()
+
+    def setPlotConfig(self, plotconfig):
+        """depth and cap of the 'prefetch' option, prefetching is off if the option is not active"""
+        values = plotconfig.get_values_by_name('prefetch') if plotconfig is not None else None
+
+        if values is None:
+            return
+
+        self.active = 'prefetch' in plotconfig.get_active_names()
+        self.depth = int(float(values.get('depth', self.depth)))
+        self.max_bytes = int(float(values.get('MB', self.max_bytes / 2**20)) * 2**20)
+
+    def windowStarts(self, start_time, duration_s: float) -> list:
+        """start times of the neighbouring windows, nearest first, next before previous"""
+        starts = []
+        for step in range(1, self.depth + 1):
+            starts.append(start_time + timedelta(seconds=step * duration_s))
+            starts.append(start_time - timedelta(seconds=step * duration_s))
+        return starts
+
+    def start(self, logfile_set, data_label_list: list, start_time, duration_s: float):
+        """cancels a running prefetch and starts one around the window at start_time"""
+        self.cancel()
+
+        if not self.active or self.depth < 1 or not logfile_set.logfiles:
+            return
+
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name='prefetch',
+                                       args=(self.cancel_event, logfile_set, list(data_label_list), start_time, duration_s))
+        self.thread.start()
+
+    def cancel(self):
+        """the running prefetch stops after the sensor it is reading"""
+        self.cancel_event.set()
+
+    def _run(self, cancel_event: threading.Event, logfile_set, data_label_list: list, start_time, duration_s: float):
+        labels = ['TIME'] + [label for label in dict.fromkeys(data_label_list) if label != 'TIME']
+
+        with shared_tracer.span('prefetch', windows=2 * self.depth) as attributes:
+            n_bytes = 0
+            n_windows = 0
+            budget = min(self.max_bytes, logfile_set.logfiles[0].blockCache.max_bytes // 2)
+
+            for window_start in self.windowStarts(start_time, duration_s):
+                reads = []
+                for logfile in logfile_set.query(window_start, duration_s):
+                    index_slice = logfile.calculateTimeSlice(window_start, duration_s)
+
+                    # INDEX and other pseudo sensors are not read
+                    for label in (label for label in labels if label in logfile.sensorGroup):
+                        reads.append((logfile, label, index_slice))
+                        n_bytes += (index_slice.stop - index_slice.start) * logfile.sensorGroup[label].dtype.itemsize
+
+                if n_bytes > budget:
+                    break
+
+                for logfile, label, index_slice in reads:
+                    if cancel_event.is_set():
+                        attributes.update(cancelled=True, prefetched_windows=n_windows)
+                        return
+                    try:
+                        logfile.prefetchSlice(label, index_slice)
+                    except OSError as oe:
+                        logging.debug(f'prefetch of {label} failed: {oe}')
+
+                n_windows += 1
+
+            attributes['prefetched_windows'] = n_windows
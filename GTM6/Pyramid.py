@@ -0,0 +1,194 @@
+import logging
+
+from pathlib import Path
+
+import numpy as np
+
+from .Tracer import shared_tracer
+
+from ._helper import cache_dir, file_fingerprint
+
+
+def _reduce_buckets(data: np.ndarray, bucket_size: int, reduce_func) -> np.ndarray:
+    """reduces every bucket_size samples to one value, the last bucket may be partial"""
+    n_full = (data.shape[0] // bucket_size) * bucket_size
+
+    reduced = reduce_func.reduce(data[:n_full].reshape(-1, bucket_size), axis=1)
+
+    if n_full < data.shape[0]:
+        reduced = np.append(reduced, reduce_func.reduce(data[n_full:]))
+
+    return reduced
+
+
+def minmax_decimate(x_values: np.ndarray, y_values: np.ndarray, max_points: int):
+    """in memory min/max envelope of a line with at most max_points points"""
+    n_values = y_values.shape[0]
+
+    if n_values <= max_points:
+        return x_values, y_values
+
+    # two points (min and max) per bucket
+    bucket_size = -(-n_values // max(1, max_points // 2))
+
+    y_min = _reduce_buckets(y_values, bucket_size, np.fmin)
+    y_max = _reduce_buckets(y_values, bucket_size, np.fmax)
+
+    return np.repeat(np.asarray(x_values)[::bucket_size], 2), np.column_stack((y_min, y_max)).ravel()
+
+
+class MinMaxPyramid():
+    """
+        multi resolution min/max envelope of one sensor vector,
+        one bucket of level k covers BASE * FACTOR**k samples
+    """
+
+    BASE = 16
+    FACTOR = 4
+    # coarser levels are not built once a level has less buckets
+    MIN_BUCKETS = 512
+    # samples read at once while building, multiple of BASE
+    BUILD_BLOCK = BASE * 65536
+
+    def __init__(self, dataset, h5filepath: Path, sensor: str, progress=None):
+
+        self.dataset = dataset
+        self.sensor = sensor
+        self.n_samples = dataset.shape[0]
+
+        # list of (bucket size, minima, maxima)
+        self.levels = []
+
+        try:
+            self.cache_path = cache_dir('pyramid').joinpath(f'{file_fingerprint(h5filepath)}_{sensor}.npz')
+        except OSError as oe:
+            logging.debug(f'no pyramid cache for {h5filepath}: {oe}')
+            self.cache_path = None
+
+        if not self.load():
+            self.build(progress)
+            self.save()
+
+    def build(self, progress=None):
+        """
+            streams the dataset once for the finest level, the coarser levels are reduced from it,
+            progress(fraction, text) is called after every block and may raise to cancel
+        """
+        mins = []
+        maxs = []
+
+        for block_start in range(0, self.n_samples, self.BUILD_BLOCK):
+            block = shared_tracer.read(self.dataset, slice(block_start, block_start + self.BUILD_BLOCK))
+
+            # fmin/fmax ignore NaN gaps in the sensor data
+            mins.append(_reduce_buckets(block, self.BASE, np.fmin))
+            maxs.append(_reduce_buckets(block, self.BASE, np.fmax))
+
+            if progress is not None:
+                progress(min(block_start + self.BUILD_BLOCK, self.n_samples) / self.n_samples, f'envelope of {self.sensor}')
+
+        if not mins:
+            return
+
+        bucket_size = self.BASE
+        level_min = np.concatenate(mins)
+        level_max = np.concatenate(maxs)
+
+        self.levels.append((bucket_size, level_min, level_max))
+
+        while level_min.shape[0] > self.MIN_BUCKETS:
+            bucket_size *= self.FACTOR
+            level_min = _reduce_buckets(level_min, self.FACTOR, np.fmin)
+            level_max = _reduce_buckets(level_max, self.FACTOR, np.fmax)
+
+            self.levels.append((bucket_size, level_min, level_max))
+
+    def load(self) -> bool:
+        if self.cache_path is None or not self.cache_path.is_file():
+            return False
+        try:
+            with np.load(self.cache_path) as cached:
+                if int(cached['n_samples']) != self.n_samples:
+                    return False
+
+                bucket_sizes = cached['bucket_sizes']
+                self.levels = [(int(size), cached[f'min_{i}'], cached[f'max_{i}']) for i, size in enumerate(bucket_sizes)]
+            return True
+
+        except (OSError, KeyError, ValueError) as e:
+            logging.debug(f'pyramid cache {self.cache_path} unreadable: {e}')
+            return False
+
+    def save(self):
+        if self.cache_path is None:
+            return
+
+        arrays = {'n_samples': self.n_samples, 'bucket_sizes': np.array([size for size, _, _ in self.levels])}
+        for i, (_, level_min, level_max) in enumerate(self.levels):
+            arrays[f'min_{i}'] = level_min
+            arrays[f'max_{i}'] = level_max
+        try:
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with tmp_path.open('wb') as fp:
+                np.savez(fp, **arrays)
+            tmp_path.replace(self.cache_path)
+
+        except OSError as oe:
+            logging.debug(f'could not write pyramid cache {self.cache_path}: {oe}')
+
+    def getLevel(self, idx_start: int, idx_stop: int, max_points: int):
+        """
+            finest level that draws the samples idx_start:idx_stop with at most max_points points,
+            returns None if the raw samples already fit
+        """
+        if idx_stop - idx_start <= max_points:
+            return None
+
+        for bucket_size, level_min, level_max in self.levels:
+            # two points (min and max) per bucket
+            if 2 * (idx_stop - idx_start) / bucket_size <= max_points:
+                return bucket_size, level_min, level_max
+
+        return self.levels[-1] if self.levels else None
+
+    def getEnvelope(self, idx_start: int, idx_stop: int, max_points: int):
+        """
+            returns (bucket start indices, minima, maxima) of the chosen level with at most max_points // 2
+            buckets, or None if no reduction is needed, the first and last bucket only cover idx_start:idx_stop
+        """
+        level = self.getLevel(idx_start, idx_stop, max_points)
+
+        if level is None:
+            return None
+
+        bucket_size, level_min, level_max = level
+
+        bucket_start = idx_start // bucket_size
+        bucket_stop = -(-idx_stop // bucket_size)
+
+        bucket_idx = np.arange(bucket_start, bucket_stop) * bucket_size
+        bucket_min = level_min[bucket_start:bucket_stop].copy()
+        bucket_max = level_max[bucket_start:bucket_stop].copy()
+
+        # buckets reaching over the window edges are reduced again from the samples inside
+        for i in {0, bucket_min.shape[0] - 1}:
+            lo = int(bucket_idx[i])
+            hi = min(lo + bucket_size, self.n_samples)
+
+            if lo < idx_start or hi > idx_stop:
+                values = shared_tracer.read(self.dataset, slice(max(lo, idx_start), min(hi, idx_stop)))
+                bucket_min[i] = np.fmin.reduce(values)
+                bucket_max[i] = np.fmax.reduce(values)
+
+        bucket_idx[0] = idx_start
+
+        max_buckets = max(1, max_points // 2)
+        if bucket_min.shape[0] > max_buckets:
+            # even the coarsest level may have too many buckets, neighbours are merged then
+            merge = -(-bucket_min.shape[0] // max_buckets)
+
+            bucket_idx = bucket_idx[::merge]
+            bucket_min = _reduce_buckets(bucket_min, merge, np.fmin)
+            bucket_max = _reduce_buckets(bucket_max, merge, np.fmax)
+
+        return bucket_idx, bucket_min, bucket_max
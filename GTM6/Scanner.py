@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+import multiprocessing
+
+from collections import deque
+from pathlib import Path
+from multiprocessing.connection import wait as connection_wait
+
+import h5py
+
+from .TimeIndex import TimeIndex
+
+
+def _empty_result(h5filepath: Path, error: str = None) -> dict:
+    return {
+        'path': Path(h5filepath),
+        'valid': False,
+        'sensors': [],
+        'sensor valid': [],
+        'n samples': 0,
+        'start': None,
+        'end': None,
+        'cuts': False,
+        'error': error,
+        # False if the scan did not finish (timeout, crashed worker)
+        'complete': False
+    }
+
+
+def scan_logfile(h5filepath: Path) -> dict:
+    """
+        metadata of one GTM6 log file: sensor list, validity table, time bounds in µs and cuts presence,
+        runs in a worker process so only plain python types are returned
+    """
+    h5filepath = Path(h5filepath)
+
+    result = _empty_result(h5filepath)
+
+    try:
+        try:
+            h5file = h5py.File(h5filepath, 'r')
+            swmr = False
+        except OSError:
+            # a file that is still written can only be opened as SWMR reader
+            h5file = h5py.File(h5filepath, 'r', swmr=True)
+            swmr = True
+
+        with h5file:
+            sensor_group = h5file['GTM6']['LOG']
+            n_samples = sensor_group['TIME'].shape[0]
+
+            result['sensors'] = list(sensor_group.keys())
+            # the writer flushes TIME last, so its sensors may be ahead
+            result['sensor valid'] = [sensor_group[sensor].shape[0] == n_samples or (swmr and sensor_group[sensor].shape[0] > n_samples)
+                                      for sensor in result['sensors']]
+            result['n samples'] = n_samples
+            result['cuts'] = 'CUTS' in h5file['GTM6']
+
+            # builds the time index sidecar as a side effect, so opening the file later is cheap
+            time_index = TimeIndex(sensor_group['TIME'], h5filepath)
+            result['start'] = time_index.getStartTime()
+            result['end'] = time_index.getEndTime()
+            result['valid'] = True
+
+        result['complete'] = True
+
+    except KeyError:
+        result['error'] = 'not a valid GTM6 log file'
+        result['complete'] = True
+    except OSError as oe:
+        # may be a temporary problem of the share, so the scan counts as unfinished
+        result['error'] = str(oe)
+
+    return result
+
+
+def _scan_worker(connection):
+    """runs in a process of its own, scans every file path it receives until it receives None"""
+    try:
+        for h5filepath in iter(connection.recv, None):
+            connection.send(scan_logfile(h5filepath))
+    except EOFError:
+        # the scan was closed
+        pass
+    finally:
+        connection.close()
+
+
+def _start_worker(context):
+    connection, worker_connection = context.Pipe()
+
+    process = context.Process(target=_scan_worker, args=(worker_connection,), daemon=True)
+    process.start()
+    worker_connection.close()
+
+    return process, connection
+
+
+def _kill(process, connection):
+    process.kill()
+    process.join()
+    connection.close()
+
+
+def _stop(process, connection, timeout_s: float = 1.0):
+    """lets an idle worker exit, a worker that does not is killed"""
+    try:
+        connection.send(None)
+    except OSError:
+        pass
+    process.join(timeout_s)
+
+    if process.is_alive():
+        process.kill()
+        process.join()
+    connection.close()
+
+
+def scan_logfiles(filepaths: list, max_workers: int = None, timeout_s: float = 60.0):
+    """
+        scans log files in at most max_workers worker processes, which are reused from file to file,
+        and yields the results in order of completion, a scan running longer than timeout_s is reported
+        with an error, only its worker is killed and replaced by a new one for the remaining files
+    """
+    if max_workers is None:
+        max_workers = min(4, os.cpu_count() or 1)
+
+    context = multiprocessing.get_context()
+    queued = deque(Path(filepath) for filepath in filepaths)
+    # (process, connection) of the workers waiting for a file
+    idle = []
+    # connection of a busy worker -> (process, file path, start time)
+    busy = {}
+
+    try:
+        while queued or busy:
+            while queued and len(busy) < max_workers:
+                process, connection = idle.pop() if idle else _start_worker(context)
+
+                filepath = queued.popleft()
+                connection.send(filepath)
+
+                busy[connection] = (process, filepath, time.monotonic())
+
+            for connection in connection_wait(list(busy), timeout=0.1):
+                process, filepath, _ = busy.pop(connection)
+                try:
+                    result = connection.recv()
+                except EOFError:
+                    process.join()
+                    connection.close()
+                    logging.debug(f'scan of {filepath} failed, exit code {process.exitcode}')
+                    result = _empty_result(filepath, f'scan process exited with code {process.exitcode}')
+                else:
+                    idle.append((process, connection))
+
+                yield result
+
+            now = time.monotonic()
+
+            for connection, (process, filepath, started) in list(busy.items()):
+                if now - started > timeout_s:
+                    busy.pop(connection)
+                    _kill(process, connection)
+                    logging.debug(f'scan of {filepath} timed out after {timeout_s} s')
+                    yield _empty_result(filepath, f'timeout after {timeout_s} s')
+    finally:
+        # a closed generator leaves no scan behind
+        for connection, (process, _, _) in busy.items():
+            _kill(process, connection)
+        for process, connection in idle:
+            _stop(process, connection)
@@ -0,0 +1,283 @@
+import logging
+
+import numpy as np
+
+import pandas as pd
+
+import matplotlib
+
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+import matplotlib.dates as mdates
+import matplotlib.style as mplstyle
+
+from .Pyramid import minmax_decimate
+from .FilterBank import FilterBank
+from .LinearDetrend import LinearDetrend
+from .SpectrumEngine import SpectrumEngine
+from .Tracer import shared_tracer
+
+from ._helper import smoothed_gradient
+
+
+mplstyle.use('fast')
+
+# keeps the default backend on headless machines, e.g. for the batch export
+matplotlib.use('TkAgg', force=False)
+
+
+def axes_width_pixels(figure_width_inches: float) -> int:
+    """pixel width of the axes of a figure with the default subplot parameters, known before the figure exists"""
+    params = plt.rcParams
+    return int(figure_width_inches * params['figure.dpi'] * (params['figure.subplot.right'] - params['figure.subplot.left']))
+
+
+class SensorPlotter():
+    """
+        plot methods shared by LogFile and LogFileSet, a subclass provides plotconfig, Fs,
+        windowColumns(), getWindowBounds(), getPlotEnvelope(), getSpectrum() and getPlotTitle()
+
+        the prepare methods do the reading and computing without pyplot, so the viewer can run
+        them in a worker thread and call the draw methods on the tk main thread
+    """
+
+    def prepareSensors(self, data_x_label_list: list, data_y_label_list: list, max_points: int = None, progress=None) -> list:
+        """
+            line data of plotSensors, one dict per sensor of data_y_label_list with at most about
+            max_points points per line, uses no pyplot so it can run in a worker thread,
+            progress(fraction, text) is called for every sensor and may raise to cancel
+        """
+        if max_points is None:
+            # roughly two points per pixel of the axes
+            max_points = 2 * axes_width_pixels(self.sensorFigureSize(len(data_y_label_list))[0])
+
+        active_plot_options = self.plotconfig.get_active_names()
+
+        # data_x_label_list is a list so we can maybe add multiple X axis support later
+        data_x_label = data_x_label_list[0]
+
+        logging.debug(active_plot_options)
+
+        with shared_tracer.span('plot preparation', sensors=len(data_y_label_list)):
+            # the plot is built from the numpy columns of the window, the DataFrame is left to the export
+            x_labels = [label for label in data_x_label_list if label not in ('TIME', 'INDEX')]
+            times, columns = self.windowColumns(data_y_label_list + x_labels)
+
+            # all plotted sensors are detrended and filtered in one pass, the raw data envelope is not used then
+            detrend = LinearDetrend.fromPlotConfig(self.plotconfig)
+            filter_bank = FilterBank.fromPlotConfig(self.plotconfig, self.Fs)
+
+            if detrend is not None or filter_bank is not None:
+                transformed = np.column_stack([columns[label] for label in data_y_label_list])
+
+                with shared_tracer.span('filter', sensors=len(data_y_label_list), rows=transformed.shape[0]):
+                    if detrend is not None:
+                        transformed = detrend.detrend(transformed, times)
+
+                    if filter_bank is not None:
+                        transformed = filter_bank.filter(transformed)
+
+            if data_x_label == 'TIME':
+                x_plot = pd.to_datetime(times, unit='us')
+            elif data_x_label == 'INDEX':
+                x_plot = np.arange(times.shape[0])
+            else:
+                x_plot = columns[data_x_label]
+
+            lines = []
+            for i_plot, data_y_label in enumerate(data_y_label_list):
+
+                sensor_progress = None
+                if progress is not None:
+                    progress(i_plot / len(data_y_label_list), f'preparing {data_y_label}..')
+                    sensor_progress = lambda fraction, text, i_plot=i_plot: progress((i_plot + fraction) / len(data_y_label_list), text)
+
+                x_line, y_line = x_plot, columns[data_y_label]
+                line_label = data_y_label
+
+                if detrend is not None or filter_bank is not None:
+                    y_line = transformed[:, i_plot]
+
+                    if detrend is not None:
+                        line_label = f'{line_label} detrended'
+                    if filter_bank is not None:
+                        line_label = f'{line_label} {filter_bank.f_low:g}-{filter_bank.f_high:g} Hz'
+
+                    if data_x_label == 'TIME':
+                        x_line, y_line = minmax_decimate(x_plot, y_line, max_points)
+
+                elif data_x_label == 'TIME':
+                    # spikes survive in the min/max envelope
+                    envelope = self.getPlotEnvelope(data_y_label, max_points, sensor_progress)
+
+                    if envelope is not None:
+                        x_line, y_line = envelope
+
+                gradient = None
+                if data_y_label == 'GRAVER_Z' and 'plot smoothed gradient' in active_plot_options:
+
+                    ms = int(self.plotconfig.get_values_by_name('plot smoothed gradient')['lookahead ms'])
+
+                    shift_periods = int(self.plotconfig.get_values_by_name('plot smoothed gradient')['shift'])
+
+                    graver_z = columns[data_y_label]
+
+                    offset = np.mean(np.nan_to_num(graver_z))
+
+                    # window of lookahead ms in samples, same as the time based rolling window for a constant Fs
+                    smoothed_grad = smoothed_gradient(graver_z, int(round(ms * 1e-3 * self.Fs)), shift_periods)
+
+                    gradient = minmax_decimate(x_plot, smoothed_grad + offset, max_points)
+
+                lines.append({'sensor': data_y_label, 'label': line_label, 'x': x_line, 'y': y_line, 'gradient': gradient})
+
+        return lines
+
+    def drawSensors(self, data_x_label_list: list, lines: list):
+        """draws the lines of prepareSensors, one y axis per sensor"""
+        n_plots = len(lines)
+        data_x_label = data_x_label_list[0]
+
+        # begin plotting
+        fig, ax1 = plt.subplots()
+        fig.set_size_inches(*self.sensorFigureSize(n_plots))
+
+        axis_list = [ax1.twinx() for _ in range(n_plots - 1)]
+        axis_list.insert(0, ax1)
+
+        window_start, window_end = self.getWindowBounds() or (None, None)
+
+        ax1.set_title(f"""{self.getPlotTitle()}
+                        {data_x_label_list} vs {[line['sensor'] for line in lines]}
+                        {window_start} -> {window_end}""")
+
+        for axn, line, color in zip(axis_list, lines, list(mcolors.TABLEAU_COLORS)):
+
+            if data_x_label == 'TIME':
+                axn.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y %H:%M:%S.%f'))
+                fig.autofmt_xdate()
+
+            axn.plot(line['x'], line['y'], color=color, label=line['label'])
+
+            if line['gradient'] is not None:
+                axn.plot(*line['gradient'], color='black', label='GRAVER_Z smoothed gradient')
+            axn.set_xlabel(data_x_label)
+            axn.set_ylabel(line['sensor'], color=color)
+            axn.tick_params(axis='y', labelcolor=color)
+
+            axn.legend()
+
+        return fig
+
+    def plotSensors(self, data_x_label_list: list, data_y_label_list: list):
+        """
+        """
+        if len(data_x_label_list) > 1:
+            return
+
+        self.drawSensors(data_x_label_list, self.prepareSensors(data_x_label_list, data_y_label_list))
+        plt.show()
+
+    @staticmethod
+    def sensorFigureSize(n_plots: int) -> tuple:
+        return 8 + (n_plots * 2), 8
+
+    def prepareSpectrum(self, data_y_label_list: list, progress=None) -> dict:
+        """
+            spectrogram of every sensor with one column per pixel of the axes, the welch power
+            spectral density of all sensors if 'plot welch psd' is active, uses no pyplot
+        """
+        if self.plotconfig is not None and 'plot welch psd' in self.plotconfig.get_active_names():
+            engine = SpectrumEngine.fromPlotConfig(self.plotconfig, self.Fs, SpectrumEngine.WELCH_WINDOW)
+
+            # one column is the mean over all frames
+            frequencies, _, power = self.getSpectrum(data_y_label_list, engine, 1, progress)
+            return {'welch': True, 'frequencies': frequencies, 'power': power[:, 0]}
+
+        engine = SpectrumEngine.fromPlotConfig(self.plotconfig, self.Fs)
+
+        # all sensors go through one FFT per chunk
+        frequencies, column_times, Sxx = self.getSpectrum(data_y_label_list, engine, axes_width_pixels(12), progress)
+
+        return {'welch': False, 'frequencies': frequencies, 'times': column_times, 'power': Sxx}
+
+    def drawSpectrum(self, data_y_label_list: list, spectrum: dict) -> list:
+        """draws the result of prepareSpectrum, returns the figures"""
+        frequencies = spectrum['frequencies']
+
+        if spectrum['welch']:
+            fig, ax = plt.subplots()
+            fig.set_size_inches(12, 8)
+
+            for i, data_y_label in enumerate(data_y_label_list):
+                ax.semilogy(frequencies, spectrum['power'][:, i], label=data_y_label)
+
+            ax.set_xlabel('Frequency (Hz)')
+            ax.set_ylabel('PSD (unit**2/Hz)')
+            window_start, window_end = self.getWindowBounds() or (None, None)
+            ax.set_title(f"""{self.getPlotTitle()}
+                            Welch PSD {window_start} -> {window_end}""")
+            ax.legend()
+
+            return [fig]
+
+        figures = []
+        for i, data_y_label in enumerate(data_y_label_list):
+            fig, ax = plt.subplots()
+            fig.set_size_inches(12, 8)
+            figures.append(fig)
+
+            with np.errstate(divide='ignore'):
+                ax.pcolormesh(spectrum['times'], frequencies, 10 * np.log10(spectrum['power'][:, :, i]), shading='nearest')  # Use log scale for better visualization
+            #plt.colorbar(label='Power/Frequency (dB/Hz)', ax=ax)
+            ax.set_xlabel('TIME')
+            ax.set_ylabel('Frequency (Hz)')
+            ax.set_title(f'{self.getPlotTitle()}\nSpectrogram of Sensor Data {data_y_label}')
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y %H:%M:%S.%f'))
+            fig.autofmt_xdate()
+
+        return figures
+
+    def plotSpectrum(self, data_y_label_list: list):
+        """
+            spectrogram of every sensor aggregated to the axes width,
+            the welch power spectral density of all sensors if 'plot welch psd' is active
+        """
+        self.drawSpectrum(data_y_label_list, self.prepareSpectrum(data_y_label_list))
+
+        plt.show()
+
+
+    def plotEdges(self, edges: np.ndarray, data_y_label: str = 'GRAVER_Z'):
+        """
+            draws the loaded window of data_y_label with the landing and lifting edges inside it
+        """
+        fig, ax = plt.subplots()
+        fig.set_size_inches(12, 8)
+
+        times, columns = self.windowColumns([data_y_label])
+        window_start, window_end = self.getWindowBounds() or (None, None)
+
+        x_line, y_line = pd.to_datetime(times, unit='us'), columns[data_y_label]
+
+        envelope = self.getPlotEnvelope(data_y_label, int(2 * ax.get_window_extent().width))
+        if envelope is not None:
+            x_line, y_line = envelope
+
+        ax.plot(x_line, y_line, color='tab:blue', label=data_y_label)
+
+        window_edges = edges[(edges['time'] >= times.min()) & (edges['time'] <= times.max())]
+
+        for kind, color, label in ((-1, 'tab:green', 'landing'), (1, 'tab:red', 'lifting')):
+            times = pd.to_datetime(window_edges['time'][window_edges['kind'] == kind], unit='us')
+            if len(times) > 0:
+                ax.vlines(times, 0, 1, transform=ax.get_xaxis_transform(), color=color, label=f'{label} ({len(times)})')
+
+        ax.set_title(f'{self.getPlotTitle()}\nGraver edges {window_start} -> {window_end}')
+        ax.set_xlabel('TIME')
+        ax.set_ylabel(data_y_label)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y %H:%M:%S.%f'))
+        fig.autofmt_xdate()
+        ax.legend()
+
+        plt.show()
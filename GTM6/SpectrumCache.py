@@ -0,0 +1,134 @@
+import os
+import hashlib
+import logging
+import threading
+
+from pathlib import Path
+
+import numpy as np
+
+from .Tracer import shared_tracer
+
+from ._helper import cache_dir
+
+
+class SpectrumCache():
+    """
+        size bounded on disk cache of spectral tiles, one .npy file per
+        (file identity, sensor, STFT parameters, tile), the least recently used files are deleted first
+
+        a tile holds the power sums of TILE_BINS bins of BIN_FRAMES frames on the frame grid of the
+        whole log file, so overlapping windows share their tiles
+    """
+
+    BIN_FRAMES = 8
+    TILE_BINS = 512
+
+    def __init__(self, max_bytes: int = 512 * 2**20, directory: Path = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        # bytes of the cache directory, counted on first use
+        self.n_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+
+    def _directory(self) -> Path:
+        if self.directory is None:
+            self.directory = cache_dir('spectrum')
+        else:
+            self.directory = Path(self.directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory
+
+    def setMaxBytes(self, max_bytes: int):
+        with self.lock:
+            self.max_bytes = max_bytes
+            if self.n_bytes is not None:
+                self._evict()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes': self.n_bytes,
+                'max bytes': self.max_bytes
+            }
+
+    @staticmethod
+    def key(file_fingerprint: str, sensor: str, engine_key: tuple, tile: int) -> str:
+        parameters = hashlib.sha1(repr((file_fingerprint, sensor, engine_key)).encode()).hexdigest()
+        return f'{parameters}_{tile}'
+
+    def get(self, key: str) -> np.ndarray:
+        try:
+            path = self._directory().joinpath(f'{key}.npy')
+            tile = np.load(path)
+            # the modification time is the last use
+            os.utime(path)
+
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            shared_tracer.count('cache_misses')
+            return None
+
+        with self.lock:
+            self.hits += 1
+        shared_tracer.count('cache_hits')
+        return tile
+
+    def put(self, key: str, tile: np.ndarray):
+        try:
+            path = self._directory().joinpath(f'{key}.npy')
+            # unique per thread and process, the replace is atomic
+            tmp_path = path.with_suffix(f'.{os.getpid()}_{threading.get_ident()}.tmp')
+            with tmp_path.open('wb') as fp:
+                np.save(fp, tile)
+            tmp_path.replace(path)
+
+        except OSError as oe:
+            logging.debug(f'could not write spectrum tile {key}: {oe}')
+            return
+
+        with self.lock:
+            if self.n_bytes is None:
+                self.n_bytes = sum(f.stat().st_size for f in self.directory.glob('*.npy'))
+            else:
+                self.n_bytes += tile.nbytes
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            for path in self._directory().glob('*.npy'):
+                path.unlink(missing_ok=True)
+            self.n_bytes = 0
+
+    def _evict(self):
+        if self.n_bytes <= self.max_bytes:
+            return
+
+        files = []
+        for path in self._directory().glob('*.npy'):
+            try:
+                stat = path.stat()
+                files.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+
+        self.n_bytes = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if self.n_bytes <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                self.n_bytes -= size
+            except OSError as oe:
+                logging.debug(f'could not evict spectrum tile {path}: {oe}')
+
+
+# one cache for all log files
+shared_spectrum_cache = SpectrumCache()
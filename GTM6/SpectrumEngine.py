@@ -0,0 +1,214 @@
+import numpy as np
+
+from scipy import fft
+from scipy.signal import get_window
+
+
+class SpectrumEngine():
+    """
+        short time fourier transform of many sensors at once, data is (samples, sensors)
+
+        frames are transformed in chunks of CHUNK_FRAMES with one FFT call for all sensors and
+        averaged into at most max_columns columns right away, so neither the frames of a long
+        window nor its full spectrogram are held in memory, push()/finish() take the samples
+        block by block, spectrogram() and welch() take data in memory
+
+        the frames are detrended (constant) and windowed like in scipy.signal, with the default
+        window of scipy.signal.spectrogram unless another one is given, WELCH_WINDOW is the default
+        of scipy.signal.welch, the scaling is the power spectral density of both
+    """
+
+    # frames transformed at once
+    CHUNK_FRAMES = 2048
+
+    # default windows of scipy.signal.spectrogram and scipy.signal.welch
+    SPECTROGRAM_WINDOW = ('tukey', 0.25)
+    WELCH_WINDOW = 'hann'
+
+    def __init__(self, Fs: float, nperseg: int = 48, noverlap: int = 32, nfft: int = 512, window=SPECTROGRAM_WINDOW):
+        self.Fs = float(Fs)
+        self.nperseg = int(nperseg)
+        self.noverlap = int(noverlap)
+        self.nfft = max(int(nfft), self.nperseg)
+        self.step = self.nperseg - self.noverlap
+
+        if self.step <= 0:
+            raise ValueError(f'noverlap {noverlap} must be smaller than nperseg {nperseg}')
+
+        self.window_name = window
+        self.window = get_window(window, self.nperseg)
+
+        # density scaling, the one sided spectrum counts every frequency but DC and nyquist twice
+        self.scale = np.full(self.nfft // 2 + 1, 2.0 / (self.Fs * np.sum(self.window**2)))
+        self.scale[0] /= 2
+        if self.nfft % 2 == 0:
+            self.scale[-1] /= 2
+
+        self.frequencies = np.fft.rfftfreq(self.nfft, 1 / self.Fs)
+
+    @classmethod
+    def fromPlotConfig(cls, plotconfig, Fs: float, window=SPECTROGRAM_WINDOW):
+        """engine with the values of the 'spectrum' option, the defaults if there is none"""
+        values = plotconfig.get_values_by_name('spectrum') if plotconfig is not None else None
+
+        if not values:
+            return cls(Fs, window=window)
+
+        return cls(Fs, int(values['nperseg']), int(values['noverlap']), int(values['nfft']), window)
+
+    def key(self) -> tuple:
+        """parameters that define the result, used as cache key"""
+        return (self.Fs, self.nperseg, self.noverlap, self.nfft, repr(self.window_name))
+
+    def countFrames(self, n_samples: int) -> int:
+        return max(0, (n_samples - self.nperseg) // self.step + 1)
+
+    def start(self, n_samples: int, max_columns: int = None):
+        """prepares push() for a recording of n_samples, every column averages the same number of frames"""
+        n_frames = self.countFrames(n_samples)
+
+        self.frames_per_column = max(1, -(-n_frames // max_columns)) if max_columns else 1
+        self.n_columns = -(-n_frames // self.frames_per_column)
+
+        self.buffer = None
+        self.n_frames = 0
+        self.columns = []
+        # power sum and frame count of the column that is still open
+        self.open_sum = None
+        self.open_count = 0
+
+    def push(self, block: np.ndarray):
+        """adds the next samples, all complete frames are transformed and averaged into their columns"""
+        block = np.asarray(block, dtype=np.float64)
+        block = block.reshape(block.shape[0], -1)
+
+        self.buffer = block if self.buffer is None else np.concatenate((self.buffer, block))
+
+        n_frames = self.countFrames(self.buffer.shape[0])
+
+        for chunk_start in range(0, n_frames, self.CHUNK_FRAMES):
+            chunk_frames = min(self.CHUNK_FRAMES, n_frames - chunk_start)
+            first_sample = chunk_start * self.step
+
+            samples = self.buffer[first_sample:first_sample + (chunk_frames - 1) * self.step + self.nperseg]
+
+            self._addColumns(self._power(samples))
+
+        # the rest starts with the next frame
+        self.buffer = self.buffer[n_frames * self.step:]
+
+    def finish(self):
+        """
+            returns (frequencies, column times in seconds from the first sample, power)
+            with power as (frequencies, columns, sensors)
+        """
+        if self.open_count > 0:
+            self.columns.append(self.open_sum / self.open_count)
+            self.open_sum = None
+            self.open_count = 0
+
+        n_sensors = 1 if self.buffer is None else self.buffer.shape[1]
+        power = np.stack(self.columns, axis=1) if self.columns else np.empty((self.frequencies.shape[0], 0, n_sensors))
+
+        # every column is centered on the mean of its frame centers
+        first_frames = np.arange(power.shape[1]) * self.frames_per_column
+        last_frames = np.minimum(first_frames + self.frames_per_column, self.n_frames) - 1
+        times = ((first_frames + last_frames) / 2 * self.step + self.nperseg / 2) / self.Fs
+
+        return self.frequencies, times, power
+
+    def spectrogram(self, data: np.ndarray, max_columns: int = None):
+        """spectrogram of data in memory, see finish()"""
+        data = np.asarray(data)
+
+        self.start(data.shape[0], max_columns)
+
+        block_rows = self.CHUNK_FRAMES * self.step
+        for block_start in range(0, data.shape[0], block_rows):
+            self.push(data[block_start:block_start + block_rows])
+
+        return self.finish()
+
+    def welch(self, data: np.ndarray):
+        """
+            welch power spectral density, the mean over all frames, the same as scipy.signal.welch
+            with the window of the engine, returns (frequencies, power) with power as (frequencies, sensors)
+        """
+        frequencies, _, power = self.spectrogram(data, max_columns=1)
+
+        if power.shape[1] == 0:
+            return frequencies, np.full((frequencies.shape[0], power.shape[2]), np.nan)
+
+        return frequencies, power[:, 0]
+
+    def binSums(self, samples: np.ndarray, bin_frames: int) -> tuple:
+        """
+            power sums of every bin_frames consecutive frames of samples and the frame count per bin,
+            returns ((bins, frequencies, sensors) sums, counts)
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        samples = samples.reshape(samples.shape[0], -1)
+
+        n_frames = self.countFrames(samples.shape[0])
+        n_bins = -(-n_frames // bin_frames)
+
+        sums = np.zeros((n_bins, self.frequencies.shape[0], samples.shape[1]))
+
+        # chunks of whole bins
+        chunk_frames = max(1, self.CHUNK_FRAMES // bin_frames) * bin_frames
+        for chunk_start in range(0, n_frames, chunk_frames):
+            n_chunk = min(chunk_frames, n_frames - chunk_start)
+            first_sample = chunk_start * self.step
+
+            power = self._power(samples[first_sample:first_sample + (n_chunk - 1) * self.step + self.nperseg])
+
+            first_bin = chunk_start // bin_frames
+            sums[first_bin:first_bin + -(-n_chunk // bin_frames)] = np.add.reduceat(power, np.arange(0, n_chunk, bin_frames), axis=0)
+
+        counts = np.full(n_bins, bin_frames)
+        if n_bins > 0:
+            counts[-1] = n_frames - (n_bins - 1) * bin_frames
+
+        return sums, counts
+
+    def _power(self, samples: np.ndarray) -> np.ndarray:
+        """(frames, frequencies, sensors) power density of all frames in samples"""
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.nperseg, axis=0)[::self.step]
+
+        # frames is (frames, sensors, nperseg), the copy removes the mean per frame (detrend='constant')
+        frames = frames - frames.mean(axis=2, keepdims=True)
+        frames *= self.window
+
+        spectrum = fft.rfft(frames, n=self.nfft, axis=2, workers=-1)
+
+        power = spectrum.real**2 + spectrum.imag**2
+        power *= self.scale
+
+        return power.transpose(0, 2, 1)
+
+    def _addColumns(self, power: np.ndarray):
+        """averages the frames of power into columns, the last column may stay open for the next chunk"""
+        frame_ids = np.arange(self.n_frames, self.n_frames + power.shape[0])
+        self.n_frames += power.shape[0]
+
+        column_ids = frame_ids // self.frames_per_column
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(column_ids)) + 1))
+
+        sums = np.add.reduceat(power, starts, axis=0)
+        counts = np.diff(np.append(starts, power.shape[0]))
+
+        if self.open_count > 0:
+            sums[0] += self.open_sum
+            counts[0] += self.open_count
+
+        # the last column is complete if the next frame belongs to a new column
+        n_complete = sums.shape[0] if self.n_frames % self.frames_per_column == 0 else sums.shape[0] - 1
+
+        self.columns.extend(sums[i] / counts[i] for i in range(n_complete))
+
+        if n_complete < sums.shape[0]:
+            self.open_sum = sums[-1]
+            self.open_count = counts[-1]
+        else:
+            self.open_sum = None
+            self.open_count = 0
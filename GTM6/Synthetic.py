@@ -0,0 +1,168 @@
+"""
+    synthetic GTM6 log files for benchmarks and experiments
+
+    python -m GTM6 synth synthetic.h5 --duration-s 36000 --sensors 8 --cuts --compression gzip
+    python -m GTM6 live live.h5 --duration-s 600 --append-s 1
+"""
+import time
+
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pandas as pd
+
+
+def _graver_z(positions: np.ndarray, Fs: float, cut_period_s: float, ramp_s: float) -> np.ndarray:
+    """graver in the substrat (0) for 60 % of every cut period and lifted (1) else, with linear ramps"""
+    phase = (positions / Fs) % cut_period_s
+    lifting = np.clip((phase - 0.6 * cut_period_s) / ramp_s, 0, 1)
+    landing = np.clip((phase - (cut_period_s - ramp_s)) / ramp_s, 0, 1)
+    return lifting - landing
+
+
+def _cut_records(n_samples: int, Fs: float, time_start_us: int, cut_period_s: float, ramp_s: float) -> np.ndarray:
+    """one record per period from the end of the landing ramp to the start of the lifting ramp"""
+    n_cuts = int(n_samples / Fs // cut_period_s)
+
+    starts_s = np.arange(n_cuts) * cut_period_s
+    stops_s = starts_s + 0.6 * cut_period_s
+
+    records = np.empty(n_cuts, dtype=[('CUT', np.int32), ('START', np.int64), ('END', np.int64)])
+    records['CUT'] = np.arange(1, n_cuts + 1)
+    records['START'] = time_start_us + (starts_s * 1e6).astype(np.int64)
+    records['END'] = time_start_us + (stops_s * 1e6).astype(np.int64)
+
+    return records
+
+
+def _sensor_parameters(rng: np.random.Generator, n_sensors: int, Fs: float) -> tuple:
+    """every sensor gets its own tones, drift and noise level"""
+    tones = rng.uniform(0.5, 0.45 * Fs, size=(n_sensors, 2))
+    amplitudes = rng.uniform(0.1, 2.0, size=(n_sensors, 2))
+    drift = rng.normal(scale=1e-4, size=n_sensors)
+    offsets = rng.normal(scale=10, size=n_sensors)
+
+    return tones, amplitudes, drift, offsets
+
+
+def _signal_block(rng: np.random.Generator, parameters: tuple, block_start: int, block_stop: int, Fs: float,
+                  time_start_us: int, cut_period_s: float, ramp_s: float, time_jitter_us: int) -> dict:
+    """TIME, GRAVER_Z and the sensors of the samples block_start:block_stop"""
+    tones, amplitudes, drift, offsets = parameters
+    positions = np.arange(block_start, block_stop, dtype=np.float64)
+
+    time_us = time_start_us + (positions * (1e6 / Fs)).astype(np.int64)
+    if time_jitter_us:
+        # smaller than half a sample period, TIME stays increasing
+        time_us += rng.integers(0, max(1, min(time_jitter_us, int(5e5 / Fs))), size=time_us.shape[0])
+
+    block = {'TIME': time_us,
+             'GRAVER_Z': _graver_z(positions, Fs, cut_period_s, ramp_s) + rng.normal(scale=0.005, size=positions.shape[0])}
+
+    seconds = positions / Fs
+    for i in range(offsets.shape[0]):
+        values = offsets[i] + drift[i] * seconds + rng.normal(scale=0.5, size=positions.shape[0])
+        for tone, amplitude in zip(tones[i], amplitudes[i]):
+            values += amplitude * np.sin(2 * np.pi * tone * seconds)
+        block[f'SENSOR{i + 1}'] = values
+
+    return block
+
+
+def write_synthetic_logfile(h5filepath: Path, duration_s: float = 3600, Fs: float = 200, n_sensors: int = 4,
+                            cuts: bool = False, chunk_rows: int = 16384, compression: str = None,
+                            compression_opts=None, start_time='2023-06-09 10:50:00', cut_period_s: float = 37.3,
+                            time_jitter_us: int = 0, seed: int = 0, block_rows: int = 1_000_000) -> Path:
+    """
+        writes a GTM6/LOG file with TIME in µs at Fs, a GRAVER_Z that lands and lifts every cut_period_s
+        and n_sensors sensors SENSOR1.. with a slow drift, two tones and noise,
+        cuts adds a GTM6/CUTS group (CUT, START, END),
+        chunk_rows=None writes contiguous datasets, the data is generated block_rows at a time
+        so the duration is not limited by memory
+    """
+    h5filepath = Path(h5filepath)
+    n_samples = int(round(duration_s * Fs))
+    time_start_us = int(pd.Timestamp(start_time).value // 1000)
+    ramp_s = 0.2
+
+    rng = np.random.default_rng(seed)
+    parameters = _sensor_parameters(rng, n_sensors, Fs)
+
+    # compression without chunk_rows lets h5py choose the chunks
+    dataset_options = {}
+    if chunk_rows:
+        dataset_options['chunks'] = (min(chunk_rows, max(n_samples, 1)),)
+    if compression:
+        dataset_options.update(compression=compression, compression_opts=compression_opts)
+
+    with h5py.File(h5filepath, 'w') as h5file:
+        log_group = h5file.create_group('GTM6/LOG')
+
+        datasets = {'TIME': log_group.create_dataset('TIME', shape=(n_samples,), dtype=np.int64, **dataset_options)}
+        for label in ['GRAVER_Z'] + [f'SENSOR{i + 1}' for i in range(n_sensors)]:
+            datasets[label] = log_group.create_dataset(label, shape=(n_samples,), dtype=np.float64, **dataset_options)
+
+        for block_start in range(0, n_samples, block_rows):
+            block_stop = min(block_start + block_rows, n_samples)
+
+            block = _signal_block(rng, parameters, block_start, block_stop, Fs, time_start_us, cut_period_s, ramp_s, time_jitter_us)
+            for label, values in block.items():
+                datasets[label][block_start:block_stop] = values
+
+        if cuts:
+            records = _cut_records(n_samples, Fs, time_start_us, cut_period_s, ramp_s)
+            cuts_group = h5file['GTM6'].create_group('CUTS')
+            for name in records.dtype.names:
+                cuts_group.create_dataset(name, data=records[name])
+
+    return h5filepath
+
+
+def write_live_logfile(h5filepath: Path, duration_s: float = 600, Fs: float = 200, n_sensors: int = 4,
+                       append_s: float = 1.0, chunk_rows: int = 4096, start_time=None, cut_period_s: float = 37.3,
+                       seed: int = 0, realtime: bool = True) -> Path:
+    """
+        writes a growing GTM6/LOG file in SWMR mode like the GTM6 machine does during a job, the same
+        signals as write_synthetic_logfile are appended every append_s seconds until duration_s is written,
+        a reader opening the file with swmr sees the new rows after LogFile.refresh,
+        realtime=False appends without waiting, start_time defaults to now
+    """
+    h5filepath = Path(h5filepath)
+    n_samples = int(round(duration_s * Fs))
+    append_rows = max(1, int(round(append_s * Fs)))
+    time_start_us = int(pd.Timestamp(start_time if start_time is not None else pd.Timestamp.now()).value // 1000)
+    ramp_s = 0.2
+
+    rng = np.random.default_rng(seed)
+    parameters = _sensor_parameters(rng, n_sensors, Fs)
+
+    # SWMR needs the latest file format and chunked datasets that can grow
+    with h5py.File(h5filepath, 'w', libver='latest') as h5file:
+        log_group = h5file.create_group('GTM6/LOG')
+
+        datasets = {}
+        for label in ['GRAVER_Z'] + [f'SENSOR{i + 1}' for i in range(n_sensors)] + ['TIME']:
+            datasets[label] = log_group.create_dataset(label, shape=(0,), maxshape=(None,), chunks=(chunk_rows,),
+                                                       dtype=np.int64 if label == 'TIME' else np.float64)
+
+        # no new objects can be created from here on
+        h5file.swmr_mode = True
+
+        next_append = time.monotonic()
+        for block_start in range(0, n_samples, append_rows):
+            block_stop = min(block_start + append_rows, n_samples)
+
+            block = _signal_block(rng, parameters, block_start, block_stop, Fs, time_start_us, cut_period_s, ramp_s, 0)
+
+            # TIME is flushed last, a reader never sees a timestamp without its sensor values
+            for label, dataset in datasets.items():
+                dataset.resize((block_stop,))
+                dataset[block_start:block_stop] = block[label]
+                dataset.flush()
+
+            if realtime:
+                next_append += append_s
+                time.sleep(max(0.0, next_append - time.monotonic()))
+
+    return h5filepath
@@ -0,0 +1,170 @@
+import logging
+
+from pathlib import Path
+
+import numpy as np
+
+from .Tracer import shared_tracer
+
+from ._helper import bisect_dataset, cache_dir, file_fingerprint
+
+
+class TimeIndex():
+    """
+        coarse index of the GTM6 TIME vector: every n-th timestamp plus the segment boundaries,
+        it is built once per file and stored as sidecar in the user cache directory
+    """
+
+    # number of samples between two index entries
+    STRIDE = 1024
+    # samples read at once while building the index
+    BUILD_BLOCK = STRIDE * 1024
+    # a time step larger than GAP_FACTOR * median step starts a new segment
+    GAP_FACTOR = 10
+
+    def __init__(self, time_dataset, h5filepath: Path, stride: int = STRIDE):
+
+        self.time_dataset = time_dataset
+        self.h5filepath = Path(h5filepath)
+        self.stride = stride
+        self.n_samples = time_dataset.shape[0]
+
+        self.samples = np.empty(0, dtype=np.int64)
+        self.segments = np.empty(0, dtype=np.int64)
+        self.last_time = None
+
+        try:
+            self.sidecar_path = cache_dir('timeindex').joinpath(f'{file_fingerprint(self.h5filepath)}.npz')
+        except OSError as oe:
+            logging.debug(f'no time index cache for {self.h5filepath}: {oe}')
+            self.sidecar_path = None
+
+        if not self.load():
+            self.build()
+            self.save()
+
+    def build(self):
+        """reads the TIME vector once block by block"""
+        samples = []
+        segments = [0] if self.n_samples > 0 else []
+        nominal_step = None
+        previous = None
+
+        for block_start in range(0, self.n_samples, self.BUILD_BLOCK):
+            times = shared_tracer.read(self.time_dataset, slice(block_start, block_start + self.BUILD_BLOCK))
+
+            # BUILD_BLOCK is a multiple of stride, so the sampling stays aligned
+            samples.append(times[::self.stride])
+
+            if previous is None:
+                times_diff = np.diff(times)
+                offset = block_start + 1
+            else:
+                times_diff = np.diff(times, prepend=previous)
+                offset = block_start
+
+            # the first block defines the nominal sample step
+            if nominal_step is None and times_diff.size > 0:
+                nominal_step = np.median(times_diff)
+
+            if nominal_step:
+                gaps = np.flatnonzero(times_diff > self.GAP_FACTOR * nominal_step)
+                segments.extend((offset + gaps).tolist())
+
+            previous = times[-1]
+
+        if samples:
+            self.samples = np.concatenate(samples).astype(np.int64)
+            self.last_time = int(previous)
+
+        self.segments = np.asarray(segments, dtype=np.int64)
+
+    def extend(self, n_samples: int):
+        """
+            adds the samples appended to a growing file up to n_samples, only the new part
+            of TIME is read, the extended index is not written to the sidecar
+        """
+        if n_samples <= self.n_samples:
+            return
+
+        old_samples = self.n_samples
+        # the last known timestamp is read again for the step into the new part
+        read_start = max(0, old_samples - 1)
+        times = shared_tracer.read(self.time_dataset, slice(read_start, n_samples))
+        new_times = times[old_samples - read_start:]
+
+        first_sample = -(-old_samples // self.stride) * self.stride
+        self.samples = np.append(self.samples, times[first_sample - read_start::self.stride].astype(np.int64))
+
+        if old_samples == 0:
+            self.segments = np.zeros(1, dtype=np.int64)
+
+        # the nominal step of the index entries, the new part itself if the index was too short
+        if self.samples.shape[0] > 2:
+            nominal_step = np.median(np.diff(self.samples)) / self.stride
+        else:
+            nominal_step = np.median(np.diff(times)) if times.shape[0] > 1 else None
+
+        if nominal_step:
+            gaps = np.flatnonzero(np.diff(times) > self.GAP_FACTOR * nominal_step)
+            self.segments = np.append(self.segments, (read_start + 1 + gaps).astype(np.int64))
+
+        self.last_time = int(new_times[-1])
+        self.n_samples = n_samples
+
+    def load(self) -> bool:
+        if self.sidecar_path is None or not self.sidecar_path.is_file():
+            return False
+        try:
+            with np.load(self.sidecar_path) as sidecar:
+                if int(sidecar['n_samples']) != self.n_samples or int(sidecar['stride']) != self.stride:
+                    return False
+
+                self.samples = sidecar['samples']
+                self.segments = sidecar['segments']
+                self.last_time = int(sidecar['last_time']) if self.n_samples > 0 else None
+            return True
+
+        except (OSError, KeyError, ValueError) as e:
+            logging.debug(f'time index sidecar {self.sidecar_path} unreadable: {e}')
+            return False
+
+    def save(self):
+        if self.sidecar_path is None:
+            return
+        try:
+            tmp_path = self.sidecar_path.with_suffix('.tmp')
+            with tmp_path.open('wb') as fp:
+                np.savez(fp, samples=self.samples, segments=self.segments, n_samples=self.n_samples,
+                         stride=self.stride, last_time=self.last_time if self.last_time is not None else 0)
+            tmp_path.replace(self.sidecar_path)
+
+        except OSError as oe:
+            logging.debug(f'could not write time index sidecar {self.sidecar_path}: {oe}')
+
+    def getStartTime(self) -> int:
+        return int(self.samples[0]) if self.n_samples > 0 else None
+
+    def getEndTime(self) -> int:
+        return self.last_time
+
+    def getSegments(self) -> list:
+        """list of (start index, stop index) of the continuous parts of the recording"""
+        bounds = np.append(self.segments, self.n_samples)
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def locate(self, time_us: int, right: bool = False) -> int:
+        """
+            index of the first sample with TIME >= time_us (TIME > time_us if right is set),
+            only the block between two index entries is read from the file
+        """
+        side = 'right' if right else 'left'
+        k = int(np.searchsorted(self.samples, time_us, side=side))
+
+        lo = (k - 1) * self.stride + 1 if k > 0 else 0
+        hi = min(k * self.stride, self.n_samples)
+
+        if lo >= hi:
+            return hi
+
+        return bisect_dataset(self.time_dataset, time_us, lo=lo, hi=hi, right=right)
@@ -0,0 +1,118 @@
+import json
+import time
+import logging
+import threading
+
+from datetime import datetime
+from contextlib import contextmanager
+
+
+class Tracer():
+    """
+        timing and I/O counters of LogFile operations, every span is written as one JSON line
+        to the 'GTM6.spans' logger (see Logger) and added to the session summary
+
+        the counters are kept per thread, a span counts the reads and cache lookups of its own
+        thread including those of nested spans
+    """
+
+    COUNTERS = ('rows_read', 'bytes_read', 'h5py_calls', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+        # span name -> summed up record
+        self.totals = {}
+
+        # silent until Logger adds its JSON lines handler
+        self.logger = logging.getLogger('GTM6.spans')
+        self.logger.propagate = False
+
+    def _counters(self) -> dict:
+        if not hasattr(self.local, 'counters'):
+            self.local.counters = dict.fromkeys(self.COUNTERS, 0)
+            self.local.depth = 0
+        return self.local.counters
+
+    def count(self, counter: str, n: int = 1):
+        self._counters()[counter] += n
+
+    def read(self, dataset, selection):
+        """dataset[selection], counted as one h5py call"""
+        data = dataset[selection]
+
+        counters = self._counters()
+        counters['h5py_calls'] += 1
+        counters['rows_read'] += data.shape[0] if data.ndim else 1
+        counters['bytes_read'] += data.nbytes
+
+        return data
+
+    def readDirect(self, dataset, dest, source_sel):
+        """dataset.read_direct(dest, source_sel), counted as one h5py call"""
+        dataset.read_direct(dest, source_sel)
+
+        counters = self._counters()
+        counters['h5py_calls'] += 1
+        counters['rows_read'] += dest.shape[0]
+        counters['bytes_read'] += dest.shape[0] * dataset.dtype.itemsize
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+            times the block, yields the attributes dict so the block can add to it,
+            e.g. the rows of the loaded window
+        """
+        counters = self._counters()
+        counters_start = dict(counters)
+        self.local.depth += 1
+
+        started = datetime.now()
+        t_start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            wall_s = time.perf_counter() - t_start
+            self.local.depth -= 1
+
+            record = {'span': name, 'start': started.isoformat(timespec='milliseconds'), 'wall_s': round(wall_s, 6),
+                      'depth': self.local.depth, 'thread': threading.current_thread().name}
+            record.update({counter: counters[counter] - counters_start[counter] for counter in self.COUNTERS})
+            record.update(attributes)
+
+            self._add(record)
+
+            if self.logger.handlers and self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(json.dumps(record, default=str))
+
+    def _add(self, record: dict):
+        with self.lock:
+            total = self.totals.setdefault(record['span'], dict.fromkeys(('count', 'wall_s') + self.COUNTERS, 0))
+            total['count'] += 1
+            total['wall_s'] += record['wall_s']
+            for counter in self.COUNTERS:
+                total[counter] += record[counter]
+
+    def summary(self) -> dict:
+        """summed up spans of the session by name"""
+        with self.lock:
+            return {name: dict(total) for name, total in self.totals.items()}
+
+    def summaryText(self) -> str:
+        """one line per span name for the info box"""
+        lines = []
+        for name, total in self.summary().items():
+            hit_rate = total['cache_hits'] / max(1, total['cache_hits'] + total['cache_misses'])
+            lines.append(f"{name}: {total['count']}x {total['wall_s']:.2f} s, "
+                         f"{total['bytes_read'] / 2**20:.1f} MB in {total['h5py_calls']} reads, "
+                         f"cache {hit_rate:.0%}")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.totals = {}
+
+
+# one tracer for the session
+shared_tracer = Tracer()
@@ -1,11 +1,37 @@
 from .LogFile import LogFile
+from .LogFileSet import LogFileSet
 from .Logger import Logger
 from .CutEdges import CutEdges
 from .PlotConfig import PlotConfig
+from .BlockCache import BlockCache
+from .ColumnPool import ColumnPool
+from .SpectrumCache import SpectrumCache
+from .FilterBank import FilterBank
+from .LinearDetrend import LinearDetrend
+from .SpectrumEngine import SpectrumEngine
+from .Prefetcher import Prefetcher
+from .Tracer import Tracer
+from .Scanner import scan_logfile, scan_logfiles
+from .Catalog import Catalog
+from .Synthetic import write_synthetic_logfile, write_live_logfile
 
 __all__ = [
     "LogFile",
+    "LogFileSet",
     "Logger",
     "CutEdges",
-    "PlotConfig"
+    "PlotConfig",
+    "BlockCache",
+    "ColumnPool",
+    "SpectrumCache",
+    "FilterBank",
+    "LinearDetrend",
+    "SpectrumEngine",
+    "Prefetcher",
+    "Tracer",
+    "Catalog",
+    "scan_logfile",
+    "scan_logfiles",
+    "write_synthetic_logfile",
+    "write_live_logfile"
 ]
\ No newline at end of file
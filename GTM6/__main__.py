@@ -0,0 +1,139 @@
+"""
+    command line entry point, runs without a display
+
+    python -m GTM6 export LOGDIR --sensors GRAVER_Z SENSOR1 --window "2023-06-09 10:50:00" 60 --format npz -o out
+    python -m GTM6 synth synthetic.h5 --duration-s 36000 --cuts
+    python -m GTM6 live live.h5 --duration-s 600
+    python -m GTM6 bench --repeat 3
+"""
+import sys
+import json
+import argparse
+import logging
+
+from .Export import EXPORT_FORMATS, DETREND_MODES, export_logfiles
+
+
+def _export(args) -> int:
+    windows = [(start, float(seconds)) for start, seconds in args.window] if args.window else None
+
+    n_failed = 0
+    for h5filepath, written, error in export_logfiles(args.paths, args.output, sensors=args.sensors, windows=windows,
+                                                      export_format=args.format, chunk_rows=args.chunk_rows,
+                                                      max_workers=args.workers, cuts=args.cut, bandpass=args.bandpass,
+                                                      detrend=args.detrend):
+        if error is not None:
+            n_failed += 1
+            logging.error(f'{h5filepath}: {error}')
+            continue
+
+        for output_path in written:
+            print(output_path)
+
+    return 1 if n_failed else 0
+
+
+def _synth(args) -> int:
+    from .Synthetic import write_synthetic_logfile
+
+    print(write_synthetic_logfile(args.path, duration_s=args.duration_s, Fs=args.fs, n_sensors=args.sensors,
+                                  cuts=args.cuts, chunk_rows=args.chunk_rows or None, compression=args.compression,
+                                  seed=args.seed))
+    return 0
+
+
+def _live(args) -> int:
+    from .Synthetic import write_live_logfile
+
+    logging.info(f'writing {args.path} for {args.duration_s} s, open it with follow mode')
+    print(write_live_logfile(args.path, duration_s=args.duration_s, Fs=args.fs, n_sensors=args.sensors,
+                             append_s=args.append_s, chunk_rows=args.chunk_rows, seed=args.seed))
+    return 0
+
+
+def _bench(args) -> int:
+    # imported here, the benchmarks switch matplotlib to the Agg backend
+    from .Benchmark import BENCHMARKS, run_benchmarks, format_result
+
+    unknown = [name for name in args.only or [] if name not in BENCHMARKS]
+    if unknown:
+        logging.error(f'unknown benchmarks {unknown}, use some of {list(BENCHMARKS)}')
+        return 2
+
+    results = []
+    for result in run_benchmarks(args.file, names=args.only, repeat=args.repeat, duration_s=args.duration_s,
+                                 window_s=args.window_s, n_sensors=args.sensors):
+        print(format_result(result), flush=True)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(results, fp, indent=2)
+
+    return 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m GTM6', description='GTM6 log file tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='export sensor data of time windows to parquet, npz or csv')
+    export_parser.add_argument('paths', nargs='+', help='log files or directories with log files')
+    export_parser.add_argument('-o', '--output', default='.', help='output directory')
+    export_parser.add_argument('-s', '--sensors', nargs='+', default=None, help='sensors to export, default all valid sensors')
+    export_parser.add_argument('-w', '--window', nargs=2, action='append', metavar=('START', 'SECONDS'),
+                               help='time window, can be given several times, default the whole file')
+    export_parser.add_argument('-c', '--cut', type=int, action='append', help='cut number, can be given several times')
+    export_parser.add_argument('-b', '--bandpass', nargs='+', type=float, metavar='HZ',
+                               help='zero phase bandpass F_LOW F_HIGH [ORDER], 0 or the nyquist frequency as edge gives a high- or lowpass')
+    export_parser.add_argument('-d', '--detrend', choices=DETREND_MODES, default=None,
+                               help='remove the linear trend of every exported file or of every chunk of --chunk-rows')
+    export_parser.add_argument('-f', '--format', choices=EXPORT_FORMATS, default='parquet')
+    export_parser.add_argument('--chunk-rows', type=int, default=1_000_000, help='rows held in memory at once')
+    export_parser.add_argument('-j', '--workers', type=int, default=1, help='files exported in parallel')
+    export_parser.set_defaults(func=_export)
+
+    synth_parser = subparsers.add_parser('synth', help='write a synthetic GTM6 log file')
+    synth_parser.add_argument('path', help='output hdf5 file')
+    synth_parser.add_argument('--duration-s', type=float, default=3600)
+    synth_parser.add_argument('--fs', type=float, default=200, help='sample frequency in Hz')
+    synth_parser.add_argument('--sensors', type=int, default=4, help='number of sensors besides GRAVER_Z')
+    synth_parser.add_argument('--cuts', action='store_true', help='add a CUTS group')
+    synth_parser.add_argument('--chunk-rows', type=int, default=16384, help='hdf5 chunk length, 0 for contiguous datasets')
+    synth_parser.add_argument('--compression', choices=('gzip', 'lzf'), default=None)
+    synth_parser.add_argument('--seed', type=int, default=0)
+    synth_parser.set_defaults(func=_synth)
+
+    live_parser = subparsers.add_parser('live', help='write a synthetic GTM6 log file in SWMR mode while it grows, to try follow mode')
+    live_parser.add_argument('path', help='output hdf5 file')
+    live_parser.add_argument('--duration-s', type=float, default=600, help='recording time until the file is closed')
+    live_parser.add_argument('--append-s', type=float, default=1.0, help='seconds between two appends')
+    live_parser.add_argument('--fs', type=float, default=200, help='sample frequency in Hz')
+    live_parser.add_argument('--sensors', type=int, default=4, help='number of sensors besides GRAVER_Z')
+    live_parser.add_argument('--chunk-rows', type=int, default=4096, help='hdf5 chunk length')
+    live_parser.add_argument('--seed', type=int, default=0)
+    live_parser.set_defaults(func=_live)
+
+    bench_parser = subparsers.add_parser('bench', help='time and peak memory of the main code paths, runs headless')
+    bench_parser.add_argument('--file', default=None, help='log file to use instead of a synthetic one')
+    bench_parser.add_argument('--only', nargs='+', default=None, metavar='NAME',
+                              help="benchmarks to run: 'window load', 'plot data', 'spectrum', 'scan', 'edges'")
+    bench_parser.add_argument('--repeat', type=int, default=3)
+    bench_parser.add_argument('--duration-s', type=float, default=3600, help='length of the synthetic file')
+    bench_parser.add_argument('--window-s', type=float, default=600, help='plot window length')
+    bench_parser.add_argument('--sensors', type=int, default=4)
+    bench_parser.add_argument('--json', default=None, help='also write the results to this file')
+    bench_parser.set_defaults(func=_bench)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'export' and args.bandpass is not None and len(args.bandpass) not in (2, 3):
+        parser.error('--bandpass needs F_LOW F_HIGH [ORDER]')
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
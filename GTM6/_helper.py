@@ -1,49 +1,368 @@
+import os
+import hashlib
+
+from pathlib import Path
+from functools import lru_cache
+
 import numpy as np
-from scipy.signal import welch, spectrogram, convolve, fftconvolve, find_peaks, freqz, butter, lfilter, lfilter_zi
+from .Tracer import shared_tracer
+
+from scipy.signal import welch, spectrogram, convolve, fftconvolve, find_peaks, freqz, butter, sosfilt, sosfilt_zi
 
 ############################
 #### Linear Regression Helper
-def _extend_matrix(X: np.ndarray) -> np.ndarray:
+# LR_sums
+def LR_sums(X: np.ndarray, y: np.ndarray, sums: tuple = None) -> tuple:
+    """
+        adds the regression sums (n, sum X, X.T X, sum y, X.T y) of one block to sums,
+        y can have one column per target, no design matrix is built
+    """
+    X = np.asarray(X, dtype=np.float64)
+    X = X.reshape(X.shape[0], -1)
+    y = np.asarray(y, dtype=np.float64)
+
+    block_sums = (X.shape[0], X.sum(axis=0), X.T.dot(X), y.sum(axis=0), X.T.dot(y))
+
+    if sums is None:
+        return block_sums
+
+    return tuple(total + block for total, block in zip(sums, block_sums))
+# LR_solve
+def LR_solve(sums: tuple) -> np.ndarray:
+    """theta of the normal equations from LR_sums, the first row is the intercept"""
+    n, X_sum, XX, y_sum, Xy = sums
 
-    X_ext = np.c_[np.ones((np.size(X,0),1)),X]
+    XX_ext = np.empty((XX.shape[0] + 1, XX.shape[0] + 1))
+    XX_ext[0, 0] = n
+    XX_ext[0, 1:] = X_sum
+    XX_ext[1:, 0] = X_sum
+    XX_ext[1:, 1:] = XX
 
-    return X_ext
+    Xy_ext = np.concatenate((np.reshape(y_sum, (1,) + np.shape(y_sum)), Xy))
+
+    return np.linalg.solve(XX_ext, Xy_ext)
 # LR_fit
 def LR_fit(X: np.ndarray, y: np.ndarray) -> np.ndarray:
 
-    X_ext = _extend_matrix(X)
-
-    theta = np.linalg.solve(X_ext.T.dot(X_ext),X_ext.T.dot(y))
+    theta = LR_solve(LR_sums(X, y))
 
     return theta
 # LR_predict
 def LR_predict(X: np.ndarray, theta: np.ndarray)-> np.ndarray:
 
-    y = _extend_matrix(X).dot(theta)
+    X = np.asarray(X, dtype=np.float64)
+
+    y = X.reshape(X.shape[0], -1).dot(theta[1:]) + theta[0]
 
     return y
 
 
 ##############################
 ### Signal Processing Helper
-def _butter_bandpass(lowcut:float, highcut:float, fs:float, order:int):
+@lru_cache(maxsize=64)
+def butter_bandpass_sos(lowcut: float, highcut: float, fs: float, order: int = 5) -> np.ndarray:
+    """
+        cached second order sections of a butterworth bandpass, an edge at 0 Hz or at/above
+        the nyquist frequency turns it into a high- or lowpass
+    """
     nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    b, a = butter(order, [low, high], btype='band')
-    return b, a
+
+    if lowcut <= 0 and highcut >= nyq:
+        raise ValueError(f'bandpass {lowcut}-{highcut} Hz passes everything at Fs {fs}')
+
+    if highcut >= nyq:
+        sos = butter(order, lowcut / nyq, btype='highpass', output='sos')
+    elif lowcut <= 0:
+        sos = butter(order, highcut / nyq, btype='lowpass', output='sos')
+    else:
+        sos = butter(order, [lowcut / nyq, highcut / nyq], btype='band', output='sos')
+
+    return sos
+
+
+def sos_initial_state(sos: np.ndarray, first_values: np.ndarray) -> np.ndarray:
+    """steady state of the filter for a signal that starts at first_values, one column per sensor"""
+    zi = sosfilt_zi(sos)
+    first_values = np.asarray(first_values, dtype=np.float64)
+
+    return zi.reshape(zi.shape + (1,) * first_values.ndim) * first_values
 
 
 def butter_bandpass_filter(data:np.ndarray, lowcut:float, highcut:float, fs:float, order:int=5):
-    b, a = _butter_bandpass(lowcut, highcut, fs, order=order)
-    zi = lfilter_zi(b, a)
-    y,_ = lfilter(b, a, data, zi=zi*data[0])
-    
+    """zero phase bandpass along the first axis, 2D data filters one sensor per column"""
+    sos = butter_bandpass_sos(lowcut, highcut, fs, order)
+
+    data = np.asarray(data, dtype=np.float64)
+
+    y, _ = sosfilt(sos, data, axis=0, zi=sos_initial_state(sos, data[0]))
+
     y = y[::-1]
-    
-    y,_ = lfilter(b, a, y, zi=zi*y[0]) # cascade for lag compensation https://dsp.stackexchange.com/questions/26299/zero-lag-butterworth-filtering
-    
+
+    y, _ = sosfilt(sos, y, axis=0, zi=sos_initial_state(sos, y[0])) # cascade for lag compensation https://dsp.stackexchange.com/questions/26299/zero-lag-butterworth-filtering
+
     return y[::-1]
 
 
+@lru_cache(maxsize=64)
+def butter_bandpass_settling(lowcut: float, highcut: float, fs: float, order: int = 5, tol: float = 1e-7,
+                             max_samples: int = 2**24) -> int:
+    """samples until the impulse response of the bandpass decays below tol of its peak"""
+    sos = butter_bandpass_sos(lowcut, highcut, fs, order)
+
+    n_samples = 1024
+    while True:
+        impulse = np.zeros(n_samples)
+        impulse[0] = 1.0
+        response = np.abs(sosfilt(sos, impulse))
+
+        last = np.flatnonzero(response > tol * response.max())[-1]
+
+        if last < n_samples // 2 or n_samples >= max_samples:
+            return int(last) + 1
+
+        n_samples *= 2
+
+
+def ffill_nan(data: np.ndarray, fill_leading: bool = True) -> np.ndarray:
+    """
+        forward fill NaN values, leading NaN take the first valid value,
+        with fill_leading False they stay NaN like in DataFrame.ffill
+    """
+    valid = ~np.isnan(data)
+
+    if valid.all():
+        return data
+    if not valid.any():
+        return np.zeros_like(data) if fill_leading else data
+
+    idx = np.where(valid, np.arange(data.shape[0]), 0)
+    if fill_leading:
+        idx[:np.argmax(valid)] = np.argmax(valid)
+    np.maximum.accumulate(idx, out=idx)
+
+    return data[idx]
+
+
+def moving_average(data: np.ndarray, n: int) -> np.ndarray:
+    """centered moving average over n samples via cumulative sum, O(len(data)) for every n"""
+    n_data = data.shape[0]
+    n = max(1, min(int(n), n_data))
+
+    csum = np.empty(n_data + 1, dtype=np.float64)
+    csum[0] = 0.0
+    np.cumsum(data, out=csum[1:])
+
+    averaged = np.empty(n_data, dtype=np.float64)
+
+    # window [i - left, i + right], shrinks at the borders
+    left = (n - 1) // 2
+    right = n - 1 - left
+
+    np.subtract(csum[n:], csum[:n_data + 1 - n], out=averaged[left:n_data - right])
+    averaged[left:n_data - right] /= n
+
+    for i in range(left):
+        averaged[i] = csum[i + right + 1] / (i + right + 1)
+    for i in range(n_data - right, n_data):
+        averaged[i] = (csum[n_data] - csum[i - left]) / (n_data - i + left)
+
+    return averaged
+
+
+def trailing_average(data: np.ndarray, n: int, out: np.ndarray = None) -> np.ndarray:
+    """
+        mean of the last n samples (fewer at the start) via cumulative sum,
+        matches the pandas time based rolling mean for a constant sample rate
+    """
+    n_data = data.shape[0]
+    n = max(1, int(n))
+
+    if out is None:
+        out = np.empty(n_data, dtype=np.float64)
+
+    if n_data == 0:
+        return out
+
+    np.cumsum(data, out=out)
+
+    # out holds the cumulative sum, sums of full windows are built back to front
+    if n_data > n:
+        out[n:] -= out[:n_data - n].copy()
+
+    out[:n] /= np.arange(1, min(n, n_data) + 1)
+    out[n:] /= n
+
+    return out
+
+
+def gradient_inplace(data: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """np.gradient with unit spacing written into a preallocated buffer"""
+    n_data = data.shape[0]
+
+    if n_data < 2:
+        out[:] = 0.0
+        return out
+
+    np.subtract(data[2:], data[:-2], out=out[1:-1])
+    out[1:-1] *= 0.5
+    out[0] = data[1] - data[0]
+    out[-1] = data[-1] - data[-2]
+
+    return out
+
+
+def smoothed_gradient(data: np.ndarray, n_window: int, shift: int, scale: float = 500.0) -> np.ndarray:
+    """
+        gradient of the trailing average, shifted back by shift samples and averaged again,
+        the last 2 * shift samples have no look ahead and are NaN
+    """
+    data = np.nan_to_num(np.asarray(data, dtype=np.float64))
+    n_data = data.shape[0]
+
+    # the gradient ignores a constant offset, removing it keeps the cumulative sums small
+    if n_data > 0:
+        data -= data.mean()
+
+    result = np.full(n_data, np.nan)
+    n_valid = n_data - shift
+
+    if n_valid <= 0:
+        return result
+
+    buffer_a = trailing_average(data, n_window)
+    buffer_b = np.empty(n_valid, dtype=np.float64)
+
+    # shifted average -> gradient -> average, two buffers in turn
+    gradient_inplace(buffer_a[shift:], buffer_b)
+    buffer_b *= scale
+    trailing_average(buffer_b, n_window, out=buffer_a[:n_valid])
+
+    if n_valid > shift:
+        result[:n_valid - shift] = buffer_a[shift:n_valid]
+
+    return result
+
+
+class SmoothedGradient():
+    """
+        streaming version of smoothed_gradient, blocks are pushed in order and every push
+        returns the values that can no longer change, flush() returns the rest
+    """
+
+    def __init__(self, n_window: int, shift: int, scale: float = 500.0):
+        self.n_window = max(1, int(n_window))
+        self.shift = max(0, int(shift))
+        self.scale = scale
+
+        # samples before and after a position that its value depends on
+        self.lookback = 2 * self.n_window + 2
+        self.lookahead = 2 * self.shift + 2
+
+        self.buffer = np.empty(0, dtype=np.float64)
+        # global position of buffer[0] and of the next value to return
+        self.buffer_start = 0
+        self.n_emitted = 0
+
+    def push(self, block: np.ndarray) -> np.ndarray:
+        self.buffer = np.concatenate((self.buffer, np.asarray(block, dtype=np.float64)))
+
+        emit_stop = self.buffer_start + self.buffer.shape[0] - self.lookahead
+        if emit_stop <= self.n_emitted:
+            return np.empty(0, dtype=np.float64)
+
+        values = smoothed_gradient(self.buffer, self.n_window, self.shift, self.scale)
+        emitted = values[self.n_emitted - self.buffer_start:emit_stop - self.buffer_start]
+        self.n_emitted = emit_stop
+
+        # keep only what later values depend on
+        keep_start = max(self.n_emitted - self.lookback, self.buffer_start)
+        self.buffer = self.buffer[keep_start - self.buffer_start:]
+        self.buffer_start = keep_start
+
+        return emitted
+
+    def flush(self) -> np.ndarray:
+        values = smoothed_gradient(self.buffer, self.n_window, self.shift, self.scale)
+        emitted = values[self.n_emitted - self.buffer_start:]
+        self.n_emitted += emitted.shape[0]
+        self.buffer = np.empty(0, dtype=np.float64)
+        return emitted
+
+
+##############################
+### HDF5 Time Helper
+def timestamp_to_us(timestamp) -> int:
+    """convert a datetime like object into the GTM6 TIME unit (µs since epoch)"""
+    return int(timestamp.timestamp() * 1e6)
+
+
+def bisect_dataset(dataset, value: int, lo: int = 0, hi: int = None, right: bool = False, block: int = 4096) -> int:
+    """
+        bisection over a sorted 1D hdf5 dataset, reading only single elements
+        until the remaining interval fits into one small block
+    """
+    if hi is None:
+        hi = dataset.shape[0]
+
+    while hi - lo > block:
+        mid = (lo + hi) // 2
+        mid_value = shared_tracer.read(dataset, mid)
+
+        if mid_value < value or (right and mid_value == value):
+            lo = mid + 1
+        else:
+            hi = mid
+
+    side = 'right' if right else 'left'
+    return lo + int(np.searchsorted(shared_tracer.read(dataset, slice(lo, hi)), value, side=side))
+
+
+##############################
+### Cache Helper
+def cache_dir(subdir: str = '') -> Path:
+    """
+        per user cache directory of the viewer, can be moved with the GTM6_CACHE_DIR environment variable
+    """
+    base = os.environ.get('GTM6_CACHE_DIR')
+
+    if base is None:
+        user_cache = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or Path.home().joinpath('.cache')
+        base = Path(user_cache).joinpath('gtm6_hdf5view')
+
+    path = Path(base).joinpath(subdir)
+    path.mkdir(parents=True, exist_ok=True)
+
+    return path
+
+
+def file_fingerprint(filepath: Path) -> str:
+    """key of a file on disk, changes whenever path, size or modification time change"""
+    filepath = Path(filepath).resolve()
+    stat = filepath.stat()
+
+    return hashlib.sha1(f'{filepath}|{stat.st_size}|{stat.st_mtime_ns}'.encode()).hexdigest()
+
+
+##############################
+### Memory Map Helper
+# file drivers that keep the file as one plain file on disk
+MEMMAP_DRIVERS = ('sec2', 'stdio', 'windows')
+
+
+def memmap_dataset(dataset) -> np.ndarray:
+    """
+        read-only memory map of a 1D dataset stored contiguous and unfiltered in its file,
+        None for chunked (so also compressed), external, virtual, empty or not yet written datasets
+    """
+    if dataset.ndim != 1 or dataset.chunks is not None or dataset.external or dataset.is_virtual:
+        return None
+
+    if dataset.dtype.kind not in 'biuf' or dataset.file.driver not in MEMMAP_DRIVERS or dataset.shape[0] == 0:
+        return None
+
+    # None until the storage is allocated
+    offset = dataset.id.get_offset()
+    if offset is None:
+        return None
 
+    return np.memmap(dataset.file.filename, dtype=dataset.dtype, mode='r', offset=offset, shape=dataset.shape)
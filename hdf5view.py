@@ -1,10 +1,17 @@
 
 import traceback
 import logging
+import queue
+import threading
+import numpy as np
 import pandas as pd
 
 import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+import matplotlib.dates as mdates
 from matplotlib import style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
 import tkinter as tk
 from tkinter import ttk, messagebox, Toplevel, filedialog
@@ -12,7 +19,8 @@ from tkinter import ttk, messagebox, Toplevel, filedialog
 from datetime import datetime, timedelta
 from pathlib import Path
 
-from GTM6 import Logger, LogFile, PlotConfig
+from GTM6 import Logger, LogFile, LogFileSet, PlotConfig, Catalog, CutEdges, Prefetcher
+from GTM6.Tracer import shared_tracer
 
 
 ### 
@@ -20,8 +28,27 @@ file_version = "2023.09.28"
 logfilename = 'hdf5view_logfile.log'
 default_plot_params = 'default_plot_params.json'
 
+# directory scan
+scan_max_workers = 4
+scan_timeout_s = 60
+
+# background tasks
+task_poll_ms = 100
+
+# embedded plot, zoom and pan reload the lines once the view rests for requery_delay_ms,
+# views longer than requery_max_s keep the loaded lines
+requery_delay_ms = 300
+requery_max_s = 6 * 3600
+
+# follow mode refreshes the newest file every follow_interval_ms while the machine writes it
+follow_interval_ms = 1000
+
 #banned_sensors = ['SENSOR4','SENSOR5','SENSOR6','SENSOR7','SENSOR8']
 
+
+class TaskCancelled(Exception):
+    """raised by the progress callback of a cancelled or superseded background task"""
+
 #############################################################################################################################################################
 class DeviceSelectorMenu(Toplevel):
     def __init__(self, parent, device_list):
@@ -317,11 +344,17 @@ class DateTimePickerDialog(Toplevel):
             pass
 ###########################################################################################################################################################
 class LogFileSelectionDialog(Toplevel):
-    def __init__(self, master, files):
+    def __init__(self, master, files, catalog):
         super().__init__(master)
         
         self.directory_files = files
+        self.catalog = catalog
         self.selected_files = []
+        # metadata of the scanned files, keyed by path
+        self.scan_results = {}
+
+        self.scan_queue = queue.Queue()
+        self.scan_cancel = threading.Event()
 
         dir_files_len = len(self.directory_files)
 
@@ -330,11 +363,21 @@ class LogFileSelectionDialog(Toplevel):
             # Create checkboxes for each file
             self.checkbox_vars = [tk.BooleanVar(value=False) for _ in self.directory_files]
             self.checkboxes = []
+            self.scan_labels = []
 
             for i, file in enumerate(files):
                 checkbox = ttk.Checkbutton(self, text=file, variable=self.checkbox_vars[i])
                 checkbox.grid(row=i, column=0, sticky="w")
                 self.checkboxes.append(checkbox)
+
+                scan_label = ttk.Label(self, text="scanning..")
+                scan_label.grid(row=i, column=1, columnspan=2, sticky="w")
+                self.scan_labels.append(scan_label)
+
+            # unchanged files come from the catalog, the others are scanned in a process pool
+            # and streamed into the dialog
+            threading.Thread(target=self.scan_files, daemon=True).start()
+            self.after(100, self.poll_scan_results)
         else:
             self.title("No Files found")
             nothingness_label = ttk.Label(self, text="There are no hdf5 or h5 databases in this folder")
@@ -345,6 +388,74 @@ class LogFileSelectionDialog(Toplevel):
         ttk.Button(self, text="Select All", command=self.select_all).grid(row = dir_files_len + 1, column=1, sticky="w")
         ttk.Button(self, text="Save and Close", command=self.save_and_close).grid(row = dir_files_len + 1, column=2, sticky="w")
 
+        # time range filter, answered by the catalog
+        filter_frame = ttk.Frame(self)
+        filter_frame.grid(row = dir_files_len + 2, column=0, columnspan=3, sticky="w", pady=5)
+
+        self.filter_from_var = tk.StringVar()
+        self.filter_to_var = tk.StringVar()
+
+        ttk.Label(filter_frame, text="From (YYYY-MM-DD HH:MM:SS):").grid(row=0, column=0, sticky="w")
+        ttk.Entry(filter_frame, textvariable=self.filter_from_var, width=20).grid(row=0, column=1, padx=5)
+        ttk.Label(filter_frame, text="To:").grid(row=0, column=2, sticky="w")
+        ttk.Entry(filter_frame, textvariable=self.filter_to_var, width=20).grid(row=0, column=3, padx=5)
+        ttk.Button(filter_frame, text="Filter", command=self.filter_time_range).grid(row=0, column=4, padx=5)
+        ttk.Button(filter_frame, text="Show All", command=self.show_all).grid(row=0, column=5, padx=5)
+
+        self.protocol("WM_DELETE_WINDOW", self.save_and_close)
+
+    def scan_files(self):
+        """worker thread, never touches tk widgets"""
+        for result in self.catalog.refresh(self.directory_files, max_workers=scan_max_workers, timeout_s=scan_timeout_s):
+            if self.scan_cancel.is_set():
+                break
+            self.scan_queue.put(result)
+
+    def poll_scan_results(self):
+        while not self.scan_queue.empty():
+            result = self.scan_queue.get_nowait()
+            self.scan_results[result['path']] = result
+
+            scan_label = self.scan_labels[self.directory_files.index(result['path'])]
+
+            if result['valid']:
+                start = pd.to_datetime(result['start'], unit='us')
+                end = pd.to_datetime(result['end'], unit='us')
+                cuts = ", cuts" if result['cuts'] else ""
+                scan_label.config(text=f"{start} -> {end}, {sum(result['sensor valid'])} sensors{cuts}")
+            else:
+                scan_label.config(text=f"invalid: {result['error']}")
+
+        if len(self.scan_results) < len(self.directory_files) and not self.scan_cancel.is_set():
+            self.after(100, self.poll_scan_results)
+
+    def filter_time_range(self):
+        """shows and selects only the files with samples in the entered time range"""
+        if not self.directory_files:
+            return
+        try:
+            start = pd.Timestamp(self.filter_from_var.get())
+            end = pd.Timestamp(self.filter_to_var.get())
+        except ValueError:
+            return
+
+        matching = self.catalog.query(int(start.timestamp() * 1e6), int(end.timestamp() * 1e6), self.directory_files)
+
+        for file, var, checkbox, scan_label in zip(self.directory_files, self.checkbox_vars, self.checkboxes, self.scan_labels):
+            if file in matching:
+                checkbox.grid()
+                scan_label.grid()
+                var.set(True)
+            else:
+                checkbox.grid_remove()
+                scan_label.grid_remove()
+                var.set(False)
+
+    def show_all(self):
+        for checkbox, scan_label in zip(self.checkboxes, self.scan_labels):
+            checkbox.grid()
+            scan_label.grid()
+
     def clear_all(self):
         for var in self.checkbox_vars:
             var.set(False)
@@ -354,8 +465,175 @@ class LogFileSelectionDialog(Toplevel):
             var.set(True)
 
     def save_and_close(self):
-        self.selected_files = [file for file, var in zip(self.directory_files, self.checkbox_vars) if var.get()]
+        self.scan_cancel.set()
+        if self.directory_files:
+            self.selected_files = [file for file, var in zip(self.directory_files, self.checkbox_vars) if var.get()]
         self.destroy()
+############################################################################################################################################################
+class SensorCanvas(ttk.Frame):
+    """
+        embedded plot of the sensor lines, the figure, axes and lines are reused by every plot
+        and only get new data, the cursor is blitted onto the last drawn background,
+        zoom and pan on a TIME axis ask requery(start, end, max_points) for new lines
+    """
+    def __init__(self, master, requery):
+        super().__init__(master)
+
+        self.requery = requery
+
+        self.figure = Figure(figsize=(10, 5))
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self, pack_toolbar=False)
+        self.toolbar.update()
+
+        self.toolbar.pack(side="bottom", fill="x")
+        self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+
+        self.x_label = None
+        self.sensors = []
+        self.axes = []
+        # sensor -> (line, smoothed gradient line)
+        self.lines = {}
+
+        self.cursor = None
+        self.cursor_text = None
+        self.background = None
+
+        # set while the lines are replaced, their limits are no user zoom
+        self.updating = False
+        self.requery_job = None
+
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.canvas.mpl_connect('axes_leave_event', self.on_leave)
+
+    def build(self, x_label: str, sensors: list):
+        """new axes for another x sensor or set of y sensors, one y axis per sensor"""
+        self.figure.clear()
+        self.lines = {}
+        self.x_label = x_label
+        self.sensors = list(sensors)
+
+        ax1 = self.figure.add_subplot()
+        self.axes = [ax1] + [ax1.twinx() for _ in range(len(sensors) - 1)]
+
+        for axn, sensor, color in zip(self.axes, sensors, list(mcolors.TABLEAU_COLORS)):
+            line, = axn.plot([], [], color=color, label=sensor)
+            gradient_line, = axn.plot([], [], color='black', visible=False)
+            self.lines[sensor] = (line, gradient_line)
+
+            axn.set_ylabel(sensor, color=color)
+            axn.tick_params(axis='y', labelcolor=color)
+
+        ax1.set_xlabel(x_label)
+        if x_label == 'TIME':
+            ax1.xaxis.set_major_locator(mdates.AutoDateLocator())
+            ax1.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y %H:%M:%S.%f'))
+            self.figure.autofmt_xdate()
+
+        # animated artists are left out of the normal draw and blitted on top
+        self.cursor = ax1.axvline(np.nan, color='gray', linewidth=0.8, animated=True)
+        self.cursor_text = ax1.text(0.01, 0.99, "", transform=ax1.transAxes, va='top', fontsize=8, animated=True)
+
+        ax1.callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+    def show(self, x_label: str, lines: list, title: str, line_style: str = 'solid', keep_view: bool = False):
+        """
+            puts the lines of SensorPlotter.prepareSensors into the axes, the view is reset to
+            the data unless keep_view (lines of a zoom or pan)
+        """
+        sensors = [line['sensor'] for line in lines]
+        if x_label != self.x_label or sensors != self.sensors:
+            self.build(x_label, sensors)
+            keep_view = False
+
+        self.updating = True
+        try:
+            for axn, line in zip(self.axes, lines):
+                artist, gradient_artist = self.lines[line['sensor']]
+
+                artist.set_data(self.xValues(line['x']), np.asarray(line['y']))
+                artist.set_label(line['label'])
+                artist.set_linestyle(line_style)
+
+                if line['gradient'] is not None:
+                    gradient_artist.set_data(self.xValues(line['gradient'][0]), np.asarray(line['gradient'][1]))
+                    gradient_artist.set_label('GRAVER_Z smoothed gradient')
+                    gradient_artist.set_visible(True)
+                else:
+                    gradient_artist.set_label('_nolegend_')
+                    gradient_artist.set_visible(False)
+
+                axn.relim(visible_only=True)
+                axn.autoscale_view(scalex=not keep_view, scaley=True)
+                axn.legend(loc='upper right')
+
+            self.axes[0].set_title(title, fontsize=9)
+            # pending autoscaling is applied now, not in the next draw where it would look like a zoom
+            self.axes[0].get_xlim()
+
+            if not keep_view:
+                # home of the toolbar is the new window
+                self.toolbar.update()
+        finally:
+            self.updating = False
+
+        self.canvas.draw_idle()
+
+    def xValues(self, x) -> np.ndarray:
+        if self.x_label == 'TIME':
+            return mdates.date2num(np.asarray(x, dtype='datetime64[us]'))
+        return np.asarray(x, dtype=np.float64)
+
+    def on_xlim_changed(self, ax):
+        if self.updating or self.x_label != 'TIME':
+            return
+
+        # pan fires on every mouse move, only the view where the user stops is loaded
+        if self.requery_job is not None:
+            self.after_cancel(self.requery_job)
+        self.requery_job = self.after(requery_delay_ms, self.emit_requery)
+
+    def emit_requery(self):
+        self.requery_job = None
+        x_min, x_max = self.axes[0].get_xlim()
+
+        start = pd.Timestamp(mdates.num2date(x_min)).tz_convert(None)
+        end = pd.Timestamp(mdates.num2date(x_max)).tz_convert(None)
+        # about two points per pixel of the axes
+        max_points = 2 * int(self.axes[0].get_window_extent().width)
+
+        self.requery(start, end, max_points)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def on_motion(self, event):
+        if self.background is None or event.inaxes is None or not self.axes or event.xdata is None:
+            return
+
+        self.cursor.set_xdata([event.xdata])
+
+        values = []
+        for sensor in self.sensors:
+            x_data, y_data = self.lines[sensor][0].get_data()
+            if len(x_data) == 0:
+                continue
+            i = min(int(np.searchsorted(x_data, event.xdata)), len(x_data) - 1)
+            values.append(f"{sensor} {y_data[i]:.6g}")
+
+        x_text = mdates.num2date(event.xdata).strftime('%d.%m.%Y %H:%M:%S.%f') if self.x_label == 'TIME' else f"{event.xdata:.6g}"
+        self.cursor_text.set_text('\n'.join([x_text] + values))
+
+        self.canvas.restore_region(self.background)
+        self.axes[0].draw_artist(self.cursor)
+        self.axes[0].draw_artist(self.cursor_text)
+        self.canvas.blit(self.figure.bbox)
+
+    def on_leave(self, event):
+        if self.background is not None:
+            self.canvas.restore_region(self.background)
+            self.canvas.blit(self.figure.bbox)
 ############################################################################################################################################################    
 class HDF5Viewer(ttk.Frame):
     """
@@ -389,6 +667,10 @@ class HDF5Viewer(ttk.Frame):
 
         self.logfile = None
         self.logfile_lst = []
+        # interval index over logfile_lst, answers which files a plot window needs
+        self.logfile_set = LogFileSet(plotconfig=None)
+        # metadata of already scanned log files
+        self.catalog = Catalog()
 
         self.duration_time_s = 0
         self.plot_start_date = datetime.now()
@@ -397,6 +679,27 @@ class HDF5Viewer(ttk.Frame):
 
         self.plotconfig = PlotConfig(default_plot_params) #self.initPlotOptions()  # Default plot options
 
+        # reading and computing run in a worker thread, results come back through task_queue
+        # and are picked up on the tk main thread
+        self.task_queue = queue.Queue()
+        self.task_id = 0
+        self.task_cancel = None
+        self.task_done = None
+        self.task_polling = False
+        # one task uses the log files at a time, a superseded task leaves at its next progress call
+        self.task_lock = threading.Lock()
+
+        # reads the windows around the plotted one while the user looks at it
+        self.prefetcher = Prefetcher()
+        self.prefetcher.setPlotConfig(self.plotconfig)
+        # plot_data or plot_spectrum, repeated by the window step buttons
+        self.last_plot = self.plot_data
+        # (x, y) devices shown in the embedded plot
+        self.plotted_devices = None
+        # pending refresh of follow mode and the task id of the running one
+        self.follow_after = None
+        self.follow_task_id = None
+
 
         # matplotlib style configs
         self.selected_line_style = "solid"  # Default line style
@@ -454,6 +757,23 @@ class HDF5Viewer(ttk.Frame):
         self.plot_contactedges_button = ttk.Button(self, text="Plot Edges", command=self.plot_contactedges)
         self.plot_contactedges_button.grid(row=2, column=2, padx=10, pady=10)
 
+        self.cut_spinbox = ttk.Spinbox(self, from_=1, to=99999, width=8)
+        self.cut_spinbox.grid(row=2, column=3, padx=10, pady=10)
+        self.cut_spinbox.delete(0, "end")
+        self.cut_spinbox.insert(0, 1)
+
+        self.go_to_cut_button = ttk.Button(self, text="Go to Cut", command=self.go_to_cut)
+        self.go_to_cut_button.grid(row=2, column=4, padx=10, pady=10)
+
+        window_step_frame = ttk.Frame(self)
+        window_step_frame.grid(row=2, column=5, padx=10, pady=10)
+
+        self.previous_window_button = ttk.Button(window_step_frame, text="< Window", width=9, command=lambda: self.step_window(-1))
+        self.previous_window_button.grid(row=0, column=0)
+
+        self.next_window_button = ttk.Button(window_step_frame, text="Window >", width=9, command=lambda: self.step_window(1))
+        self.next_window_button.grid(row=0, column=1)
+
         self.data_label = ttk.Label(self, text="Data from database:")
         self.data_label.grid(row=3, column=0, padx=10, pady=10)
         
@@ -473,10 +793,28 @@ class HDF5Viewer(ttk.Frame):
         self.info_text.insert("end", f"")
         self.info_text['state'] = 'disabled'
         self.info_text.tag_configure("bold", font=("Arial", 10, "bold"))
+
+        self.progressbar = ttk.Progressbar(self, mode="determinate", maximum=1.0)
+        self.progressbar.grid(row=5, column=0, columnspan=2, padx=10, pady=10, sticky="we")
+
+        self.status_label = ttk.Label(self, text="")
+        self.status_label.grid(row=5, column=2, columnspan=2, padx=10, pady=10, sticky="w")
+
+        self.cancel_button = ttk.Button(self, text="Cancel", command=self.cancel_task, state="disabled")
+        self.cancel_button.grid(row=5, column=4, padx=10, pady=10)
+
+        # live tail of the newest file while it is written
+        self.follow_var = tk.BooleanVar(value=False)
+        self.follow_checkbutton = ttk.Checkbutton(self, text="Follow", variable=self.follow_var, command=self.toggle_follow)
+        self.follow_checkbutton.grid(row=5, column=5, padx=10, pady=10)
         
+        # persistent plot of "Plot Device", zoom and pan reload the visible range
+        self.sensor_canvas = SensorCanvas(self, requery=self.requery_plot)
+        self.sensor_canvas.grid(row=6, column=0, columnspan=6, padx=10, pady=10, sticky="nsew")
+
         self.grid(row=0, column=0, sticky="nsew")
         self.columnconfigure(1, weight=1)
-        self.rowconfigure(4, weight=1)
+        self.rowconfigure(6, weight=1)
     
     # open dialogs ####################################################
 
@@ -485,28 +823,12 @@ class HDF5Viewer(ttk.Frame):
 
         if self.logfile_path.is_file():
             self.logdir_path = None
-            self.logfile_lst = []
 
             self.file_entry_write(self.logfile_path)
-    
-            
-            # Open the HDF5 file
-            logfile = LogFile(self.logfile_path, self.plotconfig)
-            self.logfile_lst.append(logfile)
-
-            logfile.loadTimeBoundarys()
 
             self.master.title( f'GTM6 logfile: {self.logfile_path.name} - {file_version}')
-            self.update_textbox(delete = True)
-            self.update_textbox(text = f"{self.logfile_path.name}\n", bold=True)
-            self.update_textbox(text = f"Start: ", bold=True)
-            self.update_textbox(text = f"{logfile.getStartTime()}\n")
-            self.update_textbox(text = f"End: ", bold=True)
-            self.update_textbox(text = f"{logfile.getEndTime()}\n\n")
-            
-            self.device_list = logfile.listValidSensorsNames()
 
-            self.update_datetime_result(logfile.getStartTime())
+            self.open_logfiles([self.logfile_path])
         
 
 
@@ -516,7 +838,6 @@ class HDF5Viewer(ttk.Frame):
         if self.logdir_path.is_dir():
 
             self.logfile_path = None
-            self.logfile_lst = []
 
             self.file_entry_write(self.logdir_path)
 
@@ -524,27 +845,61 @@ class HDF5Viewer(ttk.Frame):
 
             hdf5_files = [f for f in Path.iterdir(self.logdir_path) if f.suffix in (('.h5', '.hdf5', '.nxn'))]
 
-            dialog = LogFileSelectionDialog(self, hdf5_files)
+            dialog = LogFileSelectionDialog(self, hdf5_files, self.catalog)
             self.wait_window(dialog)
 
-            selected_files_paths = dialog.selected_files
+            selected_files_paths = []
+            for file_path in dialog.selected_files:
+                scan_result = dialog.scan_results.get(file_path)
 
-            self.update_textbox(delete = True)
+                if scan_result is not None and not scan_result['valid']:
+                    self._printError(f"skip {file_path}: {scan_result['error']}")
+                    continue
+
+                selected_files_paths.append(file_path)
+
+            self.open_logfiles(selected_files_paths)
+
+    def open_logfiles(self, file_paths: list):
+        """opens the log files in the background and replaces the loaded ones"""
+        plotconfig = self.plotconfig
+
+        def work(progress):
+            logfiles = []
+            try:
+                for i, file_path in enumerate(file_paths):
+                    # a scanned file already has its time index sidecar, so opening is cheap
+                    logfile = LogFile(file_path, plotconfig)
+                    logfiles.append(logfile)
+
+                    logfile.loadTimeBoundarys()
+                    progress((i + 1) / len(file_paths), f"opened {file_path.name}")
+
+            except TaskCancelled:
+                for logfile in logfiles:
+                    logfile.close()
+                raise
+
+            return logfiles, LogFileSet(logfiles, plotconfig)
 
-            for file_path in selected_files_paths:
-                logfile = LogFile(file_path, self.plotconfig)
+        def done(result):
+            self.logfile_lst, self.logfile_set = result
 
-                logfile.loadTimeBoundarys()
+            self.update_textbox(delete = True)
+
+            for logfile in self.logfile_lst:
                 self.device_list = logfile.listValidSensorsNames()
 
-                self.update_textbox(text = f"{file_path.name}\n", bold=True)
+                self.update_textbox(text = f"{logfile.getLogFileFilePath().name}\n", bold=True)
                 self.update_textbox(text = f"Start: ", bold=True)
                 self.update_textbox(text = f"{logfile.getStartTime()}\n")
                 self.update_textbox(text = f"End: ", bold=True)
                 self.update_textbox(text = f"{logfile.getEndTime()}\n\n")
-                self.logfile_lst.append(logfile)
 
-            self.update_datetime_result(self.logfile_lst[0].getStartTime())
+            if self.logfile_lst:
+                self.update_datetime_result(self.logfile_set.logfiles[0].getStartTime())
+
+        self.run_task(f"opening {len(file_paths)} file(s)..", work, done)
 
     def file_entry_write(self, label:str):
         self.file_entry.config(state="normal")
@@ -600,7 +955,11 @@ class HDF5Viewer(ttk.Frame):
                             
             self.info_text.insert("end", info_option_string)
 
-                    
+        session_io = shared_tracer.summaryText()
+        if session_io:
+            self.info_text.insert("end", f"\nSession I/O:\n", "bold")
+            self.info_text.insert("end", f"{session_io}\n")
+
         self.info_text['state'] = 'disabled'
 
     
@@ -635,13 +994,59 @@ class HDF5Viewer(ttk.Frame):
         self.plotconfig = plotconfig
         #logging.debug(f"Plot Options: {self.plotconfig}")
         self.set_default_infobox()
-        for logfile in self.logfile_lst:
-            logfile.setPlotConfig(self.plotconfig)
+        self.logfile_set.setPlotConfig(self.plotconfig)
+        self.prefetcher.setPlotConfig(self.plotconfig)
 
     def update_matplot_styles(self, line_style, matplotlib_style):
         self.selected_line_style = line_style
         self.selected_matplotlib_style = matplotlib_style
 
+    def go_to_cut(self):
+        """sets plot start and duration to a cut number, taken from the first file that has it"""
+        if not self.logfile_lst:
+            self._showErrorMessage("No logfile or directory loaded!")
+            return
+
+        cut = int(self.cut_spinbox.get())
+        logfile_set = self.logfile_set
+
+        def work(progress):
+            # files without CUTS search the graver edges of the whole file on first use
+            for i, logfile in enumerate(logfile_set.logfiles):
+                cut_times = logfile.getCutTimes(cut)
+                if cut_times is not None:
+                    return cut_times
+
+                progress((i + 1) / len(logfile_set.logfiles), f"cut {cut} not in {logfile.getPlotTitle()}")
+
+            return None
+
+        def done(cut_times):
+            if cut_times is None:
+                self._showErrorMessage(f"Cut {cut} not found in the loaded logfiles.")
+                return
+
+            cut_start, cut_end = cut_times
+
+            self.seconds_spinbox.delete(0, "end")
+            self.seconds_spinbox.insert(0, max(1, int(np.ceil((cut_end - cut_start).total_seconds()))))
+
+            # the plot window excludes its start time, so start just before the first sample of the cut
+            self.update_datetime_result(cut_start - pd.Timedelta(microseconds=1))
+
+        self.run_task(f"looking up cut {cut}..", work, done)
+
+    def step_window(self, direction: int):
+        """moves the plot start by one window forward (1) or back (-1) and repeats the last plot"""
+        if not self.logfile_lst:
+            self._showErrorMessage("No logfile or directory loaded!")
+            return
+
+        time_s = int(self.seconds_spinbox.get())
+
+        self.update_datetime_result(self.plot_start_date + timedelta(seconds=direction * time_s))
+        self.last_plot()
+
     def update_datetime_result(self, selected_datetime):
         self.plot_start_date = selected_datetime
         logging.debug(f"Selected DateTime: {self.plot_start_date}")
@@ -653,54 +1058,356 @@ class HDF5Viewer(ttk.Frame):
         if len(self.selected_devices_y) == 0:
             self._showErrorMessage("No devices selected for plotting.")
             return
+
+        if len(self.selected_devices_x) != 1:
+            return
+
+        self.last_plot = self.plot_data
         
         time_s = int(self.seconds_spinbox.get())
 
-        new_duration = (self.duration_time_s != time_s)
         self.duration_time_s = time_s
 
-        sensor_list = []
-        sensor_list.extend(self.selected_devices_x)
-        sensor_list.extend(self.selected_devices_y)
+        self.load_sensor_plot(list(self.selected_devices_x), list(self.selected_devices_y), self.plot_start_date, time_s)
 
-        # which databases do we need
-        selected_logfiles = []
+    def requery_plot(self, start, end, max_points: int):
+        """zoom or pan of the embedded plot, the visible time range is loaded at the resolution of the axes"""
+        if self.plotted_devices is None:
+            return
 
-        # check if logfile starttime are in plot timestamps range
-        for logfile in self.logfile_lst:
-            delta = (self.plot_start_date + timedelta(seconds = self.duration_time_s))       
-            if logfile.getStartTime() <= delta:
-                selected_logfiles.append(logfile)
+        duration_s = (end - start).total_seconds()
+        if duration_s <= 0 or duration_s > requery_max_s:
+            return
 
-        #logging.debug(f'selected log files {selected_logfiles}')        
-        
-        for logfile_selected in selected_logfiles:
+        devices_x, devices_y = self.plotted_devices
+        self.load_sensor_plot(devices_x, devices_y, start, duration_s, max_points, keep_view=True)
 
-            logfile_selected.setPlotStartTime(self.plot_start_date)
+    def load_sensor_plot(self, devices_x: list, devices_y: list, plot_start_date, time_s: float, max_points: int = None,
+                         keep_view: bool = False):
+        """loads the window in the background and shows it in the embedded plot"""
+        # the worker gets its own copies, the widgets may change while it runs
+        logfile_set = self.logfile_set
 
-            logfile_selected.loadSensorData(data_label_list=sensor_list, duration_s=time_s, reload_anyway=new_duration)
+        if max_points is None and self.sensor_canvas.axes:
+            max_points = 2 * int(self.sensor_canvas.axes[0].get_window_extent().width)
 
-            logfile_selected.plotSensors(self.selected_devices_x, self.selected_devices_y)
+        def work(progress):
+            # only the files overlapping the window are read, their slices are merged into one plot
+            logfile_set.loadSensorData(devices_x + devices_y, plot_start_date, duration_s=time_s, progress=progress)
 
-        self.set_default_infobox()
+            # the title bounds come from the TIME columns, the merged DataFrame stays in the worker
+            bounds = logfile_set.getWindowBounds()
+            if bounds is None:
+                return None
+
+            progress(0, "preparing plot..")
+            return logfile_set.prepareSensors(devices_x, devices_y, max_points, progress), bounds
+
+        def done(result):
+            if result is None:
+                if not keep_view:
+                    self._showErrorMessage("No logfile covers the selected plot window.")
+                return
+
+            lines, (window_start, window_end) = result
+            title = f"{logfile_set.getPlotTitle()}\n{devices_x} vs {devices_y}\n{window_start} -> {window_end}"
+
+            self.plotted_devices = (devices_x, devices_y)
+            self.sensor_canvas.show(devices_x[0], lines, title, self.selected_line_style, keep_view)
+
+            logging.debug(f'block cache {logfile_set.logfiles[0].getCacheStats()}')
+
+            if not keep_view:
+                self.prefetcher.start(logfile_set, devices_x + devices_y, plot_start_date, time_s)
+
+            self.set_default_infobox()
+
+        self.run_task("loading plot window..", work, done)
     
+    def toggle_follow(self):
+        """follow mode shows the last seconds of the newest file and adds what the machine appends"""
+        if self.follow_after is not None:
+            self.after_cancel(self.follow_after)
+            self.follow_after = None
+
+        if not self.follow_var.get():
+            return
+
+        if not self.logfile_lst or len(self.selected_devices_y) == 0 or len(self.selected_devices_x) != 1:
+            self._showErrorMessage("Open a logfile and select devices to follow.")
+            self.follow_var.set(False)
+            return
+
+        self.follow_tick(redraw=True)
+
+    def follow_tick(self, redraw: bool = False):
+        """
+            one refresh of follow mode, the newest file is opened again as SWMR reader first,
+            a running task is not superseded, the refresh waits for the next tick then
+        """
+        self.follow_after = None
+
+        if not self.follow_var.get():
+            return
+
+        if self.task_cancel is not None:
+            self.follow_after = self.after(follow_interval_ms, self.follow_tick, redraw)
+            return
+
+        logfile_set = self.logfile_set
+        plotconfig = self.plotconfig
+        devices_x = list(self.selected_devices_x)
+        devices_y = list(self.selected_devices_y)
+        time_s = int(self.seconds_spinbox.get())
+
+        # the newest file is opened again as SWMR reader in the worker first
+        reopen = not logfile_set.logfiles[-1].swmr
+        redraw = redraw or reopen
+        # cancelled by run_task, the worker waits for it before the file is closed
+        prefetch_thread = self.prefetcher.thread
+
+        max_points = None
+        if self.sensor_canvas.axes:
+            max_points = 2 * int(self.sensor_canvas.axes[0].get_window_extent().width)
+
+        def work(progress):
+            if reopen:
+                error = self.reopen_newest_swmr(logfile_set, plotconfig, prefetch_thread)
+                if error is not None:
+                    return error
+
+            # only the rows appended since the last refresh are read
+            n_new = logfile_set.followSensorData(devices_x + devices_y, time_s, progress)
+
+            bounds = logfile_set.getWindowBounds()
+            if bounds is None or (n_new == 0 and not redraw):
+                return None
+
+            progress(0, "preparing plot..")
+            return logfile_set.prepareSensors(devices_x, devices_y, max_points, progress), bounds
+
+        def done(result):
+            if isinstance(result, OSError):
+                self.follow_var.set(False)
+                self._showErrorMessage(f"{logfile_set.logfiles[-1].getLogFileFilePath().name} cannot be followed: {result}")
+                return
+
+            if result is not None:
+                lines, (window_start, window_end) = result
+                title = f"{logfile_set.getPlotTitle()} (follow)\n{devices_x} vs {devices_y}\n{window_start} -> {window_end}"
+
+                self.plotted_devices = (devices_x, devices_y)
+                self.sensor_canvas.show(devices_x[0], lines, title, self.selected_line_style)
+
+                # plot and window steps continue from the followed window
+                self.update_datetime_result(logfile_set.logfiles[-1].data_plot_start_time)
+
+            self.follow_after = self.after(follow_interval_ms, self.follow_tick)
+
+        self.run_task("following newest file..", work, done)
+        self.follow_task_id = self.task_id
+
+    def reopen_newest_swmr(self, logfile_set, plotconfig, prefetch_thread) -> OSError:
+        """
+            opens the newest file of logfile_set again as SWMR reader, runs in the worker of follow_tick,
+            a file opened without swmr is not being written, so its time index comes from the sidecar and
+            opening is cheap, returns the error if the file cannot be followed, it is opened as before then
+        """
+        newest = logfile_set.logfiles[-1]
+        file_path = newest.getLogFileFilePath()
+
+        # the cancelled prefetch is the only other reader of the file
+        if prefetch_thread is not None:
+            prefetch_thread.join()
+
+        newest.close()
+        try:
+            reopened = LogFile(file_path, plotconfig, swmr=True)
+            error = None
+        except OSError as oe:
+            # the file is opened as before, it only cannot be followed
+            reopened = LogFile(file_path, plotconfig)
+            error = oe
+
+        reopened.loadTimeBoundarys()
+        logfile_set.replace(newest, reopened)
+        # rebound in one step, the tk thread only reads the list
+        self.logfile_lst = [reopened if logfile is newest else logfile for logfile in self.logfile_lst]
+
+        return error
+
     def plot_spectrum(self):
+
+        self.last_plot = self.plot_spectrum
         
         time_s = int(self.seconds_spinbox.get())
 
-        new_duration = (self.duration_time_s != time_s)
         self.duration_time_s = time_s
 
-        for logfile in self.logfile_lst:
+        logfile_set = self.logfile_set
+        plot_start_date = self.plot_start_date
+        devices_y = list(self.selected_devices_y)
+
+        def work(progress):
+            logfile_set.loadSensorData(devices_y, plot_start_date, duration_s=time_s, progress=progress)
+
+            if not logfile_set.windowFiles:
+                return None
+
+            progress(0, "computing spectrum..")
+            return logfile_set.prepareSpectrum(devices_y, progress)
+
+        def done(spectrum):
+            if spectrum is None:
+                self._showErrorMessage("No logfile covers the selected plot window.")
+                return
+
+            logfile_set.drawSpectrum(devices_y, spectrum)
 
-            logfile.setPlotStartTime(self.plot_start_date)
+            self.prefetcher.start(logfile_set, devices_y, plot_start_date, time_s)
 
-            logfile.loadSensorData(data_label_list=self.selected_devices_y, duration_s=time_s, reload_anyway=new_duration)
+            self.set_default_infobox()
 
-            logfile.plotSpectrum(self.selected_devices_y)
+            plt.show()
+
+        self.run_task("loading spectrum window..", work, done)
 
     def plot_contactedges(self):
-        pass
+        if not self.logfile_lst:
+            self._showErrorMessage("No logfile or directory loaded!")
+            return
+
+        time_s = int(self.seconds_spinbox.get())
+        self.duration_time_s = time_s
+
+        logfile_set = self.logfile_set
+        plot_start_date = self.plot_start_date
+        edges_options = self.plotconfig.get_values_by_name('cut edges')
+
+        def work(progress):
+            n_files = len(logfile_set.logfiles)
+
+            for i, logfile in enumerate(logfile_set.logfiles):
+                # edges of the whole file are searched once per file
+                if logfile.cutEdges is None:
+                    cut_edges = CutEdges(options=edges_options, Fs=logfile.Fs)
+                    cut_edges.find_edges_in_file(logfile, progress=lambda fraction, text, i=i: progress((i + fraction) / n_files, text))
+                    logfile.cutEdges = cut_edges
+
+                progress((i + 1) / n_files, f"edges of {logfile.getPlotTitle()}")
+
+            logfile_set.loadSensorData(['GRAVER_Z'], plot_start_date, duration_s=time_s, progress=progress)
+
+            return np.concatenate([logfile.cutEdges.edges for logfile in logfile_set.logfiles])
+
+        def done(edges):
+            for logfile in logfile_set.logfiles:
+                self.update_textbox(text = f"{logfile.getPlotTitle()}\n", bold=True)
+                self.update_textbox(text = f"Landing: {len(logfile.cutEdges.getLandings())} Lifting: {len(logfile.cutEdges.getLiftings())}\n\n")
+
+            if not logfile_set.windowFiles:
+                self._showErrorMessage("No logfile covers the selected plot window.")
+                return
+
+            logfile_set.plotEdges(edges)
+
+        self.run_task("searching edges..", work, done)
+
+    # background tasks #############################################################################################
+
+    def run_task(self, text: str, work, done):
+        """
+            runs work(progress) in a worker thread and done(result) on the tk main thread,
+            a new task supersedes the running one, the result of a superseded task is dropped
+        """
+        if self.task_cancel is not None:
+            self.task_cancel.set()
+
+            if self.task_id == self.follow_task_id and self.follow_after is None:
+                # a superseded refresh of follow mode is tried again on the next tick
+                self.follow_after = self.after(follow_interval_ms, self.follow_tick)
+        # the task reads the file itself, the prefetch would only compete for it
+        self.prefetcher.cancel()
+
+        self.task_id += 1
+        task_id = self.task_id
+        cancel = threading.Event()
+
+        self.task_cancel = cancel
+        self.task_done = done
+
+        def progress(fraction: float, progress_text: str = ""):
+            """called by the worker, raises TaskCancelled once the task is cancelled or superseded"""
+            if cancel.is_set():
+                raise TaskCancelled()
+            self.task_queue.put((task_id, 'progress', (fraction, progress_text)))
+
+        def worker():
+            """never touches tk widgets"""
+            with self.task_lock:
+                try:
+                    progress(0)
+                    self.task_queue.put((task_id, 'done', work(progress)))
+                except TaskCancelled:
+                    self.task_queue.put((task_id, 'cancelled', None))
+                except Exception:
+                    self.task_queue.put((task_id, 'error', traceback.format_exc()))
+
+        self.status_label.config(text=text)
+        self.progressbar['value'] = 0
+        self.cancel_button.config(state="normal")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+        if not self.task_polling:
+            self.task_polling = True
+            self.after(task_poll_ms, self.poll_task_queue)
+
+    def poll_task_queue(self):
+        try:
+            while not self.task_queue.empty():
+                task_id, kind, payload = self.task_queue.get_nowait()
+
+                if task_id != self.task_id:
+                    continue
+
+                if kind == 'progress':
+                    fraction, progress_text = payload
+                    self.progressbar['value'] = fraction
+                    if progress_text:
+                        self.status_label.config(text=progress_text)
+                    continue
+
+                done = self.task_done
+                self.task_cancel = None
+                self.task_done = None
+                self.cancel_button.config(state="disabled")
+                self.progressbar['value'] = 0
+
+                if kind != 'done' and task_id == self.follow_task_id:
+                    # a cancelled or failed refresh ends follow mode
+                    self.follow_var.set(False)
+
+                if kind == 'done':
+                    self.status_label.config(text="")
+                    done(payload)
+                elif kind == 'cancelled':
+                    self.status_label.config(text="cancelled")
+                else:
+                    self.status_label.config(text="failed")
+                    self._showErrorMessage(payload)
+
+        finally:
+            # a failing done() must not stop the polling of the next task
+            if self.task_cancel is not None:
+                self.after(task_poll_ms, self.poll_task_queue)
+            else:
+                self.task_polling = False
+
+    def cancel_task(self):
+        if self.task_cancel is not None:
+            self.task_cancel.set()
+            self.status_label.config(text="cancelling..")
 
 ##########################################################################################################################################################
 
@@ -717,8 +1424,10 @@ class GTM6App(tk.Tk):
 
 
 
-logger = Logger(logfilename)
+if __name__ == '__main__':
+    # guarded, worker processes of the directory scan import this module again
+    logger = Logger(logfilename)
 
-app = GTM6App(topmost = False)
+    app = GTM6App(topmost = False)
 
-app.mainloop() 
\ No newline at end of file
+    app.mainloop() 
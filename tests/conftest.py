@@ -0,0 +1,33 @@
+import sys
+
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from GTM6 import PlotConfig, write_synthetic_logfile
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """sidecars and caches of a test go to its own directory"""
+    path = tmp_path / 'cache'
+    monkeypatch.setenv('GTM6_CACHE_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def plotconfig():
+    return PlotConfig(ROOT / 'default_plot_params.json')
+
+
+@pytest.fixture
+def synthetic_logfile(tmp_path):
+    """path of a ten minute log file at 200 Hz with GRAVER_Z, two sensors, jittered TIME and CUTS"""
+    return write_synthetic_logfile(tmp_path / 'synthetic.h5', duration_s=600, n_sensors=2, cuts=True,
+                                   chunk_rows=4096, time_jitter_us=500)
@@ -0,0 +1,48 @@
+import os
+import importlib
+
+import pandas as pd
+
+from GTM6 import Catalog, write_synthetic_logfile
+from GTM6._helper import timestamp_to_us
+
+# the package exports the class under the name of its module
+catalog_module = importlib.import_module('GTM6.Catalog')
+
+
+def test_refresh_scans_only_changed_files_and_query_filters_by_time(tmp_path, monkeypatch):
+    # three ten minute files, one per hour
+    starts = [pd.Timestamp('2023-06-09 10:00:00') + pd.Timedelta(hours=i) for i in range(3)]
+    paths = [write_synthetic_logfile(tmp_path / f'{i}.h5', duration_s=600, n_sensors=1, start_time=str(start))
+             for i, start in enumerate(starts)]
+
+    scanned = []
+    scan_logfiles = catalog_module.scan_logfiles
+
+    def recording_scan(filepaths, **kwargs):
+        scanned.append(sorted(filepaths))
+        return scan_logfiles(filepaths, **kwargs)
+
+    monkeypatch.setattr(catalog_module, 'scan_logfiles', recording_scan)
+
+    catalog = Catalog(tmp_path / 'catalog.sqlite')
+    first = {result['path']: result for result in catalog.refresh(paths, max_workers=2)}
+    assert scanned == [sorted(paths)]
+
+    # nothing changed, the entries come from the catalog
+    second = {result['path']: result for result in catalog.refresh(paths, max_workers=2)}
+    assert scanned == [sorted(paths)]
+    assert [second[path]['start'] for path in paths] == [first[path]['start'] for path in paths]
+
+    # only the touched file is scanned again
+    modified_ns = paths[1].stat().st_mtime_ns + 10**9
+    os.utime(paths[1], ns=(modified_ns, modified_ns))
+    list(catalog.refresh(paths, max_workers=2))
+    assert scanned == [sorted(paths), [paths[1]]]
+
+    start_us = timestamp_to_us(starts[0] + pd.Timedelta(minutes=5))
+    assert catalog.query(start_us, start_us + 10**6) == [paths[0]]
+    # the gap between two files
+    assert catalog.query(start_us + 10 * 60 * 10**6, start_us + 30 * 60 * 10**6) == []
+    assert catalog.query(start_us, timestamp_to_us(starts[2])) == [paths[0], paths[1]]
+    assert catalog.query(start_us, timestamp_to_us(starts[2]) + 1, filepaths=[paths[1], paths[2]]) == [paths[1], paths[2]]
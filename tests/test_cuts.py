@@ -0,0 +1,57 @@
+import h5py
+import numpy as np
+import pytest
+
+from GTM6 import LogFile, write_synthetic_logfile
+from GTM6.Cuts import cut_table_from_records, load_cuts_records, load_cut_table_sidecar
+
+
+def test_edge_cuts_are_numbered_like_the_cuts_group(tmp_path, plotconfig):
+    h5filepath = write_synthetic_logfile(tmp_path / 'cuts.h5', duration_s=400, n_sensors=1, cuts=True)
+
+    logfile = LogFile(h5filepath, plotconfig)
+    expected = cut_table_from_records(load_cuts_records(logfile.cutGroup), logfile.timeIndex)
+    logfile.close()
+
+    # the same file without CUTS gets its cuts from the graver edges
+    with h5py.File(h5filepath, 'r+') as h5file:
+        del h5file['GTM6/CUTS']
+
+    logfile = LogFile(h5filepath, plotconfig)
+    table = logfile.getCutTable()
+
+    np.testing.assert_array_equal(table['cut'][:expected.shape[0]], expected['cut'])
+    # the edges sit on the GRAVER_Z ramps, the CUTS times at their start
+    assert np.all(np.abs(table['idx_start'][:expected.shape[0]] - expected['idx_start']) < 0.5 * logfile.Fs)
+
+    logfile.close()
+
+
+def test_cut_sidecar_depends_on_the_edge_options(tmp_path, plotconfig):
+    h5filepath = write_synthetic_logfile(tmp_path / 'edges.h5', duration_s=200, n_sensors=1)
+
+    logfile = LogFile(h5filepath, plotconfig)
+    table = logfile.getCutTable()
+    options = logfile.cutEdges.options
+    logfile.close()
+
+    np.testing.assert_array_equal(load_cut_table_sidecar(h5filepath, options), table)
+    assert load_cut_table_sidecar(h5filepath, {**options, 'min distance ms': options['min distance ms'] + 1}) is None
+
+
+def test_cut_columns_are_matched_by_exact_name(tmp_path, plotconfig):
+    h5filepath = write_synthetic_logfile(tmp_path / 'columns.h5', duration_s=200, n_sensors=1, cuts=True)
+    logfile = LogFile(h5filepath, plotconfig)
+    records = load_cuts_records(logfile.cutGroup)
+
+    # lower case names are accepted, names that only contain an accepted one are not
+    renamed = records.copy()
+    renamed.dtype.names = ('cut', 'start', 'end')
+    np.testing.assert_array_equal(cut_table_from_records(renamed, logfile.timeIndex),
+                                  cut_table_from_records(records, logfile.timeIndex))
+
+    renamed.dtype.names = ('cut', 'START_POSITION', 'end')
+    with pytest.raises(ValueError, match='START_POSITION'):
+        cut_table_from_records(renamed, logfile.timeIndex)
+
+    logfile.close()
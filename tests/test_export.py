@@ -0,0 +1,25 @@
+import h5py
+
+from GTM6 import write_synthetic_logfile
+from GTM6.Export import export_logfiles
+
+
+def test_failing_file_does_not_abort_the_batch(tmp_path):
+    good = write_synthetic_logfile(tmp_path / 'good.h5', duration_s=10, n_sensors=1)
+
+    # TIME is a group instead of a dataset, opening the file fails with an AttributeError
+    malformed = tmp_path / 'malformed.h5'
+    with h5py.File(malformed, 'w') as h5file:
+        h5file.create_group('GTM6/LOG/TIME')
+
+    results = {h5filepath.name: (written, error)
+               for h5filepath, written, error in export_logfiles([malformed, good], tmp_path / 'out', sensors=['SENSOR1'],
+                                                                 export_format='npz', max_workers=2)}
+
+    written, error = results['good.h5']
+    assert error is None
+    assert written and all(path.is_file() for path in written)
+
+    written, error = results['malformed.h5']
+    assert written == []
+    assert isinstance(error, AttributeError)
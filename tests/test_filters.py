@@ -0,0 +1,50 @@
+import h5py
+import numpy as np
+import scipy.signal
+
+from GTM6 import FilterBank, LogFile
+from GTM6._helper import SmoothedGradient, smoothed_gradient
+
+
+def test_streamed_smoothed_gradient_matches_the_batch_kernel(synthetic_logfile, plotconfig):
+    data = np.random.default_rng(8).normal(size=20_000).cumsum()
+    expected = smoothed_gradient(data, 30, 300)
+
+    # blocks shorter and longer than the look ahead of the kernel
+    kernel = SmoothedGradient(30, 300)
+    bounds = [0, 7, 250, 1300, 5000, 12_345, data.shape[0]]
+    streamed = np.concatenate([kernel.push(data[start:stop]) for start, stop in zip(bounds, bounds[1:])] + [kernel.flush()])
+
+    np.testing.assert_allclose(streamed, expected, rtol=1e-7, atol=1e-9)
+
+    # the same over a whole file read block by block
+    logfile = LogFile(synthetic_logfile, plotconfig)
+    options = plotconfig.get_values_by_name('plot smoothed gradient')
+    with h5py.File(synthetic_logfile, 'r') as h5file:
+        expected = smoothed_gradient(h5file['GTM6/LOG/GRAVER_Z'][:], int(round(options['lookahead ms'] * 1e-3 * logfile.Fs)),
+                                     options['shift'])
+
+    streamed = np.full(expected.shape, np.inf)
+    for index_slice, values in logfile.iterSmoothedGradient(block_seconds=60):
+        streamed[index_slice] = values
+
+    np.testing.assert_allclose(streamed, expected, rtol=1e-7, atol=1e-9)
+
+
+def test_streamed_bandpass_matches_the_zero_phase_filter():
+    rng = np.random.default_rng(9)
+    data = rng.normal(size=(40_000, 3)).cumsum(axis=0) * 0.1 + rng.normal(size=(40_000, 3))
+    filter_bank = FilterBank(1, 20, 200)
+
+    expected = filter_bank.filter(data)
+
+    bounds = [0, 5, 300, 2000, 9000, 25_000, data.shape[0]]
+    streamed = np.concatenate([filter_bank.push(data[start:stop]) for start, stop in zip(bounds, bounds[1:])] + [filter_bank.flush()])
+
+    # the backward pass of a block only runs over the settling time past it
+    np.testing.assert_allclose(streamed, expected, atol=1e-5)
+
+    # away from the ends, where scipy pads the signal instead of starting in steady state
+    settling = filter_bank.settling_samples
+    reference = scipy.signal.sosfiltfilt(filter_bank.sos, data, axis=0)
+    np.testing.assert_allclose(expected[settling:-settling], reference[settling:-settling], atol=1e-5)
@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import subprocess
+
+import h5py
+import numpy as np
+
+from GTM6 import LogFile, LogFileSet
+from GTM6.LogFile import InvalidGTM6LogFileException
+
+from conftest import ROOT
+
+
+CHUNK_ROWS = 4096
+
+
+def open_when_written(h5filepath, plotconfig, timeout_s=30):
+    """the file can be read once the writer switched to SWMR mode and appended the first rows"""
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if h5filepath.exists():
+            try:
+                logfile = LogFile(h5filepath, plotconfig)
+                if logfile.n_sensorTime_data > 0:
+                    return logfile
+                logfile.close()
+            except (OSError, InvalidGTM6LogFileException):
+                pass
+        time.sleep(0.1)
+    raise TimeoutError(f'{h5filepath} not written within {timeout_s} s')
+
+
+def test_follow_window_keeps_up_with_writer(tmp_path, plotconfig):
+    h5filepath = tmp_path / 'live.h5'
+    Fs = 2000
+
+    # 2000 rows per second fill a chunk every two seconds
+    writer = subprocess.Popen([sys.executable, '-m', 'GTM6', 'live', str(h5filepath), '--duration-s', '10',
+                               '--append-s', '0.25', '--fs', str(Fs), '--chunk-rows', str(CHUNK_ROWS)],
+                              cwd=ROOT, env=dict(os.environ, PYTHONPATH=str(ROOT)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        logfile = open_when_written(h5filepath, plotconfig)
+        assert logfile.swmr
+
+        logfile_set = LogFileSet([logfile], plotconfig)
+        last_times = []
+
+        while writer.poll() is None:
+            time.sleep(0.3)
+            logfile_set.followSensorData(['SENSOR1'], duration_s=1)
+
+            times = logfile.windowData['TIME']
+            assert np.all(np.diff(times) > 0)
+            assert times[-1] == logfile.timeIndex.getEndTime()
+            # the window is the last second, not the start of the file
+            assert times[-1] - times[0] < 1_000_000
+            assert logfile.windowRows() >= min(logfile.n_sensorTime_data, Fs - 1)
+
+            last_times.append(int(times[-1]))
+
+            x_plot, y_plot = logfile_set.getPlotEnvelope('SENSOR1', 500) or (None, logfile.windowData['SENSOR1'])
+            assert y_plot.shape[0] <= 500
+
+        assert writer.returncode == 0
+
+    finally:
+        if writer.poll() is None:
+            writer.kill()
+
+    logfile_set.followSensorData(['SENSOR1'], duration_s=1)
+
+    # the followed window went on increasing past several chunks
+    assert last_times == sorted(last_times)
+    assert len(set(last_times)) >= 5
+    assert logfile.n_sensorTime_data > 3 * CHUNK_ROWS
+
+    with h5py.File(h5filepath, 'r') as h5file:
+        sensor_group = h5file['GTM6/LOG']
+        assert logfile.n_sensorTime_data == sensor_group['TIME'].shape[0]
+        np.testing.assert_array_equal(logfile.windowData['TIME'], sensor_group['TIME'][logfile.dataSlice])
+        np.testing.assert_array_equal(logfile.windowData['SENSOR1'], sensor_group['SENSOR1'][logfile.dataSlice])
+
+    logfile.close()
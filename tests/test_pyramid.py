@@ -0,0 +1,68 @@
+import h5py
+import numpy as np
+import pandas as pd
+
+from GTM6 import LogFile, LogFileSet, write_synthetic_logfile
+from GTM6.Pyramid import MinMaxPyramid, minmax_decimate
+
+
+def test_envelope_is_bounded_and_clipped_to_the_window(tmp_path):
+    h5filepath = write_synthetic_logfile(tmp_path / 'pyramid.h5', duration_s=600, n_sensors=1)
+    rng = np.random.default_rng(1)
+
+    with h5py.File(h5filepath, 'r') as h5file:
+        dataset = h5file['GTM6/LOG/SENSOR1']
+        values = dataset[:]
+        pyramid = MinMaxPyramid(dataset, h5filepath, 'SENSOR1')
+
+        for _ in range(200):
+            idx_start = int(rng.integers(0, values.shape[0] - 100))
+            idx_stop = int(rng.integers(idx_start + 100, values.shape[0] + 1))
+            max_points = int(rng.integers(2, 2000))
+
+            envelope = pyramid.getEnvelope(idx_start, idx_stop, max_points)
+            if envelope is None:
+                assert idx_stop - idx_start <= max_points
+                continue
+
+            bucket_idx, bucket_min, bucket_max = envelope
+            assert 2 * bucket_min.shape[0] <= max_points
+            assert bucket_idx[0] == idx_start
+
+            window = values[idx_start:idx_stop]
+            assert bucket_min.min() == window.min()
+            assert bucket_max.max() == window.max()
+
+
+def test_minmax_decimate_is_bounded():
+    y_values = np.random.default_rng(2).normal(size=10_001)
+    x_values = np.arange(y_values.shape[0])
+
+    for max_points in (2, 3, 999, 1000, 10_000):
+        _, y_plot = minmax_decimate(x_values, y_values, max_points)
+        assert y_plot.shape[0] <= max_points
+        assert y_plot.min() == y_values.min() and y_plot.max() == y_values.max()
+
+
+def test_envelope_of_several_short_files_is_bounded(tmp_path, plotconfig):
+    # 8000 samples per file, their pyramids have only the finest level
+    start = pd.Timestamp('2023-06-09 10:00:00')
+    logfiles = [LogFile(write_synthetic_logfile(tmp_path / f'{i}.h5', duration_s=40, n_sensors=1,
+                                                start_time=start + pd.Timedelta(seconds=40 * i), seed=i), plotconfig)
+                for i in range(3)]
+    logfile_set = LogFileSet(logfiles, plotconfig)
+
+    logfile_set.loadSensorData(['SENSOR1'], start - pd.Timedelta(seconds=1), duration_s=130)
+    assert len(logfile_set.windowFiles) == 3
+
+    for max_points in (1000, 100, 7):
+        x_plot, y_plot = logfile_set.getPlotEnvelope('SENSOR1', max_points)
+        assert y_plot.shape[0] <= max_points
+        assert x_plot.shape == y_plot.shape
+
+    window = logfile_set.getSensorDataFrame()['SENSOR1']
+    _, y_plot = logfile_set.getPlotEnvelope('SENSOR1', 1000)
+    assert y_plot.min() == window.min() and y_plot.max() == window.max()
+
+    for logfile in logfiles:
+        logfile.close()
@@ -0,0 +1,50 @@
+import os
+import time
+import multiprocessing
+
+import pytest
+
+from GTM6 import scan_logfiles, write_synthetic_logfile
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='needs a named pipe')
+def test_hanging_scan_is_killed_and_the_next_file_scanned(tmp_path):
+    # opening a named pipe without a writer blocks forever
+    hanging = tmp_path / 'hanging.h5'
+    os.mkfifo(hanging)
+    healthy = write_synthetic_logfile(tmp_path / 'healthy.h5', duration_s=10)
+    others = [write_synthetic_logfile(tmp_path / f'other_{i}.h5', duration_s=5) for i in range(2)]
+
+    started = time.monotonic()
+    results = {}
+    workers = set()
+    for result in scan_logfiles([hanging, healthy] + others, max_workers=1, timeout_s=2):
+        results[result['path']] = result
+        workers.update(process.pid for process in multiprocessing.active_children())
+    elapsed = time.monotonic() - started
+
+    assert results[hanging]['error'] == 'timeout after 2 s'
+    assert not results[hanging]['complete']
+
+    assert results[healthy]['valid']
+    assert results[healthy]['complete']
+    assert results[healthy]['n samples'] == 2000
+
+    # the healthy file did not wait for a second timeout
+    assert elapsed < 10
+    # the worker of the hanging file was killed, one replacement scanned all other files
+    assert all(results[path]['valid'] for path in others)
+    assert len(workers) == 1
+    assert not multiprocessing.active_children()
+
+
+def test_scan_results_of_several_files(tmp_path):
+    paths = [write_synthetic_logfile(tmp_path / f'{i}.h5', duration_s=5 + i) for i in range(3)]
+    invalid = tmp_path / 'invalid.h5'
+    invalid.write_bytes(b'not hdf5')
+
+    results = {result['path']: result for result in scan_logfiles(paths + [invalid], max_workers=2, timeout_s=30)}
+
+    assert [results[path]['n samples'] for path in paths] == [1000, 1200, 1400]
+    assert all(results[path]['valid'] for path in paths)
+    assert not results[invalid]['valid']
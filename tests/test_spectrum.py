@@ -0,0 +1,74 @@
+import os
+
+import h5py
+import numpy as np
+import pandas as pd
+import scipy.signal
+
+from GTM6 import LogFile, SpectrumCache, SpectrumEngine
+
+
+def test_welch_matches_scipy():
+    data = np.random.default_rng(5).normal(size=(20_000, 3))
+    engine = SpectrumEngine(200, nperseg=48, noverlap=32, nfft=512, window=SpectrumEngine.WELCH_WINDOW)
+
+    frequencies, power = engine.welch(data)
+    expected_frequencies, expected = scipy.signal.welch(data, fs=200, nperseg=48, noverlap=32, nfft=512, axis=0)
+
+    np.testing.assert_allclose(frequencies, expected_frequencies)
+    np.testing.assert_allclose(power, expected, rtol=1e-9)
+
+
+def test_spectrogram_columns_are_means_of_the_scipy_frames():
+    data = np.random.default_rng(6).normal(size=(60_001, 2))
+    engine = SpectrumEngine(200)
+    # frames of several chunks per column, the last column is shorter
+    max_columns = 7
+
+    _, times, power = engine.spectrogram(data, max_columns)
+    _, frame_times, Sxx = scipy.signal.spectrogram(data, fs=200, nperseg=48, noverlap=32, nfft=512, axis=0)
+
+    # scipy returns (frequencies, sensors, frames)
+    frames_per_column = -(-Sxx.shape[2] // max_columns)
+    for i_column in range(power.shape[1]):
+        column = slice(i_column * frames_per_column, (i_column + 1) * frames_per_column)
+
+        np.testing.assert_allclose(power[:, i_column], Sxx[:, :, column].mean(axis=2), rtol=1e-9)
+        assert np.isclose(times[i_column], frame_times[column].mean())
+
+
+def test_spectrum_tiles_are_reused_until_the_file_changes(synthetic_logfile, plotconfig, tmp_path):
+    cache = SpectrumCache(directory=tmp_path / 'spectrum')
+
+    def spectrum(engine):
+        logfile = LogFile(synthetic_logfile, plotconfig)
+        logfile.spectrumCache = cache
+        logfile.loadTimeBoundarys()
+        logfile.setPlotStartTime(logfile.getStartTime() + pd.Timedelta(seconds=100))
+        logfile.loadSensorData(['SENSOR1'], 300)
+        return logfile.getSpectrum(['SENSOR1'], engine, 20)
+
+    _, _, power = spectrum(SpectrumEngine(200))
+    assert cache.stats()['hits'] == 0
+    n_tiles = cache.misses
+
+    # the same window from the cache
+    _, _, cached = spectrum(SpectrumEngine(200))
+    assert cache.stats()['hits'] == n_tiles and cache.misses == n_tiles
+    np.testing.assert_array_equal(cached, power)
+
+    # other STFT parameters and a rewritten file use new tiles
+    spectrum(SpectrumEngine(200, nperseg=64, noverlap=48))
+    assert cache.hits == n_tiles and cache.misses == 2 * n_tiles
+
+    with h5py.File(synthetic_logfile, 'r+') as h5file:
+        h5file['GTM6/LOG/SENSOR1'][:100] = 0.0
+    # the same size, a coarse file system clock may keep the modification time
+    modified_ns = synthetic_logfile.stat().st_mtime_ns + 10**9
+    os.utime(synthetic_logfile, ns=(modified_ns, modified_ns))
+    spectrum(SpectrumEngine(200))
+    assert cache.hits == n_tiles and cache.misses == 3 * n_tiles
+
+    # a smaller cache evicts the least recently used tiles
+    cache.setMaxBytes(0)
+    assert not list(cache.directory.glob('*.npy'))
@@ -0,0 +1,23 @@
+import h5py
+import numpy as np
+
+from GTM6.TimeIndex import TimeIndex
+
+
+def test_locate_matches_searchsorted(synthetic_logfile):
+    rng = np.random.default_rng(7)
+
+    with h5py.File(synthetic_logfile, 'r') as h5file:
+        dataset = h5file['GTM6/LOG/TIME']
+        times = dataset[:]
+
+        for stride in (TimeIndex.STRIDE, 100):
+            # sample times, times between samples and times outside the file
+            probes = np.concatenate((rng.choice(times, 200), rng.integers(times[0] - 10**6, times[-1] + 10**6, 200),
+                                     times[[0, -1]], times[::stride][:5]))
+
+            # the second index is loaded from the sidecar of the first
+            for time_index in [TimeIndex(dataset, synthetic_logfile, stride=stride) for _ in range(2)]:
+                for time_us in probes:
+                    assert time_index.locate(time_us) == np.searchsorted(times, time_us, side='left')
+                    assert time_index.locate(time_us, right=True) == np.searchsorted(times, time_us, side='right')
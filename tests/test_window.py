@@ -0,0 +1,219 @@
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+
+from GTM6 import BlockCache, ColumnPool, LogFile, LogFileSet, write_synthetic_logfile
+from GTM6._helper import timestamp_to_us
+
+
+LABELS = ['GRAVER_Z', 'SENSOR1', 'SENSOR2']
+
+
+@pytest.fixture(params=[16384, None], ids=['chunked', 'contiguous'])
+def h5filepath(request, tmp_path):
+    h5filepath = write_synthetic_logfile(tmp_path / 'window.h5', duration_s=1800, n_sensors=2,
+                                         chunk_rows=request.param, time_jitter_us=500)
+
+    # NaN runs, the window keeps them, forward filling is left to the DataFrame
+    with h5py.File(h5filepath, 'r+') as h5file:
+        values = h5file['GTM6/LOG/SENSOR1'][:]
+        values[1000:1500] = np.nan
+        values[200_000:200_003] = np.nan
+        h5file['GTM6/LOG/SENSOR1'][:] = values
+
+    return h5filepath
+
+
+def masked_read(h5filepath, start_time, duration_s: float, label: str) -> np.ndarray:
+    """the samples strictly inside the window, read directly from the file"""
+    with h5py.File(h5filepath, 'r') as h5file:
+        times = h5file['GTM6/LOG/TIME'][:]
+        tresh_l = timestamp_to_us(start_time)
+        tresh_h = timestamp_to_us(start_time + pd.Timedelta(seconds=duration_s))
+
+        return h5file['GTM6/LOG'][label][:][(times > tresh_l) & (times < tresh_h)]
+
+
+def window_moves(logfile, rng, n_random: int = 60):
+    """(start, duration) of windows that overlap, move, grow, shrink and jump"""
+    start = logfile.getStartTime() + pd.Timedelta(seconds=100)
+    moves = [(start, 60), (start, 60), (start + pd.Timedelta(seconds=20), 60), (start - pd.Timedelta(seconds=30), 60),
+             (start - pd.Timedelta(seconds=40), 200), (start, 10), (start + pd.Timedelta(seconds=500), 60),
+             (logfile.getStartTime() - pd.Timedelta(seconds=5), 30), (logfile.getEndTime() - pd.Timedelta(seconds=20), 60)]
+
+    for _ in range(n_random):
+        if rng.random() < 0.5:
+            # overlapping step of the previous window
+            start = start + pd.Timedelta(seconds=float(rng.uniform(-40, 40)))
+        else:
+            start = logfile.getStartTime() + pd.Timedelta(seconds=float(rng.uniform(-10, 1800)))
+        moves.append((start, float(rng.choice([1, 5, 30, 60, 300]))))
+
+    return moves
+
+
+@pytest.mark.parametrize('float32', [False, True], ids=['float64', 'float32'])
+def test_window_loads_match_a_masked_read(h5filepath, plotconfig, float32):
+    plotconfig.data['9']['active'] = float32
+
+    logfile = LogFile(h5filepath, plotconfig)
+    # small blocks and a small cache, so windows are served from cached, partly cached and evicted blocks
+    logfile.blockCache = BlockCache(max_bytes=2 * 2**20, block_size=4096)
+    logfile.loadTimeBoundarys()
+
+    rng = np.random.default_rng(3)
+
+    for i, (start_time, duration_s) in enumerate(window_moves(logfile, rng)):
+        labels = LABELS[i % 3:] if i % 4 else ['SENSOR1']
+
+        logfile.setPlotStartTime(start_time)
+        logfile.loadSensorData(labels, duration_s)
+
+        for label in ['TIME'] + labels:
+            expected = masked_read(h5filepath, start_time, duration_s, label)
+            if float32 and label != 'TIME':
+                expected = expected.astype(np.float32)
+
+            np.testing.assert_array_equal(logfile.windowData[label], expected, err_msg=f'{label} of window {i}')
+
+    stats = logfile.blockCache.stats()
+    if logfile.getMemmap('SENSOR1') is None:
+        assert stats['hits'] > 0 and stats['misses'] > 0
+    assert stats['bytes'] <= 2 * 2**20
+
+    logfile.close()
+
+
+def test_block_cache_reads_match_the_dataset(h5filepath):
+    cache = BlockCache(max_bytes=256 * 2**10, block_size=1000)
+    rng = np.random.default_rng(4)
+
+    with h5py.File(h5filepath, 'r') as h5file:
+        dataset = h5file['GTM6/LOG/SENSOR1']
+        values = dataset[:]
+
+        for _ in range(200):
+            idx_start = int(rng.integers(0, values.shape[0]))
+            # some ranges are larger than half the cache and bypass it
+            idx_stop = min(values.shape[0], idx_start + int(rng.choice([1, 999, 1000, 5000, 40_000])))
+
+            if rng.random() < 0.5:
+                data = cache.read('key', 'SENSOR1', dataset, idx_start, idx_stop)
+            else:
+                data = cache.read('key', 'SENSOR1', dataset, idx_start, idx_stop,
+                                  np.empty(idx_stop - idx_start, dtype=np.float64))
+
+            np.testing.assert_array_equal(data, values[idx_start:idx_stop])
+
+    stats = cache.stats()
+    assert stats['hits'] > 0
+    assert stats['bytes'] <= 256 * 2**10
+
+
+def test_column_pool_keeps_the_current_window():
+    pool = ColumnPool()
+
+    current = pool.column('SENSOR1', 100, np.float64)
+    current[:] = 1
+    pool.swap()
+
+    # the next window is written into the other generation
+    following = pool.column('SENSOR1', 120, np.float64)
+    following[:] = 2
+    assert np.all(current == 1)
+    pool.swap()
+
+    # the generation of the first window is reused once it is no longer current
+    reused = pool.column('SENSOR1', 80, np.float64)
+    assert np.shares_memory(reused, current)
+    assert np.all(following == 2)
+
+    assert pool.column('SENSOR1', 80, np.float32).dtype == np.float32
+
+
+def test_plotting_a_window_does_not_build_the_data_frame(h5filepath, plotconfig):
+    logfile = LogFile(h5filepath, plotconfig)
+    logfile.loadTimeBoundarys()
+
+    # the window contains the NaN run of SENSOR1
+    logfile.setPlotStartTime(logfile.getStartTime() + pd.Timedelta(seconds=4))
+    logfile.loadSensorData(LABELS, 10)
+
+    raw_lines = logfile.prepareSensors(['TIME'], LABELS, max_points=100_000)
+    logfile.prepareSensors(['TIME'], LABELS, max_points=200)
+    assert logfile._dataFrame is None
+
+    frame = logfile.getSensorDataFrame()
+    for line in raw_lines:
+        np.testing.assert_array_equal(line['x'], frame.index)
+        np.testing.assert_array_equal(line['y'], frame[line['sensor']].to_numpy())
+
+    logfile.close()
+
+
+class Cancelled(Exception):
+    pass
+
+
+def test_a_cancelled_load_drops_the_merged_window(tmp_path, plotconfig):
+    start = pd.Timestamp('2023-06-09 10:00:00')
+    logfiles = [LogFile(write_synthetic_logfile(tmp_path / f'{i}.h5', duration_s=600, n_sensors=2,
+                                                start_time=start + pd.Timedelta(seconds=600 * i), seed=i), plotconfig)
+                for i in range(2)]
+    for logfile in logfiles:
+        # small blocks, the reads of one sensor report progress several times
+        logfile.blockCache = BlockCache(max_bytes=2**20, block_size=1024)
+    logfile_set = LogFileSet(logfiles, plotconfig)
+
+    logfile_set.loadSensorData(LABELS, start + pd.Timedelta(seconds=500), duration_s=200)
+    assert len(logfile_set.windowFiles) == 2
+
+    calls = []
+
+    def progress(fraction, text):
+        calls.append(fraction)
+        if len(calls) >= 5:
+            raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        logfile_set.loadSensorData(LABELS, start + pd.Timedelta(seconds=300), duration_s=600, progress=progress)
+
+    # both files stop inside the reads of their first sensors
+    assert max(calls) < 0.5
+    assert logfile_set.windowFiles == []
+
+    logfile_set.loadSensorData(LABELS, start + pd.Timedelta(seconds=300), duration_s=600)
+    _, columns = logfile_set.windowColumns(['SENSOR1'])
+    np.testing.assert_array_equal(columns['SENSOR1'], logfile_set.getSensorDataFrame()['SENSOR1'].to_numpy())
+
+    for logfile in logfiles:
+        logfile.close()
+
+
+def test_blocks_are_chunk_aligned_and_cover_the_slice(synthetic_logfile, plotconfig):
+    logfile = LogFile(synthetic_logfile, plotconfig)
+    index_slice = slice(1234, 100_000)
+
+    with h5py.File(synthetic_logfile, 'r') as h5file:
+        times = h5file['GTM6/LOG/TIME'][:]
+        expected = h5file['GTM6/LOG/SENSOR1'][index_slice]
+
+    # 10000 rows are rounded up to three chunks of 4096 rows
+    blocks = list(logfile.iterBlocks(['TIME', 'SENSOR1'], index_slice, block_rows=10_000, overlap=50))
+    block_starts = [block_slice.start + n_overlap for block_slice, n_overlap, _ in blocks]
+    assert block_starts[0] == index_slice.start
+    assert all(block_start % 12_288 == 0 for block_start in block_starts[1:])
+
+    np.testing.assert_array_equal(np.concatenate([data['SENSOR1'][n_overlap:] for _, n_overlap, data in blocks]), expected)
+    for (_, _, previous), (block_slice, n_overlap, data) in zip(blocks[:-1], blocks[1:]):
+        assert n_overlap == 50
+        np.testing.assert_array_equal(data['TIME'][:n_overlap], previous['TIME'][-n_overlap:])
+        np.testing.assert_array_equal(data['TIME'], times[block_slice])
+
+    # time based blocks start at the first sample of every 60 s step
+    boundaries = logfile.blockBoundaries(index_slice, block_seconds=60)
+    step_times = np.arange(times[index_slice.start], times[index_slice.stop - 1] + 1, 60_000_000)
+    assert boundaries == [index_slice.start] + np.searchsorted(times, step_times[1:]).tolist() + [index_slice.stop]
+
+    logfile.close()